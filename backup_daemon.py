@@ -0,0 +1,136 @@
+import threading
+import time
+from bimcloud_custom.retry_rules import is_authentication_error
+
+# Run history key holding the $modifiedDate of a project's last successful backup
+BACKED_UP_MODIFIED_KEY = 'backed_up_modified_date'
+# Upper bound of the wait before a failed project is backed up again
+MAX_RETRY_DELAY = 6 * 3600
+
+
+class BackupDaemon:
+    """
+    Keeps a BackupManager (Manager session, Drive services, folder cache and worker
+    threads) alive and backs up projects shortly after they were edited.
+
+    The project list is polled every ``poll_interval`` seconds. A project whose
+    ``$modifiedDate`` is newer than the one of its last backup is queued, and backed
+    up once no further edit was seen for ``debounce`` seconds. A project whose backup
+    failed is retried after ``poll_interval`` seconds, doubling with every further
+    failure up to six hours, or as soon as it is edited again. The date of the last
+    backup is kept in the run history, so a restarted daemon picks up where it stopped.
+
+    Args:
+        backup_manager (BackupManager): Configured backup manager.
+        poll_interval (float): Seconds between project list polls.
+        debounce (float): Seconds a project must stay unchanged before it is backed up.
+    """
+
+    def __init__(self, backup_manager, poll_interval=60, debounce=300):
+        self.manager = backup_manager
+        self.logger = backup_manager.logger
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.pending = {}  # project id -> ($modifiedDate, monotonic time it was first seen)
+        self.failures = {}  # project id -> (failed backups in a row, monotonic time of the next attempt)
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        self.logger.info(
+            f"Backup daemon started: polling every {self.poll_interval}s, debounce {self.debounce}s.")
+        try:
+            while not self._stop.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    if is_authentication_error(e):
+                        self.relogin(e)
+                    else:
+                        self.logger.error(f"Error while polling projects: {e}")
+                self._stop.wait(self.poll_interval)
+        finally:
+            self.logger.info("Backup daemon stopped.")
+
+    def relogin(self, error):
+        """Log in again after the Manager session expired, e.g. when the refresh token did."""
+        self.logger.warning(f"Manager session expired ({getattr(error, 'message', error)}); logging in again.")
+        try:
+            self.manager.login()
+        except Exception as e:
+            self.logger.error(f"Failed to log in to the Manager again: {e}")
+        else:
+            self.logger.info("Logged in to the Manager again.")
+
+    def needs_backup(self, project):
+        backed_up = self.manager.history.get(project["id"], BACKED_UP_MODIFIED_KEY)
+        if backed_up is None:
+            # Never backed up by the daemon: 'edited' only catches up on recent edits
+            return self.manager.task != "edited" or self.manager.was_recently_edited(project)
+        return project["$modifiedDate"] > backed_up
+
+    def is_settled(self, project, now):
+        modified, first_seen = self.pending[project["id"]]
+        edit_age = time.time() - modified / 1000
+        return now - first_seen >= self.debounce or edit_age >= self.debounce
+
+    def poll(self):
+        """
+        Refresh the project list, update the queue and back up settled projects.
+
+        Returns:
+            int: Number of projects backed up in this poll.
+        """
+        projects = self.manager.api.get_projects(self.manager.auth_context)
+        if self.manager.task == "selected":
+            projects = self.manager.select_matching(projects, warn_unmatched=False)
+        now = time.monotonic()
+        current_ids = set()
+        settled = []
+        for project in projects:
+            project_id = project["id"]
+            current_ids.add(project_id)
+            if not self.needs_backup(project):
+                self.pending.pop(project_id, None)
+                continue
+            queued = self.pending.get(project_id)
+            if queued is None or queued[0] != project["$modifiedDate"]:
+                # New or further edited: (re)start the debounce window and forget earlier failures
+                self.pending[project_id] = (project["$modifiedDate"], now)
+                self.failures.pop(project_id, None)
+            if self.is_settled(project, now) and self.failures.get(project_id, (0, now))[1] <= now:
+                settled.append(project)
+
+        # Forget projects that were deleted in the meantime
+        for project_id in set(self.pending) - current_ids:
+            del self.pending[project_id]
+            self.failures.pop(project_id, None)
+
+        if not settled:
+            self.logger.debug(f"No settled changes; {len(self.pending)} project(s) waiting for edits to settle.")
+            return 0
+
+        self.logger.info(f"Backing up {len(settled)} edited project(s); {len(self.pending) - len(settled)} waiting.")
+        # Library backups only need cleaning after a poll that created project backups
+        self.manager.run_backup(settled, idle_cleanup=False)
+
+        backed_up = 0
+        now = time.monotonic()
+        for project in settled:
+            result = self.manager.project_results.get(self.manager.project_label(project), {}).get("result")
+            if result == "success":
+                self.manager.history.record(project["id"], **{BACKED_UP_MODIFIED_KEY: project["$modifiedDate"]})
+                self.pending.pop(project["id"], None)
+                self.failures.pop(project["id"], None)
+                backed_up += 1
+            elif result not in ("deferred", "not_run"):
+                failures = self.failures.get(project["id"], (0, now))[0] + 1
+                delay = min(MAX_RETRY_DELAY, self.poll_interval * 2 ** (failures - 1))
+                self.failures[project["id"]] = (failures, now + delay)
+                self.logger.warning(
+                    f"Backup of project '{project['name']}' failed {failures} time(s) in a row; "
+                    f"retrying in {delay:.0f}s unless it is edited again.")
+        self.manager.history.save()
+        return backed_up
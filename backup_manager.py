@@ -1,16 +1,35 @@
-from utils.logger import setup_logger
+from utils.logger import setup_logger, get_log_directory, TenantLoggerAdapter
 import os
+import threading
 import time
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone, timedelta
 from pathlib import Path, PureWindowsPath
-from bimcloud_custom.custom_managerapi import CustomManagerApi
+from bimcloud_custom.custom_managerapi import CustomManagerApi, DEFAULT_CACHE_TTLS
+from bimcloud_custom.records import encode_record, decode_record
 from utils.file_utils import copy_file, check_file_update, upload_file_to_gdrive, check_gdrive_file_update
 from utils.gdrive import GoogleDriveAPI
+from utils.hashing import hash_file
+from utils.manifest import UploadManifest, drive_key
+from utils.retry import CircuitOpenError
+from utils.run_history import RunHistory
+from utils.admission import DiskSpaceAdmission, AdmissionDeniedError
+from utils.concurrency import AimdLimiter
+from utils.project_selector import ProjectPathIndex
+from utils.retention import VersionRetention
+from utils.scheduler import order_projects, estimate_durations, estimate_makespan
+from utils.metrics import MetricsRegistry, write_prometheus_textfile, write_json_summary
+from utils.ttl_cache import TTLCache
+from bimcloud_api.errors import BIMcloudManagerError
 
 # Define constants
 BACKUP_FOLDER = 'Backups'
 BACKUP_FILE_EXTENSION = '.archive'
 PROJECT_ROOT = 'Project Root'
+NOT_ENOUGH_FREE_SPACE_ERROR_CODE = 19
+LIBRARY_CLEANUP_LEASE = 'library-backups'
+CLEANUP_MODES = ('targeted', 'gc')
 
 
 class BackupManager:
@@ -25,7 +44,29 @@ class BackupManager:
             target_root=None,
             gdrive_root=None,
             gdrive_api=None,
-            file_extension=None
+            file_extension=None,
+            retry_policy=None,
+            circuit_breaker=None,
+            max_disk_usage=0.9,
+            workers=4,
+            max_backup_jobs=4,
+            schedule="longest",
+            metrics=None,
+            metrics_dir=None,
+            tracer=None,
+            profiler=None,
+            job_poll_interval=1,
+            name=None,
+            executor=None,
+            upload_slots=None,
+            trace_path=None,
+            shard=None,
+            cleanup_mode="targeted",
+            bandwidth=None,
+            verify_checksum=False,
+            persist_cache=False,
+            retention=None,
+            server_path_flavour=PureWindowsPath
     ):
 
         self.manager_url = manager_url
@@ -33,36 +74,399 @@ class BackupManager:
         self.password = password
         self.client_id = client_id
         self.task = task
+        # One path or pattern, or a list of them (see ProjectPathIndex)
         self.project_path = project_path
+        self.project_patterns = [project_path] if isinstance(project_path, str) else list(project_path or [])
         self.target_root = target_root
         self.gdrive_root = gdrive_root
         self.gdrive_api = gdrive_api if gdrive_api else GoogleDriveAPI('credentials.json', 'token.json')
         self.file_extension = file_extension
+        # Name of the log, history and metrics files; differs from the client id for tenants
+        self.name = name or client_id
+        # BIMcloud reports Windows paths; a local mock server may report POSIX ones
+        self.server_path_flavour = server_path_flavour
 
         # Set up logger
-        self.logger = setup_logger("backup_manager", f'{self.client_id}.log')
+        self.logger = setup_logger("backup_manager", f'{self.name}.log')
+        if name:
+            self.logger = TenantLoggerAdapter(self.logger, name)
         self.logger.info("Initializing Backup Manager")
 
+        # Statistics from previous runs drive size estimates for admission control
+        self.history = RunHistory(os.path.join(get_log_directory(), f'{self.name}.history.json'))
+        self.admission = DiskSpaceAdmission(self.history, max_usage=max_disk_usage)
+        # Archives on Drive with their size and checksum, checked by scrubs
+        self.manifest = UploadManifest(os.path.join(get_log_directory(), f'{self.name}.manifest.json'))
+        self.deferred_projects = []
+        self.skipped_projects = []
+
+        # Parallel project pipelines; server-side backup jobs are additionally
+        # limited by an AIMD controller driven by Manager latency and errors
+        self.workers = max(1, workers)
+        self.job_limiter = AimdLimiter("backup_jobs", ceiling=max(1, max_backup_jobs))
+        self.schedule = schedule
+
+        # Per-stage timings and HTTP statistics, exported at the end of every run
+        self.metrics = metrics or MetricsRegistry(
+            {"client": self.client_id, "tenant": name} if name else {"client": self.client_id})
+        self.metrics_dir = metrics_dir or get_log_directory()
+        self.project_results = {}
+        if self.gdrive_api.metrics is None:
+            self.gdrive_api.set_metrics(self.metrics)
+
+        # Optional request and stage spans, written as a trace file after the run
+        self.tracer = tracer
+        self.trace_path = trace_path or os.path.join(get_log_directory(), f'{self.name}.trace.json')
+        self.profiler = profiler
+        self.job_poll_interval = job_poll_interval
+
+        # A worker pool and upload slots may be shared with other tenants of the same process
+        self.executor = executor
+        self._owns_executor = executor is None
+        self.upload_slots = upload_slots
+        self.circuit_open = threading.Event()
+
+        # Optional lease coordinator splitting the projects of a run between several workers
+        self.shard = shard
+
+        # Backups created in this run and not yet deleted (backup id -> resource id). Targeted
+        # cleanup deletes only these; 'gc' additionally scans the server for every project backup.
+        if cleanup_mode not in CLEANUP_MODES:
+            raise ValueError(f"Unknown cleanup mode: {cleanup_mode}")
+        self.cleanup_mode = cleanup_mode
+        self.created_backups = {}
+        self.backups_created = 0  # Manager backups created in the current run
+        self._created_backups_lock = threading.Lock()
+
+        # Optional upload bandwidth governor (shared with the Drive client) with a daily byte budget
+        self.bandwidth = bandwidth
+
+        # Hash archives before upload and compare their MD5 with Drive's md5Checksum
+        self.verify_checksum = verify_checksum
+
+        # Optional retention policy (see parse_retention): overwritten archives are kept as Drive snapshots
+        self.retention = VersionRetention(self.gdrive_api, gdrive_root, retention) if retention else None
+
+        # Manager metadata that rarely changes is cached, optionally across runs in logs/<name>.cache.json
+        self.cache = TTLCache(
+            DEFAULT_CACHE_TTLS,
+            path=os.path.join(get_log_directory(), f'{self.name}.cache.json') if persist_cache else None,
+            encode=encode_record, decode=decode_record)
+
         # Initialize API connection
-        self.api = CustomManagerApi(self.manager_url)
-        self.auth_context = self.api.get_token_by_password_grant(self.username, self.password, self.client_id)
+        self.api = CustomManagerApi(self.manager_url, retry_policy, circuit_breaker, self.metrics,
+                                    compact_records=True, cache=self.cache)
+        if self.tracer:
+            self.api.add_request_hook(self.tracer)
+            if self.tracer not in self.gdrive_api.request_hooks:
+                self.gdrive_api.add_request_hook(self.tracer)
+        self.auth_context = None
+        self.login()
+
+    def login(self):
+        """
+        Log in to the Manager with the password grant. A later login updates the
+        existing auth context in place, so every holder of it keeps a valid session.
+        """
+        auth_context = self.api.get_token_by_password_grant(self.username, self.password, self.client_id)
+        if self.auth_context is None:
+            self.auth_context = auth_context
+        else:
+            vars(self.auth_context).update(vars(auth_context))
 
-    def run_backup(self):
-        self.logger.info("Backup process started.")
-        try:
-            projects = self.select_projects()
-            self.logger.info(f"Number of projects selected for backup: {len(projects)}")
-            for project in projects:
-                self.backup_project(project)
+    def run_backup(self, projects=None, idle_cleanup=True):
+        """
+        Back up projects, then clean up the server's backups and report the run.
 
-            # After all backups are completed and copied, delete them from BIMcloud server
-            self.delete_all_project_backups()
-            self.delete_all_library_backups()
+        Args:
+            projects (list): Projects to back up. Selected according to the task if omitted.
+            idle_cleanup (bool): Clean up even if the run created no backup.
+        """
+        self.start_run()
+        if self.bandwidth:
+            self.bandwidth.reset_reservations()
+        try:
+            if projects is None:
+                projects = self.select_projects_for_run()
+            projects = self.apply_upload_budget(self.schedule_projects(projects))
+            self.run_projects(projects)
+            if idle_cleanup or self.backups_created:
+                self.cleanup()
 
         except Exception as e:
             self.logger.error(f"Error during backup process: {e}")
         finally:
-            self.logger.info("Backup process finished.")
+            self.finish_run()
+
+    def start_run(self):
+        self.logger.info("Backup process started.")
+        self.run_started = datetime.now(timezone.utc)
+        self.project_results = {}
+        self.deferred_projects = []
+        self.skipped_projects = []
+        self.backups_created = 0
+        self.circuit_open.clear()
+        if self.shard:
+            self.shard.start()
+            self.logger.info(f"Sharded run '{self.shard.run_id}' as worker '{self.shard.worker_id}'.")
+
+    def select_projects_for_run(self):
+        with self.profile("select_projects"):
+            projects = self.select_projects()
+        self.logger.info(f"Number of projects selected for backup: {len(projects)}")
+        return projects
+
+    def cleanup(self):
+        # After all backups are completed and copied, delete them from BIMcloud server
+        with self.profile("cleanup"):
+            self.delete_created_backups()
+            if self.shard:
+                # Other workers may still be creating backups, so a server-wide scan is
+                # unsafe and only one worker cleans the library backups
+                if self.cleanup_mode == "gc":
+                    self.logger.warning("Skipping backup garbage collection in a split run.")
+                if self.shard.claim(LIBRARY_CLEANUP_LEASE):
+                    self.delete_all_library_backups()
+                    self.shard.complete(LIBRARY_CLEANUP_LEASE, "success")
+                return
+            if self.cleanup_mode == "gc":
+                self.delete_all_project_backups()
+            self.delete_all_library_backups()
+
+    def finish_run(self):
+        """
+        Log the run statistics and write the history, metrics and trace files.
+        """
+        self.log_drive_throttling()
+        self.log_job_concurrency()
+        if self.bandwidth:
+            self.bandwidth.save()
+            stats = self.bandwidth.stats()
+            self.logger.info(
+                f"Upload bandwidth: {stats['bytes_today'] / 1024 ** 3:.2f} GiB uploaded today, "
+                f"{stats['delayed']} of {stats['chunks']} chunks paced ({stats['wait_seconds']:.1f}s waiting)")
+        if self.deferred_projects:
+            self.logger.warning(
+                f"{len(self.deferred_projects)} project(s) deferred for lack of backup space or upload budget: "
+                f"{', '.join(self.deferred_projects)}")
+        if self.skipped_projects:
+            self.logger.info(
+                f"{len(self.skipped_projects)} project(s) skipped, held or finished by other workers of run "
+                f"'{self.shard.run_id}'.")
+        self.log_cache_stats()
+        self.history.save()
+        self.manifest.save()
+        self.cache.save()
+        self.export_metrics()
+        self.export_trace()
+        if self.shard:
+            self.shard.stop()
+        self.logger.info("Backup process finished.")
+
+    def close(self):
+        """Stop the worker threads and close the Manager connections."""
+        if self.executor and self._owns_executor:
+            self.executor.shutdown()
+            self.executor = None
+        self.api.close()
+
+    @staticmethod
+    def project_label(project):
+        return project['$path'][len(PROJECT_ROOT) + 1:] or project['name']
+
+    def profile(self, stage):
+        return self.profiler.stage(stage) if self.profiler else nullcontext()
+
+    @contextmanager
+    def stage(self, project, stage):
+        """
+        Time one pipeline stage of a project. Successful durations are exported as
+        metrics and kept in the run history for scheduling.
+        """
+        if self.shard:
+            self.shard.ensure_held(project["id"])
+        start_time = time.time()
+        started = time.monotonic()
+        yield
+        self.record_stage(project, stage, start_time, time.monotonic() - started)
+
+    def record_stage(self, project, stage, start_time, duration):
+        """Export the duration of a successful pipeline stage and keep it in the run history."""
+        label = self.project_label(project)
+        if self.tracer:
+            self.tracer.add_span(f"{stage}: {label}", "stage", start_time, duration, {"project": label})
+        self.metrics.observe("stage_duration_seconds", duration, project=label, stage=stage)
+        self.history.record(project["id"], **{f"{stage}_seconds": duration})
+        self.project_results.setdefault(label, {}).setdefault("stages", {})[stage] = round(duration, 3)
+
+    def set_project_result(self, project, result):
+        label = self.project_label(project)
+        self.metrics.inc("projects", result=result)
+        self.project_results.setdefault(label, {})["result"] = result
+
+    def export_trace(self):
+        if not self.tracer:
+            return
+        trace_path = self.trace_path
+        try:
+            self.tracer.write(trace_path)
+            self.logger.info(f"Request trace written to {trace_path}")
+        except OSError as e:
+            self.logger.error(f"Failed to write request trace: {e}")
+
+    def export_metrics(self):
+        """
+        Write the Prometheus textfile (for node_exporter) and the JSON run summary.
+        """
+        finished = datetime.now(timezone.utc)
+        duration = (finished - self.run_started).total_seconds()
+        self.metrics.set("run_duration_seconds", duration)
+        self.metrics.set("run_finished_timestamp_seconds", finished.timestamp())
+        for key, value in self.gdrive_api.throttling_stats().items():
+            self.metrics.set(f"drive_throttling_{key}", value)
+        for key, value in self.job_limiter.stats().items():
+            self.metrics.set(f"backup_jobs_{key}", value)
+        if self.bandwidth:
+            for key, value in self.bandwidth.stats().items():
+                self.metrics.set(f"upload_bandwidth_{key}", value)
+        if self.retention:
+            for key, value in self.retention.stats().items():
+                self.metrics.set(f"retention_{key}", value)
+        for endpoint, counters in self.cache.stats().items():
+            for key, value in counters.items():
+                self.metrics.set(f"manager_cache_{key}", value, endpoint=endpoint)
+
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            write_prometheus_textfile(self.metrics, os.path.join(self.metrics_dir, f'{self.name}.prom'))
+            write_json_summary({
+                "client_id": self.client_id,
+                "name": self.name,
+                "task": self.task,
+                "started": self.run_started.isoformat(),
+                "finished": finished.isoformat(),
+                "duration_seconds": duration,
+                "skipped_projects": len(self.skipped_projects),
+                "projects": self.project_results,
+                "metrics": self.metrics.to_dict(),
+            }, os.path.join(self.metrics_dir, f'{self.name}.summary.json'))
+        except OSError as e:
+            self.logger.error(f"Failed to write metrics: {e}")
+
+    def schedule_projects(self, projects):
+        """
+        Order projects using durations from previous runs and log the estimated completion time.
+        """
+        projects = order_projects(projects, self.history, self.schedule)
+        durations = estimate_durations(projects, self.history)
+        makespan = estimate_makespan([durations[project["id"]] for project in projects], self.workers)
+        finish = datetime.now() + timedelta(seconds=makespan)
+        self.logger.info(
+            f"Scheduled {len(projects)} project(s) with policy '{self.schedule}' on {self.workers} worker(s). "
+            f"Estimated duration {timedelta(seconds=round(makespan))}, completion at {finish:%Y-%m-%d %H:%M}."
+        )
+        return projects
+
+    def apply_upload_budget(self, projects):
+        """
+        Keep the projects whose estimated archives fit today's remaining upload budget
+        and defer the others to a later run, rather than hitting the cap mid-upload.
+        """
+        if not self.bandwidth:
+            return projects
+        projects, postponed = self.bandwidth.plan(projects, lambda project: self.admission.estimate(project["id"]))
+        for project in postponed:
+            self.deferred_projects.append(project["name"])
+            self.set_project_result(project, "deferred")
+        if postponed:
+            remaining = self.bandwidth.remaining_today() or 0
+            self.logger.warning(
+                f"{len(postponed)} project(s) deferred: their archives do not fit today's remaining upload budget "
+                f"({remaining / 1024 ** 3:.2f} GiB left after planning).")
+        return projects
+
+    def run_projects(self, projects):
+        """
+        Back up projects on a pool of worker threads. Once a backend's circuit breaker
+        opens, projects that have not started yet are deferred to the next run.
+        """
+        # The pool outlives a run so worker threads keep their Drive services warm
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backup")
+        results = list(self.executor.map(self.process_project, projects))
+
+        not_run = results.count(False)
+        if not_run:
+            self.logger.warning(f"{not_run} project(s) were not backed up because a backend is unavailable.")
+
+    def process_project(self, project):
+        """
+        Run the pipeline of one project on a worker thread.
+
+        Returns:
+            bool: False if the project was not run because a backend circuit breaker is open.
+        """
+        if self.circuit_open.is_set():
+            self.set_project_result(project, "not_run")
+            return False
+        if self.shard and not self.shard.claim(project["id"]):
+            self.logger.info(
+                f"Skipping project '{project['name']}': another worker holds it or finished it in run "
+                f"'{self.shard.run_id}'.")
+            self.skipped_projects.append(project["name"])
+            self.set_project_result(project, "skipped")
+            return True
+        try:
+            with self.profile("backup_project"):
+                self.backup_project(project)
+        except CircuitOpenError as e:
+            self.set_project_result(project, "not_run")
+            if not self.circuit_open.is_set():
+                self.circuit_open.set()
+                self.logger.error(f"{e}. Deferring remaining projects to the next run.")
+            return False
+        finally:
+            if self.shard:
+                self.finish_lease(project)
+        return True
+
+    def finish_lease(self, project):
+        """
+        Complete the project's lease, or release it if the project failed, was deferred or
+        was not run, so another worker can still take it in this run.
+        """
+        result = self.project_results.get(self.project_label(project), {}).get("result")
+        try:
+            if result in (None, "failed", "deferred", "not_run"):
+                self.shard.release(project["id"])
+            else:
+                self.shard.complete(project["id"], result)
+        except Exception as e:
+            self.logger.error(f"Failed to update the lease of project '{project['name']}': {e}")
+
+    def log_job_concurrency(self):
+        stats = self.job_limiter.stats()
+        self.logger.info(
+            f"Backup job concurrency: final limit {stats['limit']}, peak in flight {stats['peak_in_flight']}, "
+            f"{stats['increases']} increases, {stats['decreases']} decreases, "
+            f"get_job latency {stats['latency_ewma']:.2f}s (baseline {stats['latency_baseline']:.2f}s)"
+        )
+
+    def log_cache_stats(self):
+        stats = self.cache.stats()
+        if not stats:
+            return
+        self.logger.info("Manager metadata cache: " + ", ".join(
+            f"{endpoint} {counters['hits']}/{counters['hits'] + counters['misses']} hits"
+            for endpoint, counters in sorted(stats.items())))
+
+    def log_drive_throttling(self):
+        stats = self.gdrive_api.throttling_stats()
+        self.logger.info(
+            f"Google Drive throttling: {stats['acquired']} requests, {stats['delayed']} delayed "
+            f"({stats['wait_seconds']:.1f}s waiting), {stats['throttled']} quota errors, "
+            f"current rate {stats['rate']:.2f} req/s"
+        )
 
     def select_projects(self):
         self.logger.info("Selecting projects for backup.")
@@ -76,16 +480,24 @@ class BackupManager:
             self.logger.info(f"Number of projects edited in the last specified duration: {len(edited_projects)}")
             return edited_projects
         elif self.task == "selected":
-            if not self.project_path:
-                raise ValueError("Project path must be provided for the selected task type.")
-            full_project_path = f"{PROJECT_ROOT}/{self.project_path}"
-            selected_projects = [project for project in projects if project['$path'] == full_project_path]
+            selected_projects = self.select_matching(projects)
             self.logger.info(
-                f"Number of projects matching the selected path '{full_project_path}': {len(selected_projects)}")
+                f"Number of projects matching {len(self.project_patterns)} selected path(s): {len(selected_projects)}")
             return selected_projects
         else:
             raise ValueError(f"Unknown task type: {self.task}")
 
+    def select_matching(self, projects, warn_unmatched=True):
+        """
+        Return the projects matching any of the selected paths or patterns, in list order.
+        """
+        if not self.project_patterns:
+            raise ValueError("Project path must be provided for the selected task type.")
+        selected_projects, unmatched = ProjectPathIndex(projects, PROJECT_ROOT).select(self.project_patterns)
+        for pattern in unmatched if warn_unmatched else ():
+            self.logger.warning(f"No project matches the selected path '{pattern}'.")
+        return selected_projects
+
     def was_recently_edited(self, project, duration_seconds=86400):
         """
         Determines if a project was edited within the given duration.
@@ -100,15 +512,23 @@ class BackupManager:
         now_date_utc = datetime.now().astimezone(timezone.utc).replace(tzinfo=None)
         last_edit_datetime = datetime.fromtimestamp(project["$modifiedDate"] / 1000).replace(tzinfo=None)
         recently_edited = (now_date_utc - last_edit_datetime).total_seconds() < duration_seconds
-        self.logger.info(f"Project '{project['name']}' edited within {duration_seconds} seconds: {recently_edited}")
+        self.logger.debug(f"Project '{project['name']}' edited within {duration_seconds} seconds: {recently_edited}")
         return recently_edited
 
     def backup_project(self, project):
         project_name = project["name"]
 
+        try:
+            self.admission.admit(project["id"], self.server_path(project['$pathOnServer']))
+        except AdmissionDeniedError as e:
+            self.logger.warning(f"Deferring backup of project '{project_name}': {e}")
+            self.deferred_projects.append(project_name)
+            self.set_project_result(project, "deferred")
+            return
+
         try:
             # Create backup
-            resource_id, backup_name, backup_filename = self.create_bimproject_backup(project)
+            resource_id, backup_name, backup_filename, backup_id = self.create_bimproject_backup(project)
 
             # Get source and target paths
             # source, target = self.get_backup_file_paths(project, backup_filename)
@@ -122,28 +542,70 @@ class BackupManager:
 
             # Get source and gdrive relative target paths
             source, target = self.get_backup_file_paths_gdrive(project, backup_filename)
+            archive_size = os.path.getsize(source)
+            self.admission.materialize(project["id"], archive_size)
+            self.project_results.setdefault(self.project_label(project), {})["archive_bytes"] = archive_size
+
+            # Hash the archive once; the digest is compared with Drive's checksum after the upload
+            digest = None
+            if self.verify_checksum:
+                with self.stage(project, "hash"), self.profile("hash"):
+                    digest = hash_file(source)
+                self.project_results[self.project_label(project)]["archive_sha256_tree"] = digest.tree_sha256
+
+            # Keep the archive about to be replaced as a Drive snapshot, timed apart from the upload
+            if self.retention:
+                with self.stage(project, "retention"):
+                    self.retention.keep(str(target.parent), target.name)
 
             # Upload to GDrive
-            upload_file_to_gdrive(source, self.gdrive_root, target, self.gdrive_api)
+            with self.upload_slots or nullcontext(), self.stage(project, "upload"), self.profile("upload"):
+                file_id = upload_file_to_gdrive(source, self.gdrive_root, target, self.gdrive_api,
+                                                metrics=self.metrics, project=self.project_label(project))
 
             # Verify the backup file on Google Drive
-            folder_id = self.gdrive_api.get_or_create_folder(str(target.parent), self.gdrive_root)
-            is_uploaded = check_gdrive_file_update(
-                drive_api=self.gdrive_api,
-                folder_id=folder_id,
-                local_file_path=Path(source),
-                drive_filename=target.name
-            )
+            with self.stage(project, "verify"):
+                folder_id = self.gdrive_api.get_or_create_folder(str(target.parent), self.gdrive_root)
+                is_uploaded = check_gdrive_file_update(
+                    drive_api=self.gdrive_api,
+                    folder_id=folder_id,
+                    local_file_path=Path(source),
+                    drive_filename=target.name,
+                    expected_md5=digest.md5 if digest else None
+                )
             if not is_uploaded:
                 self.logger.warning(
                     f"Backup verification failed for project '{project_name}'. Not deleting from BIMcloud.")
+                self.set_project_result(project, "unverified")
                 return
+            self.manifest.record(
+                drive_key(target.parent, target.name), file_id=file_id, size=archive_size,
+                md5=digest.md5 if digest else None, md5_source='local' if digest else None,
+                tree_sha256=digest.tree_sha256 if digest else None, project=self.project_label(project))
 
             # Delete the backup
-            self.delete_resource_backup_by_name(resource_id, backup_name)
-
+            with self.stage(project, "delete"):
+                if backup_id:
+                    self.delete_created_backup(backup_id)
+                else:
+                    self.delete_resource_backup_by_name(resource_id, backup_name)
+            self.set_project_result(project, "success")
+
+        except CircuitOpenError:
+            raise
+        except BIMcloudManagerError as e:
+            if e.code == NOT_ENOUGH_FREE_SPACE_ERROR_CODE:
+                self.logger.warning(f"Deferring backup of project '{project_name}': {e.message}")
+                self.deferred_projects.append(project_name)
+                self.set_project_result(project, "deferred")
+            else:
+                self.logger.error(f"Error during backup process for project '{project_name}': {e.message}")
+                self.set_project_result(project, "failed")
         except Exception as e:
             self.logger.error(f"Error during backup process for project '{project_name}': {e}")
+            self.set_project_result(project, "failed")
+        finally:
+            self.admission.release(project["id"])
 
     def create_bimproject_backup(self, project):
         project_id = project["id"]
@@ -152,35 +614,67 @@ class BackupManager:
         backup_name = f"{project_name}-{datetime.now().strftime('%y%m%d-%H%M%S')}"
         self.logger.info(f"Creating backup for project: {project_name}")
 
-        job = self.api.create_resource_backup(self.auth_context, project_id, backup_type, backup_name)
-
-        while job['status'] not in ['completed', 'failed']:
-            time.sleep(1)
-            job = self.api.get_job(self.auth_context, job['id'])
+        queued = time.monotonic()
+        with self.job_limiter:
+            start_time = time.time()
+            started = time.monotonic()
+            self.metrics.observe("backup_queue_wait_seconds", started - queued, project=self.project_label(project))
+            if self.shard:
+                self.shard.ensure_held(project_id)
+            try:
+                job = self.api.create_resource_backup(self.auth_context, project_id, backup_type, backup_name)
+
+                while job['status'] not in ['completed', 'failed']:
+                    time.sleep(self.job_poll_interval)
+                    call_started = time.monotonic()
+                    job = self.api.get_job(self.auth_context, job['id'])
+                    self.job_limiter.observe_latency(time.monotonic() - call_started)
+            except Exception as e:
+                self.job_limiter.on_error(e)
+                raise
+
+            duration = time.monotonic() - started
+            if job['status'] == 'completed':
+                self.job_limiter.on_success(duration, self.history.get(project_id, "backup_seconds"))
+                # Only the job itself: the wait for a job slot would hide congestion from the limiter
+                self.record_stage(project, "backup", start_time, duration)
+            else:
+                self.job_limiter.on_error(job.get('result'))
 
         if job['status'] == 'completed':
             resource_id = job["data"]["resourceId"]
+            # The job finished after create_resource_backup returned; a listing cached meanwhile lacks the backup
+            self.api.invalidate_backups([resource_id])
             backups = self.api.get_resource_backups_by_criterion(self.auth_context, [resource_id], {}, {})
             backup_filename = ""
+            backup_id = None
             for backup in backups:
                 if backup['$name'] == backup_name:
-                    backup_filename = (Path(PureWindowsPath(project['$pathOnServer']))
+                    backup_filename = (self.server_path(project['$pathOnServer'])
                                        / BACKUP_FOLDER / backup['$backupFileName'])
+                    backup_id = backup['id']
+                    with self._created_backups_lock:
+                        self.created_backups[backup_id] = resource_id
+                        self.backups_created += 1
             self.logger.info(f"Backup completed for project: {project_name}")
-            return resource_id, backup_name, backup_filename
+            return resource_id, backup_name, backup_filename, backup_id
         else:
             self.logger.error(f"Backup failed for project: {project_name}, Error: {job['result']}")
             raise RuntimeError("Backup job failed")
 
+    def server_path(self, path):
+        """Convert a path reported by the BIMcloud server into a local Path."""
+        return Path(self.server_path_flavour(path))
+
     def get_backup_file_paths(self, project, backup_filename):
-        source = (Path(PureWindowsPath(project['$pathOnServer']))
+        source = (self.server_path(project['$pathOnServer'])
                   / BACKUP_FOLDER / backup_filename)
         relative_path = PureWindowsPath(project['$path'][len(PROJECT_ROOT) + 1:])
         target = Path(self.target_root) / relative_path.with_suffix(self.file_extension)
         return source, target
 
     def get_backup_file_paths_gdrive(self, project, backup_filename):
-        source = (Path(PureWindowsPath(project['$pathOnServer']))
+        source = (self.server_path(project['$pathOnServer'])
                   / BACKUP_FOLDER / backup_filename)
         relative_path = PureWindowsPath(project['$path'][len(PROJECT_ROOT) + 1:])
         target = relative_path.with_suffix(self.file_extension)
@@ -193,16 +687,64 @@ class BackupManager:
                 self.api.delete_resource_backup(self.auth_context, resource_id, backup['id'])
                 self.logger.info(f"Deleted backup '{backup_name}' for resource ID {resource_id}")
 
+    def delete_created_backup(self, backup_id):
+        """
+        Delete a backup created in this run by its id, without listing the server's backups.
+        """
+        with self._created_backups_lock:
+            resource_id = self.created_backups[backup_id]
+        self.api.delete_resource_backup(self.auth_context, resource_id, backup_id)
+        with self._created_backups_lock:
+            self.created_backups.pop(backup_id, None)
+        self.logger.info(f"Deleted backup with ID {backup_id} for resource ID {resource_id}")
+
+    def delete_backups_concurrently(self, backups):
+        """
+        Delete (backup id, resource id) pairs on the worker pool.
+
+        Returns:
+            int: Number of failed deletions.
+        """
+        def delete(backup):
+            backup_id, resource_id = backup
+            try:
+                self.api.delete_resource_backup(self.auth_context, resource_id, backup_id)
+                self.logger.info(f"Deleted backup with ID {backup_id} for project {resource_id}.")
+                return True
+            except Exception as e:
+                self.logger.error(f"Failed to delete backup with ID {backup_id} for project {resource_id}: {e}")
+                return False
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backup")
+        return list(self.executor.map(delete, backups)).count(False)
+
+    def delete_created_backups(self):
+        """
+        Delete the backups this run created but did not delete in their pipeline,
+        e.g. because the upload could not be verified.
+        """
+        with self._created_backups_lock:
+            backups = list(self.created_backups.items())
+            self.created_backups.clear()
+        if not backups:
+            return
+        self.logger.info(f"Deleting {len(backups)} remaining backup(s) created in this run.")
+        failed = self.delete_backups_concurrently(backups)
+        if failed:
+            self.logger.warning(f"{failed} backup(s) could not be deleted; run with --cleanup gc to remove them.")
+
     def delete_all_project_backups(self):
+        """
+        Garbage collection: delete every project backup on the server, including
+        backups left behind by earlier runs.
+        """
         self.logger.info("Deleting project backups.")
         try:
-            backups = self.api.get_backups(self.auth_context)
-            for backup in backups:
-                if backup["$resourceType"] == "project":
-                    resource_id = backup["$resourceId"]
-                    backup_id = backup["id"]
-                    self.api.delete_resource_backup(self.auth_context, resource_id, backup_id)
-                    self.logger.info(f"Deleted backup with ID {backup_id} for project {resource_id}.")
+            backups = [(backup["id"], backup["$resourceId"]) for backup in self.api.get_backups(self.auth_context)
+                       if backup["$resourceType"] == "project"]
+            self.logger.info(f"Found {len(backups)} project backup(s) on the server.")
+            self.delete_backups_concurrently(backups)
         except Exception as e:
             self.logger.error(f"Error deleting project backups: {e}")
 
@@ -215,11 +757,11 @@ class BackupManager:
                 folder_path = os.path.join(library_root_path, folder_name)
 
                 if os.path.isdir(folder_path):
-                    self.logger.info(f"Checking folder: {folder_path}")
+                    self.logger.debug(f"Checking folder: {folder_path}")
                     backups_folder = os.path.join(folder_path, 'Backups')
 
                     if os.path.exists(backups_folder) and os.path.isdir(backups_folder):
-                        self.logger.info(f"'Backups' folder found in {folder_path}")
+                        self.logger.debug(f"'Backups' folder found in {folder_path}")
 
                         try:
                             for file_name in os.listdir(backups_folder):
@@ -236,7 +778,7 @@ class BackupManager:
                         except Exception as e:
                             self.logger.error(f"Failed to list contents of {backups_folder}: {e}")
                     else:
-                        self.logger.info(f"No 'Backups' folder found in {folder_path}")
+                        self.logger.debug(f"No 'Backups' folder found in {folder_path}")
                 else:
                     self.logger.warning(f"{folder_path} is not a directory. Skipping.")
 
@@ -0,0 +1,219 @@
+import logging
+import random
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from utils.gdrive import FOLDER_MIME_TYPE
+from utils.manifest import drive_key
+from utils.metrics import write_json_summary
+from utils.rate_limiter import TokenBucket
+from utils.retention import VERSIONS_FOLDER
+
+# Results that mean the copy on Drive no longer matches what was uploaded
+DRIFT_STATUSES = ('missing', 'replaced', 'size_mismatch', 'checksum_mismatch', 'unreadable')
+
+logger = logging.getLogger("backup_manager")
+
+
+class DriveScrubber:
+    """
+    Checks the archives stored on Drive against the upload manifest.
+
+    The Drive backup tree is walked folder by folder. Size and ``md5Checksum`` come
+    with the listing, so every file is compared without further requests. Files
+    without a checksum from Drive (and, for a deep scrub, files with one) are
+    downloaded as a stream and hashed; ``sample`` limits how many of them are
+    downloaded per scrub. Manifest entries that no longer exist on Drive are reported
+    as missing. Files not in the manifest yet, or recorded without a checksum, are
+    added with Drive's checksum as the baseline for later scrubs.
+
+    Drive requests of the scrub are limited to ``request_share`` of the Drive
+    client's request rate, on top of the client's own limiter. Folders in
+    ``skip_folders`` (by default the retention snapshots) are not walked. A folder
+    whose listing fails is reported as unreadable, together with the manifest entries
+    below it, and the rest of the tree is still scrubbed.
+
+    Args:
+        drive_api (GoogleDriveAPI | GoogleDrivePool): Drive client.
+        root_folder_id (str): Drive backup root folder id.
+        manifest (UploadManifest): Manifest written by the uploads.
+        workers (int): Folders listed and files downloaded in parallel.
+        sample (float): Fraction of the files needing a download that are downloaded.
+        deep (bool): Download and hash files even if Drive reports a checksum.
+        request_share (float): Share of the Drive request rate used by the scrub.
+        bandwidth (BandwidthGovernor): Optional download rate limit.
+        report_path (str): JSON report written at the end of the scrub.
+        skip_folders (iterable): Folder paths below the root that are not scrubbed.
+    """
+
+    def __init__(self, drive_api, root_folder_id, manifest, workers=4, sample=1.0, deep=False, request_share=0.25,
+                 bandwidth=None, report_path=None, skip_folders=(VERSIONS_FOLDER,)):
+        if not 0 < sample <= 1 or not 0 < request_share <= 1:
+            raise ValueError("sample and request_share must be within (0, 1].")
+        self.drive_api = drive_api
+        self.root_folder_id = root_folder_id
+        self.manifest = manifest
+        self.workers = max(1, workers)
+        self.sample = sample
+        self.deep = deep
+        rate = max(0.1, request_share * drive_api.throttling_stats()["rate"])
+        self.limiter = TokenBucket(rate=rate, capacity=max(1.0, rate))
+        self.bandwidth = bandwidth
+        self.report_path = report_path
+        self.skip_folders = set(skip_folders)
+        self._results = []
+        self._results_lock = threading.Lock()
+        self._unreadable_folders = {}  # folder path -> error of its failed listing
+
+    def walk(self, executor):
+        """
+        List the backup tree with parallel folder listings.
+
+        Returns:
+            list: Drive file dicts with an added ``path`` (the manifest key).
+        """
+        files = []
+        self._unreadable_folders = {}
+        pending = {executor.submit(self._list, self.root_folder_id): ''}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                folder_path = pending.pop(future)
+                try:
+                    items = future.result()
+                except Exception as e:
+                    # The rest of the tree is still scrubbed; the manifest entries below are reported in run()
+                    self._unreadable_folders[folder_path] = str(e)
+                    self.report(folder_path or '/', 'unreadable', folder=True, error=str(e))
+                    continue
+                for item in items:
+                    if item.get('mimeType') == FOLDER_MIME_TYPE:
+                        path = f"{folder_path}/{item['name']}" if folder_path else item['name']
+                        if path in self.skip_folders:
+                            continue
+                        pending[executor.submit(self._list, item['id'])] = path
+                    else:
+                        files.append({**item, 'path': drive_key(folder_path, item['name'])})
+        return files
+
+    def _listing_error(self, path):
+        """Return the error of a failed listing of one of the folders above ``path``, or None."""
+        for folder_path, error in self._unreadable_folders.items():
+            if not folder_path or path.startswith(folder_path + '/'):
+                return error
+        return None
+
+    def _list(self, folder_id):
+        self.limiter.acquire()
+        return list(self.drive_api.list_folder(folder_id))
+
+    def report(self, path, status, **details):
+        with self._results_lock:
+            self._results.append({'path': path, 'status': status, **details})
+        if status in DRIFT_STATUSES:
+            detail_text = ', '.join(f"{key}={value}" for key, value in details.items())
+            logger.warning(f"Scrub: '{path}' {status.replace('_', ' ')} {detail_text}".rstrip())
+
+    def check_metadata(self, item):
+        """
+        Compare a listed file with its manifest entry.
+
+        Returns:
+            bool: True if the file's content still needs to be downloaded and hashed.
+        """
+        path = item['path']
+        size = int(item['size']) if item.get('size') is not None else None
+        drive_md5 = item.get('md5Checksum')
+        entry = self.manifest.get(path)
+        if entry is None:
+            self.manifest.record(path, file_id=item['id'], size=size, md5=drive_md5, md5_source='drive')
+            self.report(path, 'untracked')
+            return drive_md5 is None or self.deep
+
+        if entry.get('file_id') and entry['file_id'] != item['id']:
+            self.report(path, 'replaced', expected_id=entry['file_id'], found_id=item['id'])
+            return False
+        if entry.get('size') is not None and size is not None and entry['size'] != size:
+            self.report(path, 'size_mismatch', expected=entry['size'], found=size)
+            return False
+        if drive_md5 and entry.get('md5') and entry['md5'] != drive_md5:
+            self.report(path, 'checksum_mismatch', expected=entry['md5'], found=drive_md5)
+            return False
+        if drive_md5 and not entry.get('md5'):
+            self.manifest.record(path, md5=drive_md5, md5_source='drive')
+            self.report(path, 'baselined')
+            return self.deep
+        if drive_md5 is None or self.deep:
+            return True
+        self.report(path, 'ok')
+        return False
+
+    def check_content(self, item):
+        """Download a file as a stream, hash it and compare it with the manifest."""
+        path = item['path']
+        self.limiter.acquire()
+        try:
+            size, md5 = self.drive_api.download_md5(item['id'], bandwidth=self.bandwidth)
+        except Exception as e:
+            self.report(path, 'unreadable', error=str(e))
+            return
+        entry = self.manifest.get(path) or {}
+        if entry.get('size') is not None and entry['size'] != size:
+            self.report(path, 'size_mismatch', expected=entry['size'], found=size, downloaded=True)
+        elif entry.get('md5') and entry['md5'] != md5:
+            self.report(path, 'checksum_mismatch', expected=entry['md5'], found=md5, downloaded=True)
+        elif item.get('md5Checksum') and item['md5Checksum'] != md5:
+            # Drive's stored checksum does not describe the bytes it serves
+            self.report(path, 'checksum_mismatch', expected=item['md5Checksum'], found=md5, downloaded=True)
+        else:
+            if not entry.get('md5'):
+                self.manifest.record(path, md5=md5, md5_source='download')
+            self.report(path, 'ok', downloaded=True)
+
+    def run(self):
+        """
+        Walk, compare and report.
+
+        Returns:
+            dict: Report with counts per status and every drifted file.
+        """
+        started = datetime.now(timezone.utc)
+        self._results = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scrub") as executor:
+            files = self.walk(executor)
+            logger.info(f"Scrub: {len(files)} file(s) found on Drive.")
+
+            to_download = [item for item in files if self.check_metadata(item)]
+            if self.sample < 1 and to_download:
+                to_download = random.sample(to_download, max(1, round(len(to_download) * self.sample)))
+            logger.info(f"Scrub: downloading {len(to_download)} file(s) to hash their content.")
+            wait([executor.submit(self.check_content, item) for item in to_download])
+
+        found = {item['path'] for item in files}
+        for path, entry in self.manifest.items():
+            if path in found:
+                continue
+            error = self._listing_error(path)
+            if error is not None:
+                self.report(path, 'unreadable', error=f"folder listing failed: {error}")
+            else:
+                self.report(path, 'missing', file_id=entry.get('file_id'))
+        self.manifest.save()
+
+        counts = Counter(result['status'] for result in self._results)
+        report = {
+            'started': started.isoformat(),
+            'finished': datetime.now(timezone.utc).isoformat(),
+            'files': len(files),
+            'downloaded': len(to_download),
+            'counts': dict(counts),
+            'drift': [result for result in self._results if result['status'] in DRIFT_STATUSES],
+        }
+        if self.report_path:
+            write_json_summary(report, self.report_path)
+        drift = len(report['drift'])
+        (logger.warning if drift else logger.info)(
+            f"Scrub finished: {len(files)} file(s), {len(to_download)} downloaded, {drift} with drift "
+            f"({', '.join(f'{status}: {count}' for status, count in sorted(counts.items()))}).")
+        return report
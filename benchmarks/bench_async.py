@@ -0,0 +1,120 @@
+"""
+Concurrency benchmark: many in-flight Manager calls on threads against one event loop.
+
+Starts backup jobs for synthetic projects on the mock Manager and polls all of them
+until they complete, once with CustomManagerApi on a thread per job and once with
+AsyncManagerApi on a single event loop::
+
+    python -m benchmarks.bench_async --jobs 100 1000 --latency 0.05 --job_duration 2
+
+For each mode it prints the run time, the get-job polls per second and the peak
+number of threads of the process.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bimcloud_custom.custom_managerapi import CustomManagerApi  # noqa: E402
+from bimcloud_custom.async_managerapi import AsyncManagerApi  # noqa: E402
+from benchmarks.mock_manager import MockManagerServer  # noqa: E402
+from utils.async_http import DEFAULT_CONNECTION_LIMIT  # noqa: E402
+
+
+class ThreadPeak:
+    """Samples the number of live threads in the background and keeps the maximum."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_threads(manager_url, projects, poll_interval):
+    api = CustomManagerApi(manager_url)
+    auth_context = api.get_token_by_password_grant('benchmark', 'benchmark', 'benchmark')
+    polls = 0
+    polls_lock = threading.Lock()
+
+    def watch(project):
+        nonlocal polls
+        job = api.create_resource_backup(auth_context, project['id'], 'bimproject', f"{project['name']}-threads")
+        while job['status'] not in ('completed', 'failed'):
+            time.sleep(poll_interval)
+            job = api.get_job(auth_context, job['id'])
+            with polls_lock:
+                polls += 1
+
+    with ThreadPoolExecutor(max_workers=len(projects)) as executor:
+        list(executor.map(watch, projects))
+    api.close()
+    return polls
+
+
+async def run_async(manager_url, projects, poll_interval, connections):
+    async with AsyncManagerApi(manager_url, connection_limit=connections) as api:
+        auth_context = await api.get_token_by_password_grant('benchmark', 'benchmark', 'benchmark')
+        polls = 0
+
+        async def watch(project):
+            nonlocal polls
+            job = await api.create_resource_backup(auth_context, project['id'], 'bimproject',
+                                                   f"{project['name']}-async")
+            while job['status'] not in ('completed', 'failed'):
+                await asyncio.sleep(poll_interval)
+                job = await api.get_job(auth_context, job['id'])
+                polls += 1
+
+        await asyncio.gather(*(watch(project) for project in projects))
+        return polls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threaded and asyncio Manager client benchmark")
+    parser.add_argument('--jobs', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every mock request')
+    parser.add_argument('--job_duration', type=float, default=2, help='Seconds a mock backup job runs')
+    parser.add_argument('--poll_interval', type=float, default=0.25)
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTION_LIMIT,
+                        help='Connections of the asyncio client')
+    args = parser.parse_args()
+
+    print(f"{'jobs':>6} {'mode':<8} {'seconds':>8} {'polls/s':>8} {'threads':>8}")
+    for jobs in args.jobs:
+        with tempfile.TemporaryDirectory(prefix='bench-async-') as data_dir:
+            with MockManagerServer(data_dir, project_count=jobs, archive_size=0, job_duration=args.job_duration,
+                                   latency=args.latency) as manager:
+                projects = manager.state.projects
+                for mode in ('threads', 'asyncio'):
+                    with ThreadPeak() as threads:
+                        started = time.perf_counter()
+                        if mode == 'threads':
+                            polls = run_threads(manager.url, projects, args.poll_interval)
+                        else:
+                            polls = asyncio.run(run_async(manager.url, projects, args.poll_interval, args.connections))
+                        duration = time.perf_counter() - started
+                    # The mock server's own handler threads are included in both counts
+                    print(f"{jobs:>6} {mode:<8} {duration:>8.2f} {polls / duration:>8.1f} {threads.peak:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Decode benchmark for large Manager resource lists.
+
+Builds a synthetic ``get-projects`` response with the fields a real Manager returns
+and compares decoding it into full dicts with decoding it into compact records::
+
+    python -m benchmarks.bench_decode --resources 10000 100000
+
+For every mode it reports the median decode time and the memory held by the result
+and at peak while decoding (measured with tracemalloc, which slows decoding down, so
+time and memory are measured in separate passes).
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bimcloud_custom import records  # noqa: E402
+from bimcloud_custom.records import ProjectRecord, decode_records  # noqa: E402
+
+
+def make_response(count):
+    """Return a JSON body of ``count`` project resources shaped like the Manager's."""
+    now_ms = int(time.time() * 1000)
+    resources = []
+    for index in range(count):
+        project_id = f"{index:08x}-6c1d-4b6e-9a51-{index:012x}"
+        resources.append({
+            'id': project_id,
+            'name': f"Project-{index:06d}",
+            'type': 'project',
+            '$path': f"Project Root/Folder-{index % 50:03d}/Project-{index:06d}",
+            '$pathOnServer': f"C:\\ProgramData\\Graphisoft\\BIMcloud\\Projects\\{project_id}",
+            '$modifiedDate': now_ms - index * 60000,
+            '$createdDate': now_ms - index * 120000,
+            '$parentId': f"folder-{index % 50:03d}",
+            '$hostId': 'host-00000001',
+            '$version': 1000 + index,
+            '$size': 250 * 1024 ** 2 + index,
+            '$isLocked': False,
+            '$accessRights': ['read', 'write', 'manage'],
+            '$lastModifierName': 'Administrator',
+            '$lastModifierId': 'user-00000001',
+            '$projectVersion': {'major': 27, 'minor': 3, 'build': 4011},
+            '$properties': {'client': 'Office', 'phase': 'Design', 'description': 'Synthetic project'},
+        })
+    return json.dumps(resources).encode('utf-8')
+
+
+def decoders():
+    """Return (name, decode function) for every mode available in this environment."""
+    modes = [('json -> dicts', json.loads)]
+    if records.orjson is not None:
+        modes.append(('orjson -> dicts', records.orjson.loads))
+    modes.append(('json -> records', lambda body: [ProjectRecord.from_dict(item) for item in json.loads(body)]))
+    if records.orjson is not None:
+        modes.append(('orjson -> records',
+                      lambda body: [ProjectRecord.from_dict(item) for item in records.orjson.loads(body)]))
+    if records.ijson is not None:
+        modes.append(('ijson stream -> records', lambda body: decode_records(body, ProjectRecord, stream_threshold=0)))
+    return modes
+
+
+def measure_time(decode, body, repeat):
+    durations = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        decode(body)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def measure_memory(decode, body):
+    """Return (bytes held by the decoded result, peak bytes while decoding)."""
+    gc.collect()
+    tracemalloc.start()
+    result = decode(body)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return held, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manager resource list decode benchmark")
+    parser.add_argument('--resources', type=int, nargs='+', default=[10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'resources':>9} {'mode':<24} {'decode ms':>10} {'held MiB':>9} {'peak MiB':>9}")
+    for count in args.resources:
+        body = make_response(count)
+        print(f"{count:>9} {'(response body)':<24} {'':>10} {len(body) / 1024 ** 2:>9.1f}")
+        for name, decode in decoders():
+            duration = measure_time(decode, body, args.repeat)
+            held, peak = measure_memory(decode, body)
+            print(f"{count:>9} {name:<24} {duration * 1000:>10.1f} {held / 1024 ** 2:>9.1f} {peak / 1024 ** 2:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
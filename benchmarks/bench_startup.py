@@ -0,0 +1,79 @@
+"""
+Startup-time benchmark.
+
+Every measurement runs in a fresh interpreter so module caches do not hide import
+costs. Reports the median of several runs::
+
+    python -m benchmarks.bench_startup --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each snippet prints the seconds spent in the measured part as JSON
+SCENARIOS = {
+    'interpreter': "print(0.0)",
+    'import main': (
+        "import time; started = time.perf_counter(); import main; "
+        "print(time.perf_counter() - started)"
+    ),
+    'import googleapiclient.discovery': (
+        "import time; started = time.perf_counter(); import googleapiclient.discovery; "
+        "print(time.perf_counter() - started)"
+    ),
+    'first Drive service': (
+        "import time; from google.auth.credentials import AnonymousCredentials; "
+        "from utils.gdrive import GoogleDriveAPI; "
+        "api = GoogleDriveAPI(credentials=AnonymousCredentials()); "
+        "started = time.perf_counter(); api.service; print(time.perf_counter() - started)"
+    ),
+    'second Drive service (new thread)': (
+        "import threading, time; from google.auth.credentials import AnonymousCredentials; "
+        "from utils.gdrive import GoogleDriveAPI; "
+        "api = GoogleDriveAPI(credentials=AnonymousCredentials()); api.service; result = []; "
+        "thread = threading.Thread(target=lambda: (result.append(time.perf_counter()), api.service, "
+        "result.append(time.perf_counter()))); thread.start(); thread.join(); "
+        "print(result[1] - result[0])"
+    ),
+}
+
+
+def measure(snippet):
+    """
+    Run a snippet in a new interpreter and return (wall seconds of the whole process,
+    seconds reported by the snippet).
+    """
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', snippet], cwd=REPO_ROOT, capture_output=True, text=True,
+                            check=True).stdout
+    wall = time.perf_counter() - started
+    return wall, json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BIMcloud backup startup benchmark")
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per scenario (default: 5)')
+    parser.add_argument('--scenario', choices=list(SCENARIOS), nargs='+', default=list(SCENARIOS),
+                        help='Scenarios to run (default: all)')
+    args = parser.parse_args()
+
+    print(f"{'scenario':<36} {'measured ms':>12} {'process ms':>12}")
+    for name in args.scenario:
+        try:
+            runs = [measure(SCENARIOS[name]) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<36} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+        wall = statistics.median(run[0] for run in runs) * 1000
+        measured = statistics.median(run[1] for run in runs) * 1000
+        print(f"{name:<36} {measured:>12.1f} {wall:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+End-to-end throughput benchmark against local mock Manager and Drive servers.
+
+Runs the full BackupManager pipeline (select, back up, upload, verify, delete,
+cleanup) for synthetic projects and reports projects and bytes per second::
+
+    python -m benchmarks.bench_throughput --projects 10 100 1000 --archive_size 4
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import PurePosixPath
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.auth.credentials import AnonymousCredentials  # noqa: E402
+from backup_manager import BackupManager  # noqa: E402
+from utils.file_utils import set_logger  # noqa: E402
+from utils.gdrive import GoogleDriveAPI  # noqa: E402
+from utils.logger import get_log_directory  # noqa: E402
+from utils.rate_limiter import TokenBucket  # noqa: E402
+from utils.run_history import RunHistory  # noqa: E402
+from benchmarks.mock_manager import MockManagerServer  # noqa: E402
+from benchmarks.mock_drive import MockDriveServer  # noqa: E402
+
+CLIENT_ID = 'benchmark'
+
+
+def quiet_logging():
+    """Send the backup logger to a file only, so console output stays readable."""
+    logger = logging.getLogger("backup_manager")
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        handler = logging.FileHandler(os.path.join(get_log_directory(), f'{CLIENT_ID}.log'), encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+    set_logger(CLIENT_ID)
+
+
+def seed_history(project_ids, archive_size):
+    """
+    Start every scenario from the same state: a history that knows the archive sizes
+    (so admission control does not fall back to its 2 GiB default) and no durations.
+    """
+    history_path = os.path.join(get_log_directory(), f'{CLIENT_ID}.history.json')
+    if os.path.exists(history_path):
+        os.remove(history_path)
+    history = RunHistory(history_path)
+    for project_id in project_ids:
+        history.record(project_id, archive_size=archive_size)
+    history.save()
+
+
+def run_scenario(project_count, args):
+    data_dir = tempfile.mkdtemp(prefix='bimcloud-bench-')
+    archive_size = int(args.archive_size * 1024 ** 2)
+    try:
+        with MockManagerServer(data_dir, project_count, archive_size, args.job_duration, args.latency) as manager, \
+                MockDriveServer(args.latency) as drive:
+            seed_history([project['id'] for project in manager.state.projects], archive_size)
+            drive_api = GoogleDriveAPI(
+                credentials=AnonymousCredentials(),
+                root_url=drive.url,
+                rate_limiter=TokenBucket(rate=args.drive_rate, capacity=args.drive_rate)
+            )
+            backup_manager = BackupManager(
+                manager_url=manager.url,
+                username='benchmark',
+                password='benchmark',
+                client_id=CLIENT_ID,
+                task='all',
+                target_root=data_dir,
+                gdrive_root='root',
+                gdrive_api=drive_api,
+                file_extension='.BIMProject',
+                max_disk_usage=1.0,
+                workers=args.workers,
+                max_backup_jobs=args.max_backup_jobs,
+                metrics_dir=data_dir,
+                job_poll_interval=args.poll_interval,
+                # The mock Manager reports paths of the local data directory
+                server_path_flavour=PurePosixPath
+            )
+
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                backup_manager.run_backup()
+            elapsed = time.perf_counter() - started
+
+            results = [result.get('result') for result in backup_manager.project_results.values()]
+            return {
+                'projects': project_count,
+                'succeeded': results.count('success'),
+                'seconds': elapsed,
+                'projects_per_second': project_count / elapsed,
+                'mb_per_second': drive.state.bytes_received / 1024 ** 2 / elapsed,
+                'peak_jobs': backup_manager.job_limiter.stats()['peak_in_flight'],
+            }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BIMcloud backup throughput benchmark")
+    parser.add_argument('--projects', type=int, nargs='+', default=[10, 100, 1000],
+                        help='Synthetic project counts, one scenario each (default: 10 100 1000)')
+    parser.add_argument('--archive_size', type=float, default=1,
+                        help='Size of every backup archive in MiB (default: 1)')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='Seconds added to every mock server request (default: 0.005)')
+    parser.add_argument('--job_duration', type=float, default=0.2,
+                        help='Seconds a mock backup job keeps running (default: 0.2)')
+    parser.add_argument('--poll_interval', type=float, default=0.05,
+                        help='Seconds between backup job status polls (default: 0.05)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Projects processed in parallel (default: 4)')
+    parser.add_argument('--max_backup_jobs', type=int, default=4,
+                        help='Ceiling for concurrent backup jobs (default: 4)')
+    parser.add_argument('--drive_rate', type=float, default=1000,
+                        help='Drive requests per second allowed by the rate limiter (default: 1000)')
+    args = parser.parse_args()
+
+    quiet_logging()
+    print(f"{'projects':>8} {'ok':>6} {'seconds':>9} {'proj/s':>8} {'MiB/s':>8} {'peak jobs':>10}")
+    for project_count in args.projects:
+        result = run_scenario(project_count, args)
+        print(f"{result['projects']:>8} {result['succeeded']:>6} {result['seconds']:>9.2f} "
+              f"{result['projects_per_second']:>8.2f} {result['mb_per_second']:>8.2f} {result['peak_jobs']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+FILES_PATH = '/drive/v3/files'
+UPLOAD_PATH = '/upload/drive/v3/files'
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class MockDriveState:
+    """
+    In-memory Drive v3 file tree. Uploaded content is not kept; only its size and
+    MD5 are recorded, so large synthetic archives cost no memory.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files = {}
+        self.uploads = {}
+        self.ids = itertools.count(1)
+        self.bytes_received = 0
+
+    def new_id(self, prefix='file'):
+        return f"{prefix}-{next(self.ids)}"
+
+    def create(self, metadata, size=None, md5=None):
+        file_id = self.new_id('folder' if metadata.get('mimeType') == FOLDER_MIME_TYPE else 'file')
+        record = {
+            'id': file_id,
+            'name': metadata.get('name', 'Untitled'),
+            'mimeType': metadata.get('mimeType', 'application/octet-stream'),
+            'parents': metadata.get('parents', []),
+            'trashed': False,
+            'modifiedTime': _now(),
+            'createdTime': _now(),
+        }
+        if size is not None:
+            record['size'] = str(size)
+            record['md5Checksum'] = md5
+        with self.lock:
+            self.files[file_id] = record
+        return record
+
+    def query(self, q):
+        """Evaluate the subset of the Drive query language used by GoogleDriveAPI."""
+        name = re.search(r"name\s*=\s*'((?:[^'\\]|\\.)*)'", q or '')
+        parent = re.search(r"'([^']*)'\s+in\s+parents", q or '')
+        mime_type = re.search(r"mimeType\s*=\s*'([^']*)'", q or '')
+        with self.lock:
+            files = list(self.files.values())
+        result = []
+        for record in files:
+            if 'trashed=false' in (q or '').replace(' ', '') and record['trashed']:
+                continue
+            if name and record['name'] != name.group(1).replace("\\'", "'"):
+                continue
+            if parent and parent.group(1) not in record['parents']:
+                continue
+            if mime_type and record['mimeType'] != mime_type.group(1):
+                continue
+            result.append(record)
+        return result
+
+
+def select_fields(record, fields):
+    """Apply a (simple) Drive ``fields`` selector such as 'id, name, size'."""
+    if not fields:
+        return {key: record[key] for key in ('id', 'name', 'mimeType') if key in record}
+    names = [field.strip() for field in fields.split(',')]
+    return {name: record[name] for name in names if name in record}
+
+
+class MockDriveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_status(self, status, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+    def _not_found(self):
+        self._send_json({'error': {'code': 404, 'message': 'File not found',
+                                   'errors': [{'reason': 'notFound'}]}}, status=404)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _route(self, method):
+        time.sleep(self.server.latency)
+        parsed = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        path = parsed.path
+        if path.startswith(UPLOAD_PATH):
+            self._handle_upload(method, path[len(UPLOAD_PATH):].strip('/'), params)
+        elif path.startswith(FILES_PATH):
+            self._handle_files(method, path[len(FILES_PATH):].strip('/'), params)
+        else:
+            self._read_body()
+            self._not_found()
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_PATCH(self):
+        self._route('PATCH')
+
+    def do_PUT(self):
+        self._route('PUT')
+
+    def do_DELETE(self):
+        self._route('DELETE')
+
+    def _handle_files(self, method, file_path, params):
+        body = self._read_body()
+        parts = file_path.split('/') if file_path else []
+        if method == 'GET' and not parts:
+            files = self.state.query(params.get('q'))
+            fields = params.get('fields', 'files(id, name)')
+            inner = re.search(r'files\(([^)]*)\)', fields)
+            self._send_json({'files': [select_fields(record, inner.group(1) if inner else None)
+                                       for record in files]})
+        elif method == 'POST' and not parts:
+            record = self.state.create(json.loads(body or b'{}'))
+            self._send_json(select_fields(record, params.get('fields')))
+        elif method == 'GET' and len(parts) == 1:
+            record = self.state.files.get(parts[0])
+            if record is None:
+                self._not_found()
+            else:
+                self._send_json(select_fields(record, params.get('fields')))
+        elif method == 'PATCH' and len(parts) == 1:
+            record = self.state.files.get(parts[0])
+            if record is None:
+                self._not_found()
+                return
+            record.update(json.loads(body or b'{}'))
+            record['modifiedTime'] = _now()
+            self._send_json(select_fields(record, params.get('fields')))
+        elif method == 'DELETE' and len(parts) == 1:
+            with self.state.lock:
+                removed = self.state.files.pop(parts[0], None)
+            if removed is None:
+                self._not_found()
+            else:
+                self._send_status(204)
+        elif method == 'POST' and len(parts) == 2 and parts[1] == 'copy':
+            source = self.state.files.get(parts[0])
+            if source is None:
+                self._not_found()
+                return
+            metadata = dict(source)
+            metadata.update(json.loads(body or b'{}'))
+            record = self.state.create(metadata, size=source.get('size'), md5=source.get('md5Checksum'))
+            self._send_json(select_fields(record, params.get('fields')))
+        else:
+            self._not_found()
+
+    def _handle_upload(self, method, file_path, params):
+        upload_id = params.get('upload_id')
+        if upload_id:
+            self._receive_chunk(upload_id)
+            return
+        # Initiation of a resumable upload (POST creates, PATCH updates an existing file)
+        metadata = json.loads(self._read_body() or b'{}')
+        if method == 'PATCH' and file_path and file_path not in self.state.files:
+            self._not_found()
+            return
+        upload_id = self.state.new_id('upload')
+        self.state.uploads[upload_id] = {
+            'metadata': metadata,
+            'file_id': file_path or None,
+            'received': 0,
+            'md5': hashlib.md5(),
+        }
+        host, port = self.server.server_address[:2]
+        location = f"http://{host}:{port}{UPLOAD_PATH}?uploadType=resumable&upload_id={upload_id}"
+        self._send_status(200, {'Location': location})
+
+    def _receive_chunk(self, upload_id):
+        upload = self.state.uploads.get(upload_id)
+        length = int(self.headers.get('Content-Length') or 0)
+        remaining = length
+        while remaining:
+            data = self.rfile.read(min(remaining, 1024 * 1024))
+            if not data:
+                break
+            remaining -= len(data)
+            if upload is not None:
+                upload['md5'].update(data)
+                upload['received'] += len(data)
+        if upload is None:
+            self._not_found()
+            return
+        with self.state.lock:
+            self.state.bytes_received += length
+
+        content_range = self.headers.get('Content-Range', '')
+        total = content_range.rsplit('/', 1)[-1] if '/' in content_range else '*'
+        if total == '*' or upload['received'] < int(total):
+            headers = {'Range': f"bytes=0-{upload['received'] - 1}"} if upload['received'] else {}
+            self._send_status(308, headers)
+            return
+
+        del self.state.uploads[upload_id]
+        size, md5 = upload['received'], upload['md5'].hexdigest()
+        if upload['file_id']:
+            record = self.state.files[upload['file_id']]
+            record.update({'size': str(size), 'md5Checksum': md5, 'modifiedTime': _now()})
+        else:
+            record = self.state.create(upload['metadata'], size=size, md5=md5)
+        self._send_json(select_fields(record, 'id, name, size, md5Checksum'))
+
+
+class MockDriveServer:
+    """
+    Local stand-in for the Drive v3 ``files`` and resumable ``upload`` endpoints.
+
+    Point GoogleDriveAPI at it with ``root_url=server.url`` and anonymous credentials.
+
+    Args:
+        latency (float): Seconds added to every request.
+    """
+
+    def __init__(self, latency=0.0):
+        self.state = MockDriveState()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), MockDriveHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self.httpd.latency = latency
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-drive', daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
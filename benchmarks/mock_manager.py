@@ -0,0 +1,268 @@
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+API_ROOT = '/management/client/'
+
+
+class MockManagerState:
+    """
+    In-memory BIMcloud Manager holding synthetic projects, jobs and backups.
+
+    Backup jobs complete after ``job_duration`` seconds and write a sparse archive of
+    ``archive_size`` bytes into the project's ``Backups`` folder below ``data_dir``.
+    """
+
+    def __init__(self, data_dir, project_count=10, archive_size=1024 ** 2, job_duration=0.5, folders=10):
+        self.data_dir = data_dir
+        self.archive_size = archive_size
+        self.job_duration = job_duration
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.backups = {}  # backup id -> backup record
+        self.ids = itertools.count(1)
+        now_ms = int(time.time() * 1000)
+
+        self.projects = []
+        for index in range(project_count):
+            folder = f"Folder-{index % folders:03d}"
+            name = f"Project-{index:05d}"
+            project_id = f"project-{index:05d}"
+            path_on_server = os.path.join(data_dir, 'Projects', project_id)
+            os.makedirs(os.path.join(path_on_server, 'Backups'), exist_ok=True)
+            self.projects.append({
+                'id': project_id,
+                'name': name,
+                'type': 'project',
+                '$path': f"Project Root/{folder}/{name}",
+                '$pathOnServer': path_on_server,
+                '$modifiedDate': now_ms - index * 60000,
+            })
+        self.projects_by_id = {project['id']: project for project in self.projects}
+
+        library_path = os.path.join(data_dir, 'Libraries', 'library-00001')
+        os.makedirs(os.path.join(library_path, 'Backups'), exist_ok=True)
+        self.libraries = [{'id': 'library-00001', 'name': 'Library', '$pathOnServer': library_path}]
+
+    def create_backup_job(self, resource_id, backup_name):
+        project = self.projects_by_id.get(resource_id)
+        if project is None:
+            return None
+        job_id = f"job-{next(self.ids)}"
+        job = {'id': job_id, 'status': 'running', 'type': 'createResourceBackup',
+               'data': {'resourceId': resource_id}, 'result': None,
+               '_ready_at': time.monotonic() + self.job_duration, '_name': backup_name}
+        with self.lock:
+            self.jobs[job_id] = job
+        return self.public_job(job)
+
+    def get_job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] == 'running' and time.monotonic() >= job['_ready_at']:
+                self._complete(job)
+            return self.public_job(job)
+
+    def _complete(self, job):
+        resource_id = job['data']['resourceId']
+        project = self.projects_by_id[resource_id]
+        backup_id = f"backup-{next(self.ids)}"
+        file_name = f"{backup_id}.BIMProject"
+        with open(os.path.join(project['$pathOnServer'], 'Backups', file_name), 'wb') as archive:
+            archive.truncate(self.archive_size)
+        self.backups[backup_id] = {
+            'id': backup_id,
+            '$name': job['_name'],
+            '$backupFileName': file_name,
+            '$resourceId': resource_id,
+            '$resourceType': 'project',
+            '$fileSize': self.archive_size,
+        }
+        job['status'] = 'completed'
+
+    @staticmethod
+    def public_job(job):
+        return {key: value for key, value in job.items() if not key.startswith('_')}
+
+    def delete_backup(self, resource_id, backup_id):
+        with self.lock:
+            backup = self.backups.pop(backup_id, None)
+        if backup is None or backup['$resourceId'] != resource_id:
+            return False
+        project = self.projects_by_id[resource_id]
+        try:
+            os.remove(os.path.join(project['$pathOnServer'], 'Backups', backup['$backupFileName']))
+        except OSError:
+            pass
+        return True
+
+
+class MockManagerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_empty(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _send_error(self, code, message):
+        self._send_json({'error-code': code, 'error-message': message}, status=430)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _dispatch(self, method):
+        time.sleep(self.server.latency)
+        parsed = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        body = self._read_body()
+        if not parsed.path.startswith(API_ROOT):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        endpoint = parsed.path[len(API_ROOT):].strip('/')
+        handler = getattr(self, f"handle_{method}_{endpoint.replace('-', '_').replace('/', '__')}", None)
+        if handler is None:
+            self._send_error(6, f"Unknown endpoint {endpoint}")
+            return
+        handler(params, body)
+
+    def do_GET(self):
+        self._dispatch('get')
+
+    def do_POST(self):
+        self._dispatch('post')
+
+    def do_DELETE(self):
+        self._dispatch('delete')
+
+    # --- Endpoints ---
+
+    def handle_post_oauth2__token(self, params, body):
+        self._send_json({
+            'user_id': 'benchmark-user',
+            'access_token': uuid.uuid4().hex,
+            'refresh_token': uuid.uuid4().hex,
+            'access_token_exp': int(time.time()) + 3600,
+            'token_type': 'bearer',
+        })
+
+    def handle_get_get_projects(self, params, body):
+        self._send_json(self.state.projects)
+
+    def handle_get_get_libraries(self, params, body):
+        self._send_json(self.state.libraries)
+
+    def handle_get_get_resource(self, params, body):
+        resource = self.state.projects_by_id.get(params.get('resource-id'))
+        if resource is None:
+            self._send_error(6, 'Resource not found')
+        else:
+            self._send_json(resource)
+
+    def handle_post_create_resource_backup(self, params, body):
+        job = self.state.create_backup_job(params.get('resource-id'), params.get('backup-name'))
+        if job is None:
+            self._send_error(6, 'Resource not found')
+        else:
+            self._send_json(job)
+
+    def handle_get_get_job(self, params, body):
+        job = self.state.get_job(params.get('job-id'))
+        if job is None:
+            self._send_error(6, 'Job not found')
+        else:
+            self._send_json(job)
+
+    def handle_get_get_backups(self, params, body):
+        with self.state.lock:
+            self._send_json(list(self.state.backups.values()))
+
+    def handle_post_get_resource_backups_by_criterion(self, params, body):
+        ids = set(json.loads(body or b'{}').get('ids', []))
+        with self.state.lock:
+            backups = [backup for backup in self.state.backups.values() if backup['$resourceId'] in ids]
+        self._send_json(backups)
+
+    def handle_delete_delete_resource_backup(self, params, body):
+        if self.state.delete_backup(params.get('resource-id'), params.get('backup-id')):
+            self._send_empty()
+        else:
+            self._send_error(6, 'Backup not found')
+
+    def handle_post_delete_resources_by_id_list(self, params, body):
+        self._send_empty()
+
+
+class _BackloggedHTTPServer(ThreadingHTTPServer):
+    # Room for hundreds of simultaneous connections, e.g. from the asyncio client benchmark
+    request_queue_size = 1024
+
+
+class MockManagerServer:
+    """
+    Local stand-in for the BIMcloud Manager endpoints used by CustomManagerApi.
+
+    Usage::
+
+        with MockManagerServer(data_dir, project_count=100, latency=0.01) as manager:
+            api = CustomManagerApi(manager.url)
+
+    Args:
+        data_dir (str): Directory receiving the synthetic project and backup folders.
+        project_count (int): Number of synthetic projects.
+        archive_size (int): Size in bytes of every backup archive.
+        job_duration (float): Seconds a backup job stays running.
+        latency (float): Seconds added to every request.
+    """
+
+    def __init__(self, data_dir, project_count=10, archive_size=1024 ** 2, job_duration=0.5, latency=0.0):
+        self.state = MockManagerState(data_dir, project_count, archive_size, job_duration)
+        self.httpd = _BackloggedHTTPServer(('127.0.0.1', 0), MockManagerHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self.httpd.latency = latency
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-manager', daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
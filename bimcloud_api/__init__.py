@@ -23,6 +23,7 @@
 from .managerapi import ManagerApi, ManagerApiRequestContext
 from .blobserverapi import BlobServerApi
 from .errors import BIMcloudError, BIMcloudManagerError, BIMcloudBlobServerError, HttpError
+from .hooks import RequestHook, RequestEvent
 from .url import join_url, add_params, is_url, parse_url
 
 __all__ = [
@@ -33,6 +34,8 @@ __all__ = [
     'BIMcloudManagerError',
     'BIMcloudBlobServerError',
     'HttpError',
+    'RequestHook',
+    'RequestEvent',
     'join_url',
     'add_params',
     'is_url',
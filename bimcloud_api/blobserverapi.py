@@ -23,6 +23,7 @@
 import requests
 from .errors import raise_bimcloud_blob_server_error, BIMcloudBlobServerError, HttpError
 from .url import is_url, join_url
+from .hooks import send_with_hooks
 
 
 class BlobServerApi:
@@ -31,6 +32,15 @@ class BlobServerApi:
             raise ValueError('Server url is invalid.')
 
         self.server_url = server_url
+        self.request_hooks = []
+
+    def add_request_hook(self, hook):
+        self.request_hooks.append(hook)
+
+    def request(self, req, url, responseJson=True, **kwargs):
+        endpoint = url[len(self.server_url):].strip('/')
+        response = send_with_hooks(self.request_hooks, 'blob', endpoint, req, url, **kwargs)
+        return self.process_response(response, json=responseJson)
 
     def create_session(self, username, ticket):
         request = {
@@ -41,85 +51,71 @@ class BlobServerApi:
             }
         }
         url = join_url(self.server_url, 'session-service/1.0/create-session')
-        response = requests.post(url, json=request, headers={'content-type': request['data-content-type']})
-        result = self.process_response(response)
+        result = self.request(requests.post, url, json=request, headers={'content-type': request['data-content-type']})
         return result['data']['id']
 
     def close_session(self, session_id):
         url = join_url(self.server_url, 'session-service/1.0/close-session')
-        response = requests.post(url, params={'session-id': session_id})
-        self.process_response(response)
+        self.request(requests.post, url, params={'session-id': session_id})
 
     def begin_batch_upload(self, session_id, description):
         url = join_url(self.server_url, '/blob-store-service/1.0/begin-batch-upload')
-        response = requests.post(url,
-                                 params={
-                                     'session-id': session_id,
-                                     'description': description
-                                 })
-        self.process_response(response)
-        result = self.process_response(response)
+        result = self.request(requests.post, url,
+                              params={
+                                  'session-id': session_id,
+                                  'description': description
+                              })
         return result['data']
 
     def commit_batch_upload(self, session_id, batch_id, conflict_behavior='overwrite'):
         url = join_url(self.server_url, '/blob-store-service/1.0/commit-batch-upload')
-        response = requests.post(url,
-                                 params={
-                                     'session-id': session_id,
-                                     'batch-upload-session-id': batch_id,
-                                     'conflict-behavior': conflict_behavior
-                                 })
-        self.process_response(response)
-        result = self.process_response(response)
+        result = self.request(requests.post, url,
+                              params={
+                                  'session-id': session_id,
+                                  'batch-upload-session-id': batch_id,
+                                  'conflict-behavior': conflict_behavior
+                              })
         return result['data']
 
     def begin_upload(self, session_id, path, namespace_name):
         url = join_url(self.server_url, '/blob-store-service/1.0/begin-upload')
-        response = requests.post(url,
-                                 params={
-                                     'session-id': session_id,
-                                     'blob-name': path,
-                                     'namespace-name': namespace_name
-                                 })
-        self.process_response(response)
-        result = self.process_response(response)
+        result = self.request(requests.post, url,
+                              params={
+                                  'session-id': session_id,
+                                  'blob-name': path,
+                                  'namespace-name': namespace_name
+                              })
         return result['data']
 
     def commit_upload(self, session_id, upload_id):
         url = join_url(self.server_url, '/blob-store-service/1.0/commit-upload')
-        response = requests.post(url,
-                                 params={
-                                     'session-id': session_id,
-                                     'upload-session-id': upload_id
-                                 })
-        self.process_response(response)
-        result = self.process_response(response)
+        result = self.request(requests.post, url,
+                              params={
+                                  'session-id': session_id,
+                                  'upload-session-id': upload_id
+                              })
         return result['data']
 
     def put_blob_content_part(self, session_id, upload_id, data, offset=None):
         url = join_url(self.server_url, '/blob-store-service/1.0/put-blob-content-part')
-        response = requests.post(url,
-                                 params={
-                                     'session-id': session_id,
-                                     'upload-session-id': upload_id,
-                                     'offset': offset if offset else 0,
-                                     'length': len(data)
-                                 },
-                                 data=data)
-        self.process_response(response)
-        result = self.process_response(response)
+        result = self.request(requests.post, url,
+                              params={
+                                  'session-id': session_id,
+                                  'upload-session-id': upload_id,
+                                  'offset': offset if offset else 0,
+                                  'length': len(data)
+                              },
+                              data=data)
         return result['data']
 
     def get_blob_content(self, session_id, blob_id):
         url = join_url(self.server_url, '/blob-store-service/1.0/get-blob-content')
-        response = requests.get(url,
-                                params={
-                                    'session-id': session_id,
-                                    'blob-id': blob_id
-                                },
-                                stream=True)
-        self.process_response(response, json=False)
-        return response
+        return self.request(requests.get, url, False,
+                            params={
+                                'session-id': session_id,
+                                'blob-id': blob_id
+                            },
+                            stream=True)
 
     @staticmethod
     def process_response(response, json=True):
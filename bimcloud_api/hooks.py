@@ -0,0 +1,71 @@
+import threading
+import time
+
+
+class RequestEvent:
+    """
+    Describes one HTTP request made by an API client. The same object is passed to
+    ``on_request_start`` and, completed with the outcome, to ``on_request_end``.
+    """
+
+    def __init__(self, backend, method, url, endpoint):
+        self.backend = backend
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint
+        self.thread_id = threading.get_ident()
+        self.thread_name = threading.current_thread().name
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.error = None
+
+    def finish(self, response=None, error=None, read_body=True):
+        self.duration = time.perf_counter() - self._started
+        self.error = error
+        if response is not None:
+            self.status = response.status_code
+            body = getattr(getattr(response, 'request', None), 'body', None)
+            self.request_bytes = len(body) if body else 0
+            if read_body:
+                self.response_bytes = len(response.content or b'')
+
+
+class RequestHook:
+    """
+    Base class for request observers. Hooks must be thread-safe and must not raise.
+    """
+
+    def on_request_start(self, event):
+        pass
+
+    def on_request_end(self, event):
+        pass
+
+
+def send_with_hooks(hooks, backend, endpoint, req, url, **kwargs):
+    """
+    Perform ``req(url, **kwargs)`` and report it to every hook.
+    """
+    if not hooks:
+        return req(url, **kwargs)
+
+    event = RequestEvent(backend, req.__name__.upper(), url, endpoint)
+    for hook in hooks:
+        hook.on_request_start(event)
+    response = None
+    error = None
+    try:
+        response = req(url, **kwargs)
+        return response
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Streamed downloads are not read here; their size is unknown at this point
+        event.finish(response, error, read_body=not kwargs.get('stream', False))
+        for hook in hooks:
+            hook.on_request_end(event)
@@ -22,6 +22,7 @@
 
 import requests
 from .errors import raise_bimcloud_manager_error, HttpError
+from .hooks import send_with_hooks
 from .url import is_url, join_url, add_params
 import webbrowser
 
@@ -43,6 +44,14 @@ class ManagerApi:
 
         self.manager_url = manager_url
         self._api_root = join_url(manager_url, 'management/client')
+        self.request_hooks = []
+
+    def add_request_hook(self, hook):
+        self.request_hooks.append(hook)
+
+    def send(self, req, url, **kwargs):
+        endpoint = url[len(self._api_root):].strip('/')
+        return send_with_hooks(self.request_hooks, 'manager', endpoint, req, url, **kwargs)
 
     def open_authorization_page(self, client_id, state):
         url = add_params(join_url(self._api_root, 'oauth2', 'authorize'), {'client_id': client_id, 'state': state})
@@ -50,7 +59,7 @@ class ManagerApi:
 
     def get_authorization_code_by_state(self, state):
         url = join_url(self._api_root, 'oauth2', 'get-authorization-code-by-state')
-        response = requests.get(url, params={'state': state})
+        response = self.send(requests.get, url, params={'state': state})
         result = self.process_response(response)
         return result['status'], result['code']
 
@@ -62,7 +71,8 @@ class ManagerApi:
             'client_id': client_id
         }
         url = join_url(self._api_root, 'oauth2', 'token')
-        response = requests.post(url, data=request, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        response = self.send(requests.post, url, data=request,
+                             headers={'Content-Type': 'application/x-www-form-urlencoded'})
         result = self.process_response(response)
         return ManagerApiRequestContext(result['user_id'], result['access_token'], result['refresh_token'],
                                         result['access_token_exp'], result['token_type'], client_id)
@@ -74,7 +84,8 @@ class ManagerApi:
             'client_id': client_id
         }
         url = join_url(self._api_root, 'oauth2', 'token')
-        response = requests.post(url, data=request, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        response = self.send(requests.post, url, data=request,
+                             headers={'Content-Type': 'application/x-www-form-urlencoded'})
         result = self.process_response(response)
         return ManagerApiRequestContext(result['user_id'], result['access_token'], result['refresh_token'],
                                         result['access_token_exp'], result['token_type'], client_id)
@@ -86,7 +97,8 @@ class ManagerApi:
             'client_id': client_id
         }
         url = join_url(self._api_root, 'oauth2', 'token')
-        response = requests.post(url, data=request, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        response = self.send(requests.post, url, data=request,
+                             headers={'Content-Type': 'application/x-www-form-urlencoded'})
         result = self.process_response(response)
         return ManagerApiRequestContext(result['user_id'], result['access_token'], result['refresh_token'],
                                         result['access_token_exp'], result['token_type'], client_id)
@@ -211,7 +223,7 @@ class ManagerApi:
 
     def refresh_on_expiration(self, req, auth_context, url, responseJson=True, **kwargs):
         try:
-            response = req(url, **kwargs, headers={'Authorization': f'Bearer {auth_context._access_token}'})
+            response = self.send(req, url, **kwargs, headers={'Authorization': f'Bearer {auth_context._access_token}'})
             return self.process_response(response, json=responseJson)
         except HttpError as e:
             if e.status_code == 401:
@@ -220,7 +232,8 @@ class ManagerApi:
                     result = self.get_token_by_refresh_token_grant(auth_context._refresh_token, auth_context.client_id)
                     auth_context._access_token = result._access_token
                     auth_context._refresh_token = result._refresh_token
-                    response = req(url, headers={'Authorization': f'Bearer {auth_context._access_token}'}, **kwargs)
+                    response = self.send(req, url, headers={'Authorization': f'Bearer {auth_context._access_token}'},
+                                         **kwargs)
                     return self.process_response(response, json=responseJson)
             raise e
 
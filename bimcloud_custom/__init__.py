@@ -1,4 +1,6 @@
 # Import CustomManagerApi to make it accessible when importing the bimcloud_custom module
 from .custom_managerapi import CustomManagerApi
+from .custom_blobserverapi import CustomBlobServerApi
+from .blob_sessions import BlobSessionPool
 
-__all__ = ["CustomManagerApi"]
+__all__ = ["CustomManagerApi", "CustomBlobServerApi", "BlobSessionPool"]
@@ -0,0 +1,330 @@
+import asyncio
+import json
+from bimcloud_api.errors import HttpError
+from bimcloud_api.managerapi import ManagerApi, ManagerApiRequestContext
+from bimcloud_api.url import is_url, join_url
+from bimcloud_custom.custom_managerapi import NON_IDEMPOTENT_ENDPOINTS
+from bimcloud_custom.records import ProjectRecord, BackupRecord, decode_records
+from bimcloud_custom.retry_rules import is_transient_error
+from utils.async_http import (DEFAULT_CONNECTION_LIMIT, create_session, request_with_hooks,
+                              is_transient_connection_error, require_aiohttp)
+from utils.metrics import MetricsHook
+from utils.retry import RetryPolicy
+
+FORM_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+class AsyncManagerApi:
+    """
+    asyncio counterpart of ``CustomManagerApi``, built on aiohttp.
+
+    The methods of ``ManagerApi`` and ``CustomManagerApi`` are coroutines here, so one
+    event loop can keep thousands of Manager calls (e.g. job polls) in flight without
+    a thread per request. Retries, the circuit breaker, request hooks, compact records
+    and the metadata cache work as in the blocking client. When parallel requests find
+    the access token expired, only the first one refreshes it, under an asyncio lock.
+
+    The aiohttp session is opened on first use; close the client with ``close`` or use
+    it as an async context manager.
+
+    Args:
+        manager_url (str): BIMcloud Manager URL.
+        retry_policy (RetryPolicy): Retry policy for Manager requests.
+        circuit_breaker (CircuitBreaker): Optional circuit breaker for the Manager.
+        metrics (MetricsRegistry): Optional registry for request metrics.
+        compact_records (bool): Return projects and backups as compact records.
+        cache (TTLCache): Optional cache for metadata that rarely changes.
+        connection_limit (int): Connections kept open to the Manager.
+    """
+
+    def __init__(self, manager_url, retry_policy=None, circuit_breaker=None, metrics=None, compact_records=False,
+                 cache=None, connection_limit=DEFAULT_CONNECTION_LIMIT):
+        require_aiohttp()
+        if not is_url(manager_url):
+            raise ValueError('Manager url is invalid.')
+        self.manager_url = manager_url
+        self._api_root = join_url(manager_url, 'management/client')
+        self.request_hooks = []
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker
+        self.compact_records = compact_records
+        self.cache = cache
+        self.connection_limit = connection_limit
+        if metrics:
+            self.add_request_hook(MetricsHook(metrics))
+        self._session = None
+        self._token_lock = asyncio.Lock()
+
+    def add_request_hook(self, hook):
+        self.request_hooks.append(hook)
+
+    async def send(self, method, url, **kwargs):
+        if self._session is None:
+            self._session = create_session(self.connection_limit)
+        endpoint = url[len(self._api_root):].strip('/')
+        return await request_with_hooks(self._session, self.request_hooks, 'manager', endpoint, method, url, **kwargs)
+
+    async def close(self):
+        if self.cache:
+            self.cache.save()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _token_request(self, request, client_id):
+        url = join_url(self._api_root, 'oauth2', 'token')
+        response = await self.send('POST', url, data=request, headers=FORM_HEADERS)
+        result = ManagerApi.process_response(response)
+        return ManagerApiRequestContext(result['user_id'], result['access_token'], result['refresh_token'],
+                                        result['access_token_exp'], result['token_type'], client_id)
+
+    async def get_authorization_code_by_state(self, state):
+        url = join_url(self._api_root, 'oauth2', 'get-authorization-code-by-state')
+        response = await self.send('GET', url, params={'state': state})
+        result = ManagerApi.process_response(response)
+        return result['status'], result['code']
+
+    async def get_token_by_password_grant(self, username, password, client_id):
+        request = {'grant_type': 'password', 'username': username, 'password': password, 'client_id': client_id}
+        return await self._token_request(request, client_id)
+
+    async def get_token_by_refresh_token_grant(self, refresh_token, client_id):
+        request = {'grant_type': 'refresh_token', 'refresh_token': refresh_token, 'client_id': client_id}
+        return await self._token_request(request, client_id)
+
+    async def get_token_by_authorization_code_grant(self, authorization_code, client_id):
+        request = {'grant_type': 'authorization_code', 'code': authorization_code, 'client_id': client_id}
+        return await self._token_request(request, client_id)
+
+    async def refresh_token(self, auth_context, expired_token):
+        """
+        Refresh the access token of ``auth_context`` unless another task already replaced
+        ``expired_token``; refresh tokens are single-use, so only one task may refresh.
+        """
+        async with self._token_lock:
+            if auth_context._access_token != expired_token:
+                return
+            result = await self.get_token_by_refresh_token_grant(auth_context._refresh_token, auth_context.client_id)
+            auth_context._access_token = result._access_token
+            auth_context._refresh_token = result._refresh_token
+
+    async def _authorized_request(self, method, auth_context, url, responseJson=True, **kwargs):
+        access_token = auth_context._access_token
+        try:
+            response = await self.send(method, url, headers={'Authorization': f'Bearer {access_token}'}, **kwargs)
+            return ManagerApi.process_response(response, json=responseJson)
+        except HttpError as e:
+            if e.status_code == 401:
+                error_json = e.response.json()
+                if 'error' in error_json and error_json['error'] == 'invalid_token':
+                    await self.refresh_token(auth_context, access_token)
+                    response = await self.send(
+                        method, url, headers={'Authorization': f'Bearer {auth_context._access_token}'}, **kwargs)
+                    return ManagerApi.process_response(response, json=responseJson)
+            raise e
+
+    async def refresh_on_expiration(self, method, auth_context, url, responseJson=True, **kwargs):
+        idempotent = not url.endswith(NON_IDEMPOTENT_ENDPOINTS)
+        return await self.retry_policy.call_async(
+            self._authorized_request,
+            args=(method, auth_context, url, responseJson),
+            kwargs=kwargs,
+            is_retryable=lambda error: (is_transient_error(error, idempotent)
+                                        or is_transient_connection_error(error, idempotent)),
+            breaker=self.circuit_breaker,
+            description=f"Manager request '{url}'"
+        )
+
+    async def cached(self, endpoint, key, loader, tags=()):
+        """Return the cached response of ``endpoint`` for ``key``, or await ``loader()`` and cache it."""
+        if self.cache is None or not self.cache.cacheable(endpoint):
+            return await loader()
+        hit, value = self.cache.get(endpoint, key)
+        if hit:
+            return value
+        value = await loader()
+        self.cache.put(endpoint, key, value, tags)
+        return value
+
+    def invalidate_backups(self, resource_ids):
+        """Drop cached backup listings after backups of ``resource_ids`` were created or deleted."""
+        if self.cache is None:
+            return
+        self.cache.invalidate('get-backups')
+        self.cache.invalidate('get-resource-backups-by-criterion', resource_ids)
+
+    async def get_resource_list(self, method, auth_context, url, record_type, **kwargs):
+        """
+        Request a list of resources, decoded into ``record_type`` records in compact mode.
+        """
+        if not self.compact_records:
+            return await self.refresh_on_expiration(method, auth_context, url, **kwargs)
+        content = await self.refresh_on_expiration(method, auth_context, url, False, **kwargs)
+        return decode_records(content, record_type)
+
+    async def get_projects(self, auth_context):
+        url = join_url(self._api_root, 'get-projects')
+        return await self.get_resource_list('GET', auth_context, url, ProjectRecord)
+
+    async def get_libraries(self, auth_context):
+        url = join_url(self._api_root, 'get-libraries')
+        return await self.cached('get-libraries', (),
+                                 lambda: self.refresh_on_expiration('GET', auth_context, url))
+
+    async def get_resource(self, auth_context, by_path=None, by_id=None, try_get=False):
+        if by_id is not None:
+            return await self.get_resource_by_id(auth_context, by_id)
+
+        criterion = None
+        if by_path is not None:
+            criterion = {'$eq': {'$path': by_path}}
+
+        try:
+            return await self.get_resource_by_criterion(auth_context, criterion)
+        except Exception as err:
+            if try_get:
+                return None
+            raise err
+
+    async def get_resource_by_id(self, auth_context, resource_id):
+        if resource_id is None:
+            raise ValueError('"resource_id" expected.')
+
+        url = join_url(self._api_root, 'get-resource')
+        return await self.cached('get-resource', (resource_id,),
+                                 lambda: self.refresh_on_expiration('GET', auth_context, url,
+                                                                    params={'resource-id': resource_id}),
+                                 tags=(resource_id,))
+
+    async def get_resources_by_criterion(self, auth_context, criterion, options=None):
+        if criterion is None:
+            raise ValueError('"criterion" expected.')
+
+        url = join_url(self._api_root, 'get-resources-by-criterion')
+        params = dict(options) if isinstance(options, dict) else {}
+        result = await self.refresh_on_expiration('POST', auth_context, url, params=params, json=criterion)
+        assert isinstance(result, list), 'Result is not a list.'
+        return result
+
+    async def get_resource_by_criterion(self, auth_context, criterion, options=None):
+        result = await self.get_resources_by_criterion(auth_context, criterion, options)
+        return result[0] if result else None
+
+    async def create_resource_group(self, auth_context, name, parent_id=None):
+        url = join_url(self._api_root, 'insert-resource-group')
+        directory = {'name': name, 'type': 'resourceGroup'}
+        result = await self.refresh_on_expiration('POST', auth_context, url, params={'parent-id': parent_id},
+                                                  json=directory)
+        assert isinstance(result, str), 'Result is not a string.'
+        return result
+
+    async def delete_resource_group(self, auth_context, directory_id):
+        url = join_url(self._api_root, 'delete-resource-group')
+        return await self.refresh_on_expiration('DELETE', auth_context, url, params={'resource-id': directory_id})
+
+    async def delete_resources_by_id_list(self, auth_context, ids):
+        url = join_url(self._api_root, 'delete-resources-by-id-list')
+        result = await self.refresh_on_expiration('POST', auth_context, url, json={'ids': ids})
+        if self.cache:
+            self.cache.invalidate('get-resource', ids)
+            self.invalidate_backups(ids)
+        return result
+
+    async def delete_blob(self, auth_context, blob_id):
+        url = join_url(self._api_root, 'delete-blob')
+        await self.refresh_on_expiration('DELETE', auth_context, url, params={'resource-id': blob_id})
+
+    async def update_blob(self, auth_context, blob):
+        url = join_url(self._api_root, 'update-blob')
+        await self.refresh_on_expiration('PUT', auth_context, url, json=blob)
+
+    async def update_blob_parent(self, auth_context, blob_id, body):
+        url = join_url(self._api_root, 'update-blob-parent')
+        await self.refresh_on_expiration('POST', auth_context, url, params={'blob-id': blob_id}, json=body)
+
+    async def get_blob_changes_for_sync(self, auth_context, path, resource_group_id, from_revision):
+        url = join_url(self._api_root, 'get-blob-changes-for-sync')
+        request = {'path': path, 'resourceGroupId': resource_group_id, 'fromRevision': from_revision}
+        return await self.refresh_on_expiration('POST', auth_context, url, json=request)
+
+    async def get_inherited_default_blob_server_id(self, auth_context, resource_group_id):
+        url = join_url(self._api_root, 'get-inherited-default-blob-server-id')
+        return await self.cached('get-inherited-default-blob-server-id', (resource_group_id,),
+                                 lambda: self.refresh_on_expiration('GET', auth_context, url,
+                                                                    params={'resource-group-id': resource_group_id}))
+
+    async def get_job(self, auth_context, job_id):
+        url = join_url(self._api_root, 'get-job')
+        return await self.refresh_on_expiration('GET', auth_context, url, params={'job-id': job_id})
+
+    async def abort_job(self, auth_context, job_id):
+        url = join_url(self._api_root, 'get-job')
+        return await self.refresh_on_expiration('POST', auth_context, url, params={'job-id': job_id})
+
+    async def wait_for_job(self, auth_context, job, poll_interval=1):
+        """
+        Poll a job until it is completed or failed.
+
+        Args:
+            job (dict): Job as returned when it was started.
+            poll_interval (float): Seconds between polls.
+
+        Returns:
+            dict: The finished job.
+        """
+        while job['status'] not in ('completed', 'failed'):
+            await asyncio.sleep(poll_interval)
+            job = await self.get_job(auth_context, job['id'])
+        return job
+
+    async def get_ticket(self, auth_context, resource_id):
+        return await self.get_ticket_for_resources(auth_context, [resource_id])
+
+    async def get_ticket_for_resources(self, auth_context, resource_ids):
+        """
+        Request one blob server access ticket covering several resources.
+        """
+        url = join_url(self._api_root, 'ticket-generator/get-ticket')
+        request = {'type': 'freeTicket', 'resources': list(resource_ids), 'format': 'base64'}
+        result = await self.refresh_on_expiration('POST', auth_context, url, False, json=request)
+        assert isinstance(result, bytes), 'Result is not a bytes.'
+        return result.decode('utf-8')
+
+    async def get_user(self, auth_context, user_id):
+        url = join_url(self._api_root, 'get-user')
+        return await self.refresh_on_expiration('GET', auth_context, url, params={'user-id': user_id})
+
+    async def create_resource_backup(self, auth_context, resource_id, backup_type, name):
+        url = join_url(self._api_root, 'create-resource-backup')
+        result = await self.refresh_on_expiration('POST', auth_context, url,
+                                                  params={'resource-id': resource_id, 'backup-type': backup_type,
+                                                          'backup-name': name}, json={})
+        self.invalidate_backups([resource_id])
+        return result
+
+    async def get_backups(self, auth_context):
+        url = join_url(self._api_root, 'get-backups')
+        return await self.cached('get-backups', (self.compact_records,),
+                                 lambda: self.get_resource_list('GET', auth_context, url, BackupRecord,
+                                                                params={}, json={}))
+
+    async def get_resource_backups_by_criterion(self, auth_context, resourcesIds, filters={}, criterion={}):
+        url = join_url(self._api_root, 'get-resource-backups-by-criterion')
+        key = (tuple(sorted(resourcesIds)), json.dumps({**filters, **criterion}, sort_keys=True), self.compact_records)
+        return await self.cached('get-resource-backups-by-criterion', key,
+                                 lambda: self.get_resource_list('POST', auth_context, url, BackupRecord, params={},
+                                                                json={'ids': resourcesIds, **filters, **criterion}),
+                                 tags=resourcesIds)
+
+    async def delete_resource_backup(self, auth_context, resource_id, backup_id):
+        url = join_url(self._api_root, 'delete-resource-backup')
+        result = await self.refresh_on_expiration('DELETE', auth_context, url,
+                                                  params={'resource-id': resource_id, 'backup-id': backup_id}, json={})
+        self.invalidate_backups([resource_id])
+        return result
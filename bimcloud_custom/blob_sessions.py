@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from bimcloud_api.errors import BIMcloudBlobServerError, get_blob_server_error_id
+from bimcloud_custom.custom_blobserverapi import CustomBlobServerApi
+
+# Blob server error codes after which a new ticket and session fix the request
+SESSION_EXPIRED_ERROR_CODES = {
+    4,   # AccessControlTicketExpired
+    11,  # SessionNotFound
+}
+
+# Sessions older than this are replaced before use rather than after a failed request
+DEFAULT_SESSION_TTL = 15 * 60
+
+logger = logging.getLogger("backup_manager")
+
+
+class _PooledSession:
+    __slots__ = ('session_id', 'resource_ids', 'created', 'lock')
+
+    def __init__(self, resource_ids):
+        self.session_id = None
+        self.resource_ids = resource_ids
+        self.created = 0.0
+        self.lock = threading.Lock()
+
+
+class BlobSessionPool:
+    """
+    Reuses blob server sessions across requests.
+
+    A session is keyed by blob server and resource set, and is opened with one
+    ticket covering every resource of the set (``get_ticket_for_resources``). A
+    request for resources already covered by an open session reuses that session.
+    Sessions are replaced once ``session_ttl`` has passed, and immediately when the
+    blob server reports an expired ticket or an unknown session. ``close_all`` closes
+    every session; the pool is also a context manager.
+
+    Args:
+        manager_api (CustomManagerApi): Manager client issuing the tickets.
+        auth_context (ManagerApiRequestContext): Manager authentication.
+        username (str): User the blob server sessions are opened for.
+        retry_policy (RetryPolicy): Retry policy for blob server requests.
+        circuit_breaker (CircuitBreaker): Circuit breaker shared by all blob servers.
+        metrics (MetricsRegistry): Optional registry for request metrics.
+        session_ttl (float): Seconds a session is reused.
+    """
+
+    def __init__(self, manager_api, auth_context, username, retry_policy=None, circuit_breaker=None, metrics=None,
+                 session_ttl=DEFAULT_SESSION_TTL):
+        self.manager_api = manager_api
+        self.auth_context = auth_context
+        self.username = username
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.metrics = metrics
+        self.session_ttl = session_ttl
+        self.request_hooks = []
+        self._lock = threading.Lock()
+        self._apis = {}  # server url -> CustomBlobServerApi
+        self._sessions = {}  # (server url, frozenset of resource ids) -> _PooledSession
+        self._stats = {"tickets": 0, "sessions_created": 0, "sessions_reused": 0, "sessions_refreshed": 0}
+
+    def add_request_hook(self, hook):
+        with self._lock:
+            self.request_hooks.append(hook)
+            apis = list(self._apis.values())
+        for api in apis:
+            api.add_request_hook(hook)
+
+    def api_for(self, server_url):
+        """Return the blob server client for ``server_url``, creating it on first use."""
+        with self._lock:
+            api = self._apis.get(server_url)
+            if api is None:
+                api = CustomBlobServerApi(server_url, self.retry_policy, self.circuit_breaker, self.metrics)
+                for hook in self.request_hooks:
+                    api.add_request_hook(hook)
+                self._apis[server_url] = api
+            return api
+
+    def _entry(self, server_url, resource_ids):
+        with self._lock:
+            for (url, covered), entry in self._sessions.items():
+                if url == server_url and resource_ids <= covered:
+                    return entry
+            return self._sessions.setdefault((server_url, resource_ids), _PooledSession(resource_ids))
+
+    def _open(self, server_url, entry):
+        ticket = self.manager_api.get_ticket_for_resources(self.auth_context, sorted(entry.resource_ids))
+        session_id = self.api_for(server_url).create_session(self.username, ticket)
+        with self._lock:
+            self._stats["tickets"] += 1
+            self._stats["sessions_created"] += 1
+        entry.session_id = session_id
+        entry.created = time.monotonic()
+
+    def _close_quietly(self, server_url, session_id):
+        try:
+            self.api_for(server_url).close_session(session_id)
+        except Exception as e:
+            logger.debug(f"Failed to close blob server session {session_id}: {e}")
+
+    def session(self, server_url, resource_ids):
+        """
+        Return an open session id for ``resource_ids`` on the blob server.
+
+        Args:
+            server_url (str): Blob server URL.
+            resource_ids (iterable): Resources the session must grant access to.
+        """
+        entry = self._entry(server_url, frozenset(resource_ids))
+        with entry.lock:
+            if entry.session_id is not None and time.monotonic() - entry.created < self.session_ttl:
+                with self._lock:
+                    self._stats["sessions_reused"] += 1
+                return entry.session_id
+            if entry.session_id is not None:
+                self._close_quietly(server_url, entry.session_id)
+            self._open(server_url, entry)
+            return entry.session_id
+
+    def invalidate(self, server_url, resource_ids, session_id):
+        """Open a new session in place of ``session_id`` unless another thread already did."""
+        entry = self._entry(server_url, frozenset(resource_ids))
+        with entry.lock:
+            if entry.session_id == session_id:
+                with self._lock:
+                    self._stats["sessions_refreshed"] += 1
+                self._close_quietly(server_url, session_id)
+                self._open(server_url, entry)
+            return entry.session_id
+
+    def call(self, server_url, resource_ids, operation):
+        """
+        Run ``operation(api, session_id)`` with a pooled session, retrying once on a
+        new session if the ticket expired or the server no longer knows the session.
+        """
+        resource_ids = frozenset(resource_ids)
+        api = self.api_for(server_url)
+        session_id = self.session(server_url, resource_ids)
+        try:
+            return operation(api, session_id)
+        except BIMcloudBlobServerError as e:
+            if e.code not in SESSION_EXPIRED_ERROR_CODES:
+                raise
+            logger.debug(f"Blob server session {session_id} rejected ({get_blob_server_error_id(e.code)}), "
+                         f"opening a new one.")
+            return operation(api, self.invalidate(server_url, resource_ids, session_id))
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["open_sessions"] = sum(1 for entry in self._sessions.values() if entry.session_id)
+            return snapshot
+
+    def close_all(self):
+        """Close every pooled session. Failures are logged and ignored."""
+        with self._lock:
+            sessions = list(self._sessions.items())
+            self._sessions = {}
+        for (server_url, _), entry in sessions:
+            with entry.lock:
+                if entry.session_id is not None:
+                    self._close_quietly(server_url, entry.session_id)
+                    entry.session_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close_all()
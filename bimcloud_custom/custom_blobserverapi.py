@@ -0,0 +1,27 @@
+from bimcloud_api.blobserverapi import BlobServerApi
+from bimcloud_custom.retry_rules import is_transient_error
+from utils.retry import RetryPolicy
+from utils.metrics import MetricsHook
+
+# Endpoints whose requests must not be blindly replayed
+NON_IDEMPOTENT_ENDPOINTS = ('begin-batch-upload', 'commit-batch-upload', 'begin-upload', 'commit-upload')
+
+
+class CustomBlobServerApi(BlobServerApi):
+    def __init__(self, server_url, retry_policy=None, circuit_breaker=None, metrics=None):
+        super().__init__(server_url)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker
+        if metrics:
+            self.add_request_hook(MetricsHook(metrics))
+
+    def request(self, req, url, responseJson=True, **kwargs):
+        idempotent = not url.endswith(NON_IDEMPOTENT_ENDPOINTS)
+        return self.retry_policy.call(
+            super().request,
+            args=(req, url, responseJson),
+            kwargs=kwargs,
+            is_retryable=lambda error: is_transient_error(error, idempotent),
+            breaker=self.circuit_breaker,
+            description=f"Blob server request '{url}'"
+        )
@@ -1,20 +1,153 @@
 from bimcloud_api.managerapi import ManagerApi
 from bimcloud_api.url import join_url
+from bimcloud_custom.records import ProjectRecord, BackupRecord, decode_records
+from bimcloud_custom.retry_rules import is_transient_error
+from utils.retry import RetryPolicy
+from utils.metrics import MetricsHook
+import json
 import requests
+import threading
+
+# Endpoints whose requests must not be blindly replayed
+NON_IDEMPOTENT_ENDPOINTS = ('create-resource-backup',)
+
+# Connections kept open per host; enough for the default worker and backup job counts
+CONNECTION_POOL_SIZE = 16
+
+# Seconds the metadata cache keeps a response, by endpoint. Project listings are not
+# cached: the daemon polls them for edits. Backup listings change with every backup
+# created or deleted here, which invalidates them, so they only live for a short time.
+DEFAULT_CACHE_TTLS = {
+    'get-libraries': 3600,
+    'get-inherited-default-blob-server-id': 3600,
+    'get-resource': 600,
+    'get-backups': 60,
+    'get-resource-backups-by-criterion': 60,
+}
+BACKUP_LISTING_ENDPOINTS = ('get-backups', 'get-resource-backups-by-criterion')
 
 
 class CustomManagerApi(ManagerApi):
-    def __init__(self, manager_url):
+    def __init__(self, manager_url, retry_policy=None, circuit_breaker=None, metrics=None, compact_records=False,
+                 cache=None):
         super().__init__(manager_url)
+        # Return projects and backups as compact records instead of full resource dicts
+        self.compact_records = compact_records
+        # Optional TTLCache for metadata that rarely changes (see DEFAULT_CACHE_TTLS)
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker
+        if metrics:
+            self.add_request_hook(MetricsHook(metrics))
+        self._token_lock = threading.Lock()
+        self._refreshed_tokens = {}
+
+        # One session keeps connections to the Manager alive across requests and runs
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=CONNECTION_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._session_methods = {
+            requests.get: self.session.get,
+            requests.post: self.session.post,
+            requests.put: self.session.put,
+            requests.delete: self.session.delete,
+        }
+
+    def send(self, req, url, **kwargs):
+        # Route the module-level requests functions used by the API methods through the session
+        return super().send(self._session_methods.get(req, req), url, **kwargs)
+
+    def close(self):
+        if self.cache:
+            self.cache.save()
+        self.session.close()
+
+    def cached(self, endpoint, key, loader, tags=()):
+        """
+        Return the cached response of ``endpoint`` for ``key``, or load and cache it.
+
+        Args:
+            endpoint (str): Endpoint name, selecting the TTL.
+            key (tuple): Request arguments identifying the response.
+            loader (callable): Performs the request on a miss.
+            tags (iterable): Resource ids whose changes invalidate the response.
+        """
+        if self.cache is None:
+            return loader()
+        return self.cache.get_or_load(endpoint, key, loader, tags)
+
+    def invalidate_backups(self, resource_ids):
+        """Drop cached backup listings after backups of ``resource_ids`` were created or deleted."""
+        if self.cache is None:
+            return
+        self.cache.invalidate('get-backups')
+        self.cache.invalidate('get-resource-backups-by-criterion', resource_ids)
+
+    def get_token_by_refresh_token_grant(self, refresh_token, client_id):
+        # Parallel requests may all see an expired token at once; refresh tokens are
+        # single-use, so only the first caller refreshes and the others reuse its result
+        with self._token_lock:
+            refreshed = self._refreshed_tokens.get(refresh_token)
+            if refreshed is None:
+                refreshed = super().get_token_by_refresh_token_grant(refresh_token, client_id)
+                self._refreshed_tokens = {refresh_token: refreshed}
+            return refreshed
+
+    def refresh_on_expiration(self, req, auth_context, url, responseJson=True, **kwargs):
+        idempotent = not url.endswith(NON_IDEMPOTENT_ENDPOINTS)
+        return self.retry_policy.call(
+            super().refresh_on_expiration,
+            args=(req, auth_context, url, responseJson),
+            kwargs=kwargs,
+            is_retryable=lambda error: is_transient_error(error, idempotent),
+            breaker=self.circuit_breaker,
+            description=f"Manager request '{url}'"
+        )
+
+    def get_resource_list(self, req, auth_context, url, record_type, **kwargs):
+        """
+        Request a list of resources, decoded into ``record_type`` records in compact mode.
+        """
+        if not self.compact_records:
+            return self.refresh_on_expiration(req, auth_context, url, **kwargs)
+        content = self.refresh_on_expiration(req, auth_context, url, False, **kwargs)
+        return decode_records(content, record_type)
 
     def get_projects(self, auth_context):
         url = join_url(self._api_root, 'get-projects')
-        result = self.refresh_on_expiration(requests.get, auth_context, url)
+        result = self.get_resource_list(requests.get, auth_context, url, ProjectRecord)
         return result
 
     def get_libraries(self, auth_context):
         url = join_url(self._api_root, 'get-libraries')
-        result = self.refresh_on_expiration(requests.get, auth_context, url)
+        result = self.cached('get-libraries', (),
+                             lambda: self.refresh_on_expiration(requests.get, auth_context, url))
+        return result
+
+    def get_resource_by_id(self, auth_context, resource_id):
+        if resource_id is None:
+            raise ValueError('"resource_id" expected.')
+
+        url = join_url(self._api_root, 'get-resource')
+        result = self.cached('get-resource', (resource_id,),
+                             lambda: self.refresh_on_expiration(requests.get, auth_context, url,
+                                                                params={'resource-id': resource_id}),
+                             tags=(resource_id,))
+        return result
+
+    def get_inherited_default_blob_server_id(self, auth_context, resource_group_id):
+        url = join_url(self._api_root, 'get-inherited-default-blob-server-id')
+        result = self.cached('get-inherited-default-blob-server-id', (resource_group_id,),
+                             lambda: self.refresh_on_expiration(requests.get, auth_context, url,
+                                                                params={'resource-group-id': resource_group_id}))
+        return result
+
+    def delete_resources_by_id_list(self, auth_context, ids):
+        result = super().delete_resources_by_id_list(auth_context, ids)
+        if self.cache:
+            self.cache.invalidate('get-resource', ids)
+            self.invalidate_backups(ids)
         return result
 
     def create_resource_backup(self, auth_context, resource_id, backup_type, name):
@@ -22,21 +155,42 @@ class CustomManagerApi(ManagerApi):
         result = self.refresh_on_expiration(requests.post, auth_context, url,
                                             params={'resource-id': resource_id, 'backup-type': backup_type,
                                                     'backup-name': name}, json={})
+        self.invalidate_backups([resource_id])
         return result
 
     def get_backups(self, auth_context):
         url = join_url(self._api_root, 'get-backups')
-        result = self.refresh_on_expiration(requests.get, auth_context, url, params={}, json={})
+        result = self.cached('get-backups', (self.compact_records,),
+                             lambda: self.get_resource_list(requests.get, auth_context, url, BackupRecord,
+                                                            params={}, json={}))
         return result
 
     def get_resource_backups_by_criterion(self, auth_context, resourcesIds, filters={}, criterion={}):
         url = join_url(self._api_root, 'get-resource-backups-by-criterion')
-        result = self.refresh_on_expiration(requests.post, auth_context, url, params={},
-                                            json={'ids': resourcesIds, **filters, **criterion})
+        key = (tuple(sorted(resourcesIds)), json.dumps({**filters, **criterion}, sort_keys=True), self.compact_records)
+        result = self.cached('get-resource-backups-by-criterion', key,
+                             lambda: self.get_resource_list(requests.post, auth_context, url, BackupRecord, params={},
+                                                            json={'ids': resourcesIds, **filters, **criterion}),
+                             tags=resourcesIds)
         return result
 
+    def get_ticket_for_resources(self, auth_context, resource_ids):
+        """
+        Request one blob server access ticket covering several resources.
+        """
+        url = join_url(self._api_root, 'ticket-generator/get-ticket')
+        request = {
+            'type': 'freeTicket',
+            'resources': list(resource_ids),
+            'format': 'base64'
+        }
+        result = self.refresh_on_expiration(requests.post, auth_context, url, False, json=request)
+        assert isinstance(result, bytes), 'Result is not a bytes.'
+        return result.decode('utf-8')
+
     def delete_resource_backup(self, auth_context, resource_id, backup_id):
         url = join_url(self._api_root, 'delete-resource-backup')
         result = self.refresh_on_expiration(requests.delete, auth_context, url,
                                             params={'resource-id': resource_id, 'backup-id': backup_id}, json={})
+        self.invalidate_backups([resource_id])
         return result
@@ -0,0 +1,130 @@
+import io
+import json
+
+try:
+    import orjson
+except ImportError:  # optional, speeds up decoding of large resource lists
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # optional, decodes large lists item by item
+    ijson = None
+
+# Responses at least this large are decoded item by item when ijson is available, so the
+# full list of dicts never exists next to the records built from it
+STREAM_DECODE_THRESHOLD = 16 * 1024 ** 2
+
+
+class ResourceRecord:
+    """
+    Compact, read-only view of a Manager resource keeping only the fields the backup
+    needs. Records support the dict access used on raw resources (``record['$path']``,
+    ``record.get('name')``), so they can be passed wherever a resource dict was.
+    """
+    __slots__ = ()
+    FIELDS = {}  # JSON key -> attribute name
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls.__new__(cls)
+        for key, attribute in cls.FIELDS.items():
+            object.__setattr__(record, attribute, data.get(key))
+        return record
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key):
+        attribute = self.FIELDS.get(key)
+        if attribute is None:
+            raise KeyError(key)
+        return getattr(self, attribute)
+
+    def get(self, key, default=None):
+        attribute = self.FIELDS.get(key)
+        return default if attribute is None else getattr(self, attribute)
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def keys(self):
+        return self.FIELDS.keys()
+
+    def to_dict(self):
+        return {key: getattr(self, attribute) for key, attribute in self.FIELDS.items()}
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash((type(self), self.id))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class ProjectRecord(ResourceRecord):
+    __slots__ = ('id', 'name', 'path', 'path_on_server', 'modified_date')
+    FIELDS = {
+        'id': 'id',
+        'name': 'name',
+        '$path': 'path',
+        '$pathOnServer': 'path_on_server',
+        '$modifiedDate': 'modified_date',
+    }
+
+
+class BackupRecord(ResourceRecord):
+    __slots__ = ('id', 'name', 'backup_file_name', 'resource_id', 'resource_type')
+    FIELDS = {
+        'id': 'id',
+        '$name': 'name',
+        '$backupFileName': 'backup_file_name',
+        '$resourceId': 'resource_id',
+        '$resourceType': 'resource_type',
+    }
+
+
+def loads(content):
+    """Decode a JSON response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def decode_records(content, record_type, stream_threshold=STREAM_DECODE_THRESHOLD):
+    """
+    Decode a JSON list of resources into compact records.
+
+    Args:
+        content (bytes): Response body.
+        record_type (type): ResourceRecord subclass to build.
+        stream_threshold (int): Body size from which the list is decoded item by item (needs ijson).
+
+    Returns:
+        list: Records in response order.
+    """
+    if not content:
+        return []
+    if ijson is not None and len(content) >= stream_threshold:
+        items = ijson.items(io.BytesIO(content), 'item', use_float=True)
+    else:
+        items = loads(content)
+    return [record_type.from_dict(item) for item in items]
+
+
+RECORD_TYPES = {record_type.__name__: record_type for record_type in (ProjectRecord, BackupRecord)}
+
+
+def encode_record(value):
+    """``json.dumps`` default hook storing a record as a tagged dict."""
+    if isinstance(value, ResourceRecord):
+        return {'__record__': type(value).__name__, **value.to_dict()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def decode_record(data):
+    """``json.loads`` object hook restoring records stored by ``encode_record``."""
+    record_type = RECORD_TYPES.get(data.get('__record__'))
+    return record_type.from_dict(data) if record_type else data
@@ -0,0 +1,57 @@
+import requests
+from bimcloud_api.errors import BIMcloudManagerError, HttpError
+
+# BIMcloud Manager 430 error codes that describe a temporary condition
+RETRYABLE_MANAGER_ERROR_CODES = {
+    8,   # OptimisticLockError
+    10,  # LdapConnectionError
+    13,  # ModelServerSideError
+    21,  # GSIDConnectionError
+    26,  # NotYetAvailableError
+}
+
+RETRYABLE_HTTP_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# BIMcloud Manager 430 error code of a request without a valid session
+AUTHENTICATION_REQUIRED_ERROR_CODE = 2
+
+
+def is_transient_error(error, idempotent=True):
+    """
+    Decide whether a failed BIMcloud request is safe to retry.
+
+    Non-idempotent requests (e.g. creating a backup) are only retried when the
+    server certainly did not act on them: a refused connection or a BIMcloud
+    error code that rejects the request.
+    """
+    if isinstance(error, BIMcloudManagerError):
+        return error.code in RETRYABLE_MANAGER_ERROR_CODES
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not idempotent:
+        return False
+    if isinstance(error, HttpError):
+        return error.status_code in RETRYABLE_HTTP_STATUS_CODES
+    return isinstance(error, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        ConnectionError,
+        TimeoutError,
+    ))
+
+
+def is_authentication_error(error):
+    """
+    Decide whether a failed Manager request means the session is gone and only a new
+    login helps, e.g. the refresh token expired or was rejected (invalid_grant).
+    """
+    if isinstance(error, BIMcloudManagerError):
+        return error.code == AUTHENTICATION_REQUIRED_ERROR_CODE
+    if not isinstance(error, HttpError):
+        return False
+    if error.status_code == 401:
+        return True
+    try:
+        return error.status_code == 400 and error.response.json().get('error') == 'invalid_grant'
+    except (AttributeError, ValueError):
+        return False
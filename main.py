@@ -1,51 +1,227 @@
 import argparse
+import os
 import sys
 import io
-from utils.logger import setup_logger
+import signal
+from utils.logger import setup_logger, get_log_directory, shutdown_logging
 from utils.file_utils import set_logger
-from backup_manager import BackupManager
-from utils.gdrive import GoogleDriveAPI
+from backup_manager import BackupManager, CLEANUP_MODES
+from backup_daemon import BackupDaemon
+from backup_scrub import DriveScrubber
+from tenants import load_tenant_config, MultiTenantBackup
+from utils.bandwidth import BandwidthGovernor, parse_rate_profile
+from utils.leases import open_lease_store, ShardCoordinator, DEFAULT_LEASE_TTL
+from utils.project_selector import load_patterns
+from utils.manifest import UploadManifest
+from utils.retention import parse_retention
+from utils.gdrive import GoogleDriveAPI, GoogleDrivePool
+from utils.retry import RetryPolicy, CircuitBreaker
+from utils.scheduler import SCHEDULING_POLICIES
+from utils.metrics import MetricsRegistry
+from utils.tracing import SpanRecorder
+from utils.profiling import StageProfiler
 
 # Ensure proper handling of Unicode in the command-line interface
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+# Required unless a multi-tenant configuration file is given
+CONNECTION_OPTIONS = ('--manager_url', '--client_id', '--username', '--password', '--task', '--target_root',
+                      '--gdrive_root', '--file_extension')
+
 
 def main():
     # Argument parsing
     parser = argparse.ArgumentParser(description="BIMcloud Backup Script")
-    parser.add_argument('-m', '--manager_url', required=True, help='URL of the BIMcloud Manager')
-    parser.add_argument('-c', '--client_id', required=True, help='Client ID for BIMcloud')
-    parser.add_argument('-u', '--username', required=True, help='Username for BIMcloud authentication')
-    parser.add_argument('-p', '--password', required=True, help='Password for BIMcloud authentication')
-    parser.add_argument('-t', '--task', required=True, choices=['all', 'edited', 'selected'], help='Backup task type')
-    parser.add_argument('-prj', '--project_path', help='Optional: Path to a specific project to back up (for selected task)')
-    parser.add_argument('-tgt', '--target_root', required=True, help='Target root directory for copying backup files')
-    parser.add_argument('-gdr', '--gdrive_root', required=True, help='Google Drive root directory id')
-    parser.add_argument('-ext', '--file_extension', required=True, help='Backup files extension')
+    parser.add_argument('-m', '--manager_url', help='URL of the BIMcloud Manager')
+    parser.add_argument('-c', '--client_id', help='Client ID for BIMcloud')
+    parser.add_argument('-u', '--username', help='Username for BIMcloud authentication')
+    parser.add_argument('-p', '--password', help='Password for BIMcloud authentication')
+    parser.add_argument('-t', '--task', choices=['all', 'edited', 'selected'], help='Backup task type')
+    parser.add_argument('-prj', '--project_path', nargs='+',
+                        help="Optional: Paths or patterns of projects to back up (for selected task), e.g. "
+                             "'Office/Tower A', 'Office/' for a whole folder or 'Office/*/Tower*'")
+    parser.add_argument('--project_list',
+                        help='Optional: File with project paths or patterns to back up, one per line (for selected task)')
+    parser.add_argument('-tgt', '--target_root', help='Target root directory for copying backup files')
+    parser.add_argument('-gdr', '--gdrive_root', help='Google Drive root directory id')
+    parser.add_argument('-ext', '--file_extension', help='Backup files extension')
+    parser.add_argument('--retry_attempts', type=int, default=4,
+                        help='Attempts per request before a transient error is reported (default: 4)')
+    parser.add_argument('--retry_max_delay', type=float, default=60,
+                        help='Maximum backoff delay in seconds between attempts (default: 60)')
+    parser.add_argument('--breaker_threshold', type=int, default=5,
+                        help='Consecutive transient failures that open a backend circuit breaker (default: 5)')
+    parser.add_argument('--breaker_reset', type=float, default=300,
+                        help='Seconds an open circuit breaker waits before probing the backend again (default: 300)')
+    parser.add_argument('--max_disk_usage', type=float, default=0.9,
+                        help='Highest allowed fraction of the backup volume in use before new backups wait (default: 0.9)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of projects processed in parallel (default: 4)')
+    parser.add_argument('--max_backup_jobs', type=int, default=4,
+                        help='Ceiling for concurrent server-side backup jobs; the actual limit adapts to '
+                             'Manager latency and errors (default: 4)')
+    parser.add_argument('--schedule', choices=list(SCHEDULING_POLICIES), default='longest',
+                        help='Order in which projects are processed, based on previous runs (default: longest)')
+    parser.add_argument('--cleanup', choices=list(CLEANUP_MODES), default='targeted',
+                        help='targeted: delete only the backups created by this run (default); '
+                             'gc: also delete every other project backup found on the server')
+    parser.add_argument('--verify_checksum', action='store_true',
+                        help='Hash every archive before upload and compare its MD5 with the checksum Drive reports')
+    parser.add_argument('--retention',
+                        help="Keep overwritten archives as Drive snapshots, pruned by a policy such as "
+                             "'daily=7,weekly=4,monthly=12' (periods: last, daily, weekly, monthly, yearly)")
+    parser.add_argument('--manager_cache', action='store_true',
+                        help='Keep cached Manager metadata (libraries, resources, backup lists) between runs in '
+                             'logs/<client_id>.cache.json')
+    parser.add_argument('--gdrive_service_accounts', nargs='+', metavar='KEY_FILE',
+                        help='Service account key files sharing access to a shared drive; uploads and Drive '
+                             'requests are spread over them instead of using token.json')
+    parser.add_argument('--max_upload_rate', type=float,
+                        help='Upload bandwidth limit for Google Drive in MiB/s (default: unlimited)')
+    parser.add_argument('--upload_profile',
+                        help="Time-of-day share of --max_upload_rate in percent, e.g. '22-6:100,6-22:20'")
+    parser.add_argument('--daily_upload_cap', type=float,
+                        help='Bytes uploaded per day in GiB; projects whose archives do not fit are deferred '
+                             '(Drive allows about 750 GB per day; default: unlimited)')
+    parser.add_argument('--metrics_dir',
+                        help='Directory for the Prometheus textfile and JSON run summary (default: logs directory)')
+    parser.add_argument('--trace', action='store_true',
+                        help='Record request and stage spans into logs/<client_id>.trace.json')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile pipeline stages and write pstats and flamegraph files next to the log')
+    parser.add_argument('--log_format', choices=['text', 'json'], default='text',
+                        help='Format of the log file; json writes one object per line (default: text)')
+    parser.add_argument('--log_max_size', type=float, default=10,
+                        help='Size in MiB at which the log file is rotated, 0 disables rotation (default: 10)')
+    parser.add_argument('--log_backups', type=int, default=5,
+                        help='Number of rotated log files to keep (default: 5)')
+    parser.add_argument('--config',
+                        help='JSON file defining several managers and Drive destinations backed up in one process; '
+                             'replaces the connection arguments above')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and back up projects shortly after they were edited')
+    parser.add_argument('--poll_interval', type=float, default=60,
+                        help='Daemon mode: seconds between checks for edited projects (default: 60)')
+    parser.add_argument('--debounce', type=float, default=300,
+                        help='Daemon mode: seconds a project must stay unchanged before it is backed up (default: 300)')
+
+    parser.add_argument('--scrub', action='store_true',
+                        help='Instead of a backup, check the archives on Drive against the upload manifest')
+    parser.add_argument('--scrub_sample', type=float, default=1.0,
+                        help='Scrub: fraction of the files needing a download that are downloaded (default: 1)')
+    parser.add_argument('--scrub_deep', action='store_true',
+                        help='Scrub: download and hash files even if Drive reports a checksum')
+    parser.add_argument('--scrub_workers', type=int, default=4,
+                        help='Scrub: folders listed and files downloaded in parallel (default: 4)')
+    parser.add_argument('--scrub_quota_share', type=float, default=0.25,
+                        help='Scrub: share of the Drive request rate used by the scrub (default: 0.25)')
+    parser.add_argument('--scrub_download_rate', type=float,
+                        help='Scrub: download bandwidth limit in MiB/s (default: unlimited)')
+
+    parser.add_argument('--lease_store',
+                        help='Split the run between several workers: shared SQLite file (*.db) or lease directory')
+    parser.add_argument('--worker_id', help='Unique id of this worker in a split run (default: host name and process id)')
+    parser.add_argument('--lease_ttl', type=float, default=DEFAULT_LEASE_TTL,
+                        help=f'Seconds a project claim survives without renewal (default: {DEFAULT_LEASE_TTL})')
+    parser.add_argument('--run_id', help='Id shared by the workers of one split run, new for every run '
+                                         '(required with --lease_store)')
 
     args = parser.parse_args()
+    if args.lease_store and (args.config or args.daemon):
+        parser.error("--lease_store cannot be combined with --config or --daemon")
+    if args.lease_store and not args.run_id:
+        parser.error("--lease_store requires --run_id, e.g. the id of the scheduled job that starts the workers")
+    if args.scrub:
+        if args.config or args.daemon or args.lease_store:
+            parser.error("--scrub cannot be combined with --config, --daemon or --lease_store")
+        missing = [option for option in ('--client_id', '--gdrive_root') if not getattr(args, option.lstrip('-'))]
+        if missing:
+            parser.error(f"the following arguments are required: {', '.join(missing)}")
+    elif args.config:
+        if args.daemon:
+            parser.error("--daemon cannot be combined with --config")
+    else:
+        missing = [option for option in CONNECTION_OPTIONS if not getattr(args, option.lstrip('-'))]
+        if missing:
+            parser.error(f"the following arguments are required: {', '.join(missing)}")
+    log_name = 'tenants' if args.config else args.client_id
 
     # Set up logging
-    logger = setup_logger("backup_manager", f'{args.client_id}.log')
+    logger = setup_logger("backup_manager", f'{log_name}.log',
+                          json_format=args.log_format == 'json',
+                          max_bytes=int(args.log_max_size * 1024 ** 2),
+                          backup_count=args.log_backups)
 
     # Configure file_utils logger
-    set_logger(args.client_id)
+    set_logger(log_name)
+
+    retry_policy = RetryPolicy(max_attempts=args.retry_attempts, max_delay=args.retry_max_delay)
 
     try:
-        drive_api = GoogleDriveAPI()
-    except RuntimeError as e:
-        if str(e) == "GOOGLE_TOKEN_INVALID":
-            logger.error("Google Drive token expired or revoked. Run the script manually to re-authenticate.")
-            sys.exit(1)
-        elif str(e) == "GOOGLE_AUTH_REQUIRED":
-            logger.error("Google Drive authorization required. Run manually to authorize and create token.json.")
+        bandwidth = build_bandwidth_governor(args, log_name)
+        retention = parse_retention(args.retention) if args.retention else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    profiler = None
+    if args.profile:
+        profiler = StageProfiler(os.path.join(get_log_directory(), f'{log_name}.profile'))
+        profiler.start()
+
+    # finish() also runs when a step below exits early, so a profile is written for failed runs too
+    try:
+        run(args, retry_policy, bandwidth, retention, profiler, logger)
+    finally:
+        finish(profiler, logger)
+
+
+def run(args, retry_policy, bandwidth, retention, profiler, logger):
+    """
+    Run the backup, daemon, scrub or multi-tenant mode selected on the command line.
+    """
+    if args.config:
+        run_tenants(args, retry_policy, bandwidth, profiler, logger)
+        return
+
+    metrics = MetricsRegistry({'client': args.client_id})
+
+    project_patterns = list(args.project_path or [])
+    if args.project_list:
+        try:
+            project_patterns += load_patterns(args.project_list)
+        except OSError as e:
+            logger.error(f"Failed to read the project list: {e}")
             sys.exit(1)
+
+    try:
+        drive_options = dict(
+            retry_policy=retry_policy,
+            circuit_breaker=CircuitBreaker('drive', args.breaker_threshold, args.breaker_reset),
+            bandwidth=bandwidth
+        )
+        if args.gdrive_service_accounts:
+            drive_api = GoogleDrivePool.from_service_accounts(
+                args.gdrive_service_accounts,
+                state_path=os.path.join(get_log_directory(), f'{args.client_id}.drive_pool.json'),
+                **drive_options
+            )
+            drive_api.set_metrics(metrics)
         else:
-            logger.error(f"Unexpected authorization error: {e}")
-            sys.exit(1)
+            drive_api = GoogleDriveAPI(metrics=metrics, **drive_options)
+    except RuntimeError as e:
+        report_drive_authorization_error(e, logger)
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to load Google service account keys: {e}")
+        sys.exit(1)
+
+    if args.scrub:
+        run_scrub(args, drive_api, logger)
+        return
 
     # Instantiate BackupManager with parsed arguments
+    backup_manager = None
     try:
         backup_manager = BackupManager(
             manager_url=args.manager_url,
@@ -53,17 +229,144 @@ def main():
             username=args.username,
             password=args.password,
             task=args.task,
-            project_path=args.project_path,
+            project_path=project_patterns,
             target_root=args.target_root,
             gdrive_root=args.gdrive_root,
             gdrive_api=drive_api,
-            file_extension = args.file_extension
+            file_extension = args.file_extension,
+            retry_policy=retry_policy,
+            circuit_breaker=CircuitBreaker('manager', args.breaker_threshold, args.breaker_reset),
+            max_disk_usage=args.max_disk_usage,
+            workers=args.workers,
+            max_backup_jobs=args.max_backup_jobs,
+            schedule=args.schedule,
+            metrics=metrics,
+            metrics_dir=args.metrics_dir,
+            tracer=SpanRecorder() if args.trace else None,
+            profiler=profiler,
+            shard=ShardCoordinator(open_lease_store(args.lease_store), args.worker_id, args.run_id,
+                                   args.lease_ttl) if args.lease_store else None,
+            cleanup_mode=args.cleanup,
+            bandwidth=bandwidth,
+            verify_checksum=args.verify_checksum,
+            persist_cache=args.manager_cache,
+            retention=retention
         )
 
-        # Run the backup task
-        backup_manager.run_backup()
+        if args.daemon:
+            daemon = BackupDaemon(backup_manager, poll_interval=args.poll_interval, debounce=args.debounce)
+            signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+            try:
+                daemon.run()
+            except KeyboardInterrupt:
+                daemon.stop()
+        else:
+            # Run the backup task
+            backup_manager.run_backup()
     except Exception as e:
         logger.error(f"Error in main execution: {e}")
+    finally:
+        if backup_manager:
+            backup_manager.close()
+
+
+def report_drive_authorization_error(error, logger):
+    if str(error) == "GOOGLE_TOKEN_INVALID":
+        logger.error("Google Drive token expired or revoked. Run the script manually to re-authenticate.")
+    elif str(error) == "GOOGLE_AUTH_REQUIRED":
+        logger.error("Google Drive authorization required. Run manually to authorize and create token.json.")
+    else:
+        logger.error(f"Unexpected authorization error: {error}")
+
+
+def build_bandwidth_governor(args, log_name, config=None):
+    """
+    Create the upload bandwidth governor from the command line, where a multi-tenant
+    configuration file may override each setting. Returns None if no limit is set.
+    """
+    config = config or {}
+    max_rate = config.get('max_upload_rate', args.max_upload_rate)
+    profile = config.get('upload_profile', args.upload_profile)
+    daily_cap = config.get('daily_upload_cap', args.daily_upload_cap)
+    if not (max_rate or daily_cap):
+        return None
+    return BandwidthGovernor(
+        max_rate=max_rate * 1024 ** 2 if max_rate else None,
+        profile=parse_rate_profile(profile) if profile else None,
+        daily_cap=int(daily_cap * 1024 ** 3) if daily_cap else None,
+        state_path=os.path.join(get_log_directory(), f'{log_name}.bandwidth.json')
+    )
+
+
+def run_tenants(args, retry_policy, bandwidth, profiler, logger):
+    """
+    Back up every tenant of the configuration file on shared workers, uploads and bandwidth.
+    """
+    backup = None
+    try:
+        config, tenants = load_tenant_config(args.config)
+        if any(key in config for key in ('max_upload_rate', 'upload_profile', 'daily_upload_cap')):
+            bandwidth = build_bandwidth_governor(args, 'tenants', config)
+        backup = MultiTenantBackup(
+            tenants,
+            workers=config.get('workers', args.workers),
+            upload_slots=config.get('upload_slots'),
+            bandwidth=bandwidth,
+            retry_policy=retry_policy,
+            breaker_threshold=args.breaker_threshold,
+            breaker_reset=args.breaker_reset,
+            metrics_dir=args.metrics_dir,
+            tracer=SpanRecorder() if args.trace else None,
+            profiler=profiler
+        )
+        backup.run()
+    except RuntimeError as e:
+        report_drive_authorization_error(e, logger)
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Error in main execution: {e}")
+    finally:
+        if backup:
+            backup.close()
+
+
+def run_scrub(args, drive_api, logger):
+    """
+    Check the archives on Drive against the upload manifest. Exits with status 2 if
+    any archive drifted and with status 1 if the scrub itself failed.
+    """
+    drift = False
+    failed = False
+    try:
+        log_directory = get_log_directory()
+        scrubber = DriveScrubber(
+            drive_api,
+            args.gdrive_root,
+            UploadManifest(os.path.join(log_directory, f'{args.client_id}.manifest.json')),
+            workers=args.scrub_workers,
+            sample=args.scrub_sample,
+            deep=args.scrub_deep,
+            request_share=args.scrub_quota_share,
+            bandwidth=BandwidthGovernor(max_rate=args.scrub_download_rate * 1024 ** 2)
+            if args.scrub_download_rate else None,
+            report_path=os.path.join(log_directory, f'{args.client_id}.scrub.json')
+        )
+        drift = bool(scrubber.run()['drift'])
+    except Exception as e:
+        logger.error(f"Error during scrub: {e}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    if drift:
+        sys.exit(2)
+
+
+def finish(profiler, logger):
+    if profiler:
+        profiler.stop()
+        for path in profiler.write():
+            logger.info(f"Profile written to {path}")
+    shutdown_logging()
 
 
 if __name__ == "__main__":
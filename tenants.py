@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from backup_manager import BackupManager
+from utils.gdrive import GoogleDriveAPI, GoogleDrivePool
+from utils.logger import get_log_directory
+from utils.metrics import MetricsRegistry, write_prometheus_textfile
+from utils.project_selector import load_patterns
+from utils.retention import parse_retention
+from utils.retry import CircuitBreaker
+from utils.scheduler import estimate_durations, interleave_fairly
+
+# Settings every tenant needs, either in its own entry or in "defaults"
+REQUIRED_SETTINGS = ('manager_url', 'client_id', 'username', 'password', 'task', 'gdrive_root', 'file_extension')
+
+logger = logging.getLogger("backup_manager")
+
+
+def load_tenant_config(path):
+    """
+    Load a multi-tenant configuration file.
+
+    The file holds process-wide settings (``workers``, ``upload_slots``, ``max_upload_rate``,
+    ``upload_profile``, ``daily_upload_cap``), optional ``defaults`` and a list of ``tenants``;
+    every tenant entry is merged over the defaults. A tenant may name an environment
+    variable holding its password in ``password_env`` instead of ``password``.
+
+    Returns:
+        tuple: (config dict, list of tenant settings dicts)
+    """
+    with open(path, "r", encoding="utf-8") as config_file:
+        config = json.load(config_file)
+
+    defaults = config.get('defaults', {})
+    tenants = []
+    names = set()
+    for entry in config.get('tenants', []):
+        tenant = {**defaults, **entry}
+        if 'password_env' in tenant:
+            if tenant['password_env'] not in os.environ:
+                raise ValueError(f"Environment variable '{tenant['password_env']}' is not set.")
+            tenant['password'] = os.environ[tenant['password_env']]
+        missing = [key for key in REQUIRED_SETTINGS if not tenant.get(key)]
+        tenant['name'] = tenant.get('name') or tenant.get('client_id')
+        if missing:
+            raise ValueError(f"Tenant '{tenant['name']}' is missing: {', '.join(missing)}")
+        if tenant['name'] in names:
+            raise ValueError(f"Duplicate tenant name: {tenant['name']}")
+        names.add(tenant['name'])
+        tenants.append(tenant)
+
+    if not tenants:
+        raise ValueError("The configuration does not define any tenants.")
+    return config, tenants
+
+
+def tenant_project_patterns(tenant):
+    """Combine a tenant's ``project_path`` (a path or a list) with the patterns of its ``project_list`` file."""
+    patterns = tenant.get('project_path') or []
+    patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+    if tenant.get('project_list'):
+        patterns += load_patterns(tenant['project_list'])
+    return patterns
+
+
+class MultiTenantBackup:
+    """
+    Backs up several BIMcloud Managers in one process.
+
+    All tenants share one worker pool, the Drive clients (one per distinct Google
+    credential, with its request rate limiter and folder cache), a limit on
+    concurrent uploads and an upload bandwidth budget. Projects of all tenants are
+    interleaved by estimated work and tenant ``weight``, so a large office cannot
+    starve a small one. Every tenant keeps its own history, log prefix and metrics files.
+
+    Args:
+        tenants (list): Tenant settings as returned by ``load_tenant_config``.
+        workers (int): Projects processed in parallel across all tenants.
+        upload_slots (int): Maximum concurrent uploads across all tenants (default: unlimited).
+        bandwidth (BandwidthGovernor): Upload rate limit and daily budget shared by all tenants.
+        retry_policy (RetryPolicy): Retry policy for Manager and Drive requests.
+        breaker_threshold (int): Consecutive failures that open a circuit breaker.
+        breaker_reset (float): Seconds an open circuit breaker waits before probing.
+        metrics_dir (str): Directory for the metrics files.
+        tracer (SpanRecorder): Optional recorder of request and stage spans.
+        profiler (StageProfiler): Optional stage profiler.
+    """
+
+    def __init__(self, tenants, workers=8, upload_slots=None, bandwidth=None, retry_policy=None,
+                 breaker_threshold=5, breaker_reset=300, metrics_dir=None, tracer=None, profiler=None):
+        self.metrics_dir = metrics_dir or get_log_directory()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backup")
+        self.upload_slots = threading.BoundedSemaphore(upload_slots) if upload_slots else None
+        self.bandwidth = bandwidth
+
+        # Drive request metrics cannot be attributed to one tenant; they are exported separately
+        self.drive_metrics = MetricsRegistry({"tenant": "shared"})
+        self.drive_apis = {}
+        self.managers = {}
+        self.weights = {}
+        for tenant in tenants:
+            name = tenant['name']
+            # Drive authorization errors concern every tenant and are left to the caller
+            gdrive_api = self.get_drive_api(tenant, retry_policy, breaker_threshold, breaker_reset)
+            try:
+                self.managers[name] = BackupManager(
+                    manager_url=tenant['manager_url'],
+                    username=tenant['username'],
+                    password=tenant['password'],
+                    client_id=tenant['client_id'],
+                    task=tenant['task'],
+                    project_path=tenant_project_patterns(tenant),
+                    target_root=tenant.get('target_root'),
+                    gdrive_root=tenant['gdrive_root'],
+                    gdrive_api=gdrive_api,
+                    file_extension=tenant['file_extension'],
+                    retry_policy=retry_policy,
+                    circuit_breaker=CircuitBreaker(f"manager:{name}", breaker_threshold, breaker_reset),
+                    max_disk_usage=tenant.get('max_disk_usage', 0.9),
+                    workers=workers,
+                    max_backup_jobs=tenant.get('max_backup_jobs', 4),
+                    schedule=tenant.get('schedule', 'longest'),
+                    cleanup_mode=tenant.get('cleanup', 'targeted'),
+                    bandwidth=self.bandwidth,
+                    verify_checksum=tenant.get('verify_checksum', False),
+                    persist_cache=tenant.get('manager_cache', False),
+                    retention=parse_retention(tenant['retention']) if tenant.get('retention') else None,
+                    metrics_dir=self.metrics_dir,
+                    tracer=tracer,
+                    profiler=profiler,
+                    name=name,
+                    executor=self.executor,
+                    upload_slots=self.upload_slots,
+                    trace_path=os.path.join(get_log_directory(), 'tenants.trace.json')
+                )
+                self.weights[name] = tenant.get('weight', 1)
+            except Exception as e:
+                logger.error(f"[{name}] Failed to initialize tenant, skipping it: {e}")
+
+    def get_drive_api(self, tenant, retry_policy, breaker_threshold, breaker_reset):
+        """Return the Drive client for the tenant's Google credentials, creating it on first use."""
+        service_accounts = tuple(tenant.get('gdrive_service_accounts') or ())
+        key = service_accounts or (tenant.get('gdrive_credentials'), tenant.get('gdrive_token'))
+        if key not in self.drive_apis:
+            options = dict(
+                retry_policy=retry_policy,
+                circuit_breaker=CircuitBreaker(f"drive:{len(self.drive_apis) + 1}", breaker_threshold, breaker_reset),
+                bandwidth=self.bandwidth
+            )
+            if service_accounts:
+                # Tenants sharing the same service accounts share one pool and one usage file
+                accounts = '\n'.join(sorted(Path(key_file).stem for key_file in service_accounts))
+                state_path = os.path.join(
+                    get_log_directory(),
+                    f"tenants.drive_pool.{hashlib.sha1(accounts.encode('utf-8')).hexdigest()[:8]}.json")
+                drive_api = GoogleDrivePool.from_service_accounts(service_accounts, state_path=state_path, **options)
+                drive_api.set_metrics(self.drive_metrics)
+            else:
+                drive_api = GoogleDriveAPI(key[0], key[1], metrics=self.drive_metrics, **options)
+            self.drive_apis[key] = drive_api
+        return self.drive_apis[key]
+
+    def run(self):
+        """
+        Select and schedule the projects of every tenant, back them up on the shared
+        pool in fair order, then clean up and report each tenant.
+        """
+        queues = {}
+        durations = {}
+        if self.bandwidth:
+            self.bandwidth.reset_reservations()
+        for name, manager in self.managers.items():
+            manager.start_run()
+            try:
+                projects = manager.apply_upload_budget(manager.schedule_projects(manager.select_projects_for_run()))
+            except Exception as e:
+                manager.logger.error(f"Error during backup process: {e}")
+                continue
+            queues[name] = projects
+            durations[name] = estimate_durations(projects, manager.history)
+
+        order = interleave_fairly(queues, durations, self.weights)
+        logger.info(f"Running {len(order)} project(s) of {len(queues)} tenant(s) on a shared pool.")
+        futures = [self.executor.submit(self.managers[name].process_project, project) for name, project in order]
+        wait(futures)
+
+        for name, manager in self.managers.items():
+            try:
+                if name in queues:
+                    manager.cleanup()
+            except Exception as e:
+                manager.logger.error(f"Error during backup process: {e}")
+            finally:
+                manager.finish_run()
+        self.export_drive_metrics()
+
+    def export_drive_metrics(self):
+        self.drive_metrics.set("run_finished_timestamp_seconds", datetime.now(timezone.utc).timestamp())
+        if self.bandwidth:
+            for key, value in self.bandwidth.stats().items():
+                self.drive_metrics.set(f"upload_bandwidth_{key}", value)
+        try:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+            write_prometheus_textfile(self.drive_metrics, os.path.join(self.metrics_dir, 'shared.prom'))
+        except OSError as e:
+            logger.error(f"Failed to write metrics: {e}")
+
+    def close(self):
+        for manager in self.managers.values():
+            manager.close()
+        self.executor.shutdown()
@@ -0,0 +1,125 @@
+import logging
+import os
+import shutil
+import statistics
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger("backup_manager")
+
+DEFAULT_ARCHIVE_ESTIMATE = 2 * 1024 ** 3  # Used until a project has a recorded archive size
+# A waiting job holds a worker slot, so space that is not freed soon defers the project instead
+DEFAULT_WAIT_TIMEOUT = 60
+
+
+class AdmissionDeniedError(RuntimeError):
+    """Raised when a backup job would push the backup volume over its usage limit."""
+
+
+class DiskSpaceAdmission:
+    """
+    Admission control for server-side backup creation.
+
+    Every admitted job reserves the estimated size of its archive on the volume
+    holding the project. A job is admitted only while the volume's used space plus
+    all outstanding reservations stays below ``max_usage`` of its capacity. When
+    the limit is reached, callers wait briefly for running jobs to release space;
+    if no job is holding space on that volume, or the space is not freed within
+    ``wait_timeout``, the request is denied and the project deferred.
+
+    Args:
+        history (RunHistory): Source of archive sizes from previous runs.
+        max_usage (float): Highest allowed fraction of the volume in use (0-1).
+        safety_factor (float): Multiplier applied to historic archive sizes.
+        wait_timeout (float): Total seconds to wait for space before denying admission.
+    """
+
+    def __init__(self, history, max_usage=0.9, safety_factor=1.2, wait_timeout=DEFAULT_WAIT_TIMEOUT):
+        if not 0 < max_usage <= 1:
+            raise ValueError("max_usage must be within (0, 1].")
+        self.history = history
+        self.max_usage = max_usage
+        self.safety_factor = safety_factor
+        self.wait_timeout = wait_timeout
+        self._condition = threading.Condition()
+        self._reservations = {}  # project id -> (volume, reserved bytes)
+        self._holders = {}  # volume -> number of admitted jobs
+
+    def estimate(self, project_id):
+        """Estimate the archive size of a project from previous runs."""
+        size = self.history.get(project_id, "archive_size")
+        if size is None:
+            known_sizes = self.history.values("archive_size")
+            size = statistics.median(known_sizes) if known_sizes else DEFAULT_ARCHIVE_ESTIMATE
+        return int(size * self.safety_factor)
+
+    @staticmethod
+    def _existing_path(path):
+        path = Path(path)
+        while not path.exists() and path != path.parent:
+            path = path.parent
+        return path
+
+    def _volume(self, path):
+        return os.stat(path).st_dev
+
+    def _projected_usage(self, volume, path, extra):
+        usage = shutil.disk_usage(path)
+        reserved = sum(size for vol, size in self._reservations.values() if vol == volume)
+        return (usage.used + reserved + extra) / usage.total
+
+    def admit(self, project_id, project_path):
+        """
+        Reserve space for a new backup of ``project_id`` stored under ``project_path``.
+
+        Raises:
+            AdmissionDeniedError: If the projected usage stays above the limit.
+        """
+        try:
+            path = self._existing_path(project_path)
+            volume = self._volume(path)
+        except OSError as e:
+            logger.warning(f"Cannot inspect backup volume for '{project_path}', admitting without check: {e}")
+            return
+
+        estimate = self.estimate(project_id)
+        deadline = time.monotonic() + self.wait_timeout
+        with self._condition:
+            while True:
+                projected = self._projected_usage(volume, path, estimate)
+                if projected <= self.max_usage:
+                    break
+                if not self._holders.get(volume):
+                    raise AdmissionDeniedError(
+                        f"Projected backup volume usage {projected:.1%} exceeds limit {self.max_usage:.0%} "
+                        f"(estimated archive size {estimate / 1024 ** 2:.0f} MiB)"
+                    )
+                logger.info(f"Waiting for backup space: projected usage {projected:.1%} > {self.max_usage:.0%}")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(timeout=remaining):
+                    raise AdmissionDeniedError(f"Timed out waiting for backup space on '{path}'")
+
+            self._reservations[project_id] = (volume, estimate)
+            self._holders[volume] = self._holders.get(volume, 0) + 1
+
+    def materialize(self, project_id, archive_size):
+        """
+        Record the real archive size once the backup file exists. Its space is now
+        part of the volume's used space, so the reservation itself is dropped.
+        """
+        self.history.record(project_id, archive_size=archive_size)
+        with self._condition:
+            if project_id in self._reservations:
+                volume, _ = self._reservations[project_id]
+                self._reservations[project_id] = (volume, 0)
+
+    def release(self, project_id):
+        """Release the job's claim on the volume after its archive was removed or abandoned."""
+        with self._condition:
+            reservation = self._reservations.pop(project_id, None)
+            if reservation is None:
+                return
+            volume, _ = reservation
+            self._holders[volume] -= 1
+            self._condition.notify_all()
@@ -0,0 +1,364 @@
+import asyncio
+import inspect
+import logging
+import os
+from utils.async_http import (DEFAULT_CONNECTION_LIMIT, create_session, request_with_hooks, acquire_tokens,
+                              is_transient_connection_error, require_aiohttp)
+from utils.gdrive import (DRIVE_RATE_LIMITER, BANDWIDTH_CHUNK_SIZE, FOLDER_MIME_TYPE, RATE_LIMIT_REASONS,
+                          RETRYABLE_STATUS_CODES, QUOTA_EXHAUSTED_REASONS)
+from utils.metrics import MetricsHook
+from utils.retry import RetryPolicy
+
+DRIVE_ROOT_URL = 'https://www.googleapis.com/'
+# Resumable upload chunks must be multiples of 256 KiB
+UPLOAD_CHUNK_SIZE = 16 * 1024 ** 2
+
+logger = logging.getLogger("backup_manager")
+
+
+class AsyncDriveError(Exception):
+    """Drive API error response of the asyncio client."""
+
+    def __init__(self, response, endpoint):
+        self.status = response.status_code
+        self.reason = None
+        message = response.reason
+        try:
+            error = response.json().get('error', {})
+            message = error.get('message', message)
+            errors = error.get('errors', [])
+            self.reason = errors[0].get('reason') if errors else None
+        except (AttributeError, ValueError):
+            pass
+        super().__init__(f"Drive request '{endpoint}' failed with {self.status}: {message}")
+
+
+def is_async_rate_limit_error(error):
+    return isinstance(error, AsyncDriveError) and (
+        error.status == 429 or (error.status == 403 and error.reason in RATE_LIMIT_REASONS))
+
+
+def is_async_quota_exhausted_error(error):
+    return isinstance(error, AsyncDriveError) and error.status == 403 and error.reason in QUOTA_EXHAUSTED_REASONS
+
+
+def is_transient_async_drive_error(error):
+    if isinstance(error, AsyncDriveError):
+        return is_async_rate_limit_error(error) or error.status in RETRYABLE_STATUS_CODES
+    return is_transient_connection_error(error) or isinstance(error, (ConnectionError, TimeoutError))
+
+
+class AsyncGoogleDriveAPI:
+    """
+    asyncio Drive v3 client for uploads and metadata, built on aiohttp.
+
+    Offers the calls of ``GoogleDriveAPI`` used by the backup as coroutines: folder
+    lookups, file metadata and listings, server-side copies, deletions and resumable
+    uploads that continue from the last byte the server acknowledged after a failed
+    chunk. Requests share the token bucket, retry policy, circuit breaker and bandwidth
+    governor semantics of the blocking client, and wait for them without blocking the
+    event loop. Credentials are refreshed in a worker thread when they expire.
+
+    Args:
+        credentials (google.auth.credentials.Credentials): Authorized Drive credentials.
+        rate_limiter (TokenBucket): Request rate limiter (default: the process-wide Drive limiter).
+        retry_policy (RetryPolicy): Retry policy for Drive requests.
+        circuit_breaker (CircuitBreaker): Optional circuit breaker for Drive.
+        metrics (MetricsRegistry): Optional registry for request metrics.
+        root_url (str): Drive endpoint, e.g. a local mock server.
+        bandwidth (BandwidthGovernor): Optional upload rate limit and daily budget.
+        chunk_size (int): Upload chunk size in bytes.
+        supports_all_drives (bool): Opt into shared drives on every call.
+        connection_limit (int): Connections kept open to Drive.
+    """
+
+    def __init__(self, credentials, rate_limiter=None, retry_policy=None, circuit_breaker=None, metrics=None,
+                 root_url=None, bandwidth=None, chunk_size=None, supports_all_drives=False,
+                 connection_limit=DEFAULT_CONNECTION_LIMIT):
+        require_aiohttp()
+        self.creds = credentials
+        self.rate_limiter = rate_limiter or DRIVE_RATE_LIMITER
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=6)
+        self.circuit_breaker = circuit_breaker
+        self.root_url = (root_url or DRIVE_ROOT_URL).rstrip('/') + '/'
+        self.bandwidth = bandwidth
+        self.chunk_size = chunk_size or (BANDWIDTH_CHUNK_SIZE if bandwidth else UPLOAD_CHUNK_SIZE)
+        self.supports_all_drives = supports_all_drives
+        self.connection_limit = connection_limit
+        self.request_hooks = []
+        self.metrics = None
+        if metrics:
+            self.set_metrics(metrics)
+        self._session = None
+        self._auth_lock = asyncio.Lock()
+        self._folder_cache = {}
+        self._folder_lock = asyncio.Lock()
+
+    @classmethod
+    def from_drive_api(cls, drive_api, **options):
+        """
+        Create an asyncio client sharing the credentials, rate limiter, retry policy,
+        circuit breaker, bandwidth governor and folder cache of a ``GoogleDriveAPI``.
+        """
+        client = cls(
+            drive_api.creds,
+            rate_limiter=drive_api.rate_limiter,
+            retry_policy=drive_api.retry_policy,
+            circuit_breaker=drive_api.circuit_breaker,
+            root_url=drive_api.root_url,
+            bandwidth=drive_api.bandwidth,
+            supports_all_drives=drive_api.supports_all_drives,
+            **options
+        )
+        client._folder_cache = drive_api._folder_cache
+        return client
+
+    def set_metrics(self, registry):
+        self.metrics = registry
+        self.add_request_hook(MetricsHook(registry))
+
+    def add_request_hook(self, hook):
+        self.request_hooks.append(hook)
+
+    def throttling_stats(self):
+        """Return the rate limiter counters for reporting."""
+        return self.rate_limiter.stats()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _drive_options(self, listing=False):
+        if not self.supports_all_drives:
+            return {}
+        if listing:
+            return {'supportsAllDrives': True, 'includeItemsFromAllDrives': True}
+        return {'supportsAllDrives': True}
+
+    async def _authorization_headers(self):
+        if not getattr(self.creds, 'valid', True):
+            async with self._auth_lock:
+                if not self.creds.valid:
+                    from google.auth.transport.requests import Request
+
+                    # Refreshing is a blocking HTTP call; keep it off the event loop
+                    await asyncio.get_running_loop().run_in_executor(None, self.creds.refresh, Request())
+        headers = {}
+        self.creds.apply(headers)
+        return headers
+
+    async def _send(self, method, url, endpoint, headers=None, **kwargs):
+        """Send one request through the rate limiter; error responses raise AsyncDriveError."""
+        if self._session is None:
+            self._session = create_session(self.connection_limit)
+        await acquire_tokens(self.rate_limiter)
+        headers = {**(await self._authorization_headers()), **(headers or {})}
+        response = await request_with_hooks(self._session, self.request_hooks, 'drive', endpoint, method, url,
+                                            headers=headers, allow_redirects=False, **kwargs)
+        if not response.ok:
+            error = AsyncDriveError(response, endpoint)
+            if is_async_rate_limit_error(error):
+                self.rate_limiter.on_throttle()
+            raise error
+        self.rate_limiter.on_success()
+        return response
+
+    async def _call(self, method, url, endpoint, **kwargs):
+        """Send a request with retries; return its JSON body, or None if it has none."""
+        async def attempt():
+            response = await self._send(method, url, endpoint, **kwargs)
+            return response.json() if response.content else None
+
+        return await self.retry_policy.call_async(
+            attempt,
+            is_retryable=is_transient_async_drive_error,
+            breaker=self.circuit_breaker,
+            description=f"Drive request '{endpoint}'"
+        )
+
+    def _files_url(self, *parts):
+        return self.root_url + '/'.join(('drive/v3/files',) + parts)
+
+    async def find_file(self, filename, folder_id):
+        # Looks for an existing file by name in the specified folder
+        query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
+        results = await self._call('GET', self._files_url(), 'drive.files.list', params={
+            'q': query, 'spaces': 'drive', 'fields': 'files(id, name, modifiedTime)',
+            **self._drive_options(listing=True)})
+        files = results.get('files', [])
+        return files[0] if files else None
+
+    async def get_file(self, file_id, fields='id, name, size, modifiedTime'):
+        return await self._call('GET', self._files_url(file_id), 'drive.files.get',
+                                params={'fields': fields, **self._drive_options()})
+
+    async def list_folder(self, folder_id, fields='id, name, mimeType, size, md5Checksum, modifiedTime'):
+        """Yield the files and folders directly inside a folder, following result pages."""
+        page_token = None
+        while True:
+            results = await self._call('GET', self._files_url(), 'drive.files.list', params={
+                'q': f"'{folder_id}' in parents and trashed=false", 'spaces': 'drive',
+                'fields': f'nextPageToken, files({fields})', 'pageSize': 1000, 'pageToken': page_token,
+                **self._drive_options(listing=True)})
+            for item in results.get('files', []):
+                yield item
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    async def get_or_create_folder(self, path, root_folder_id=None):
+        parent_id = root_folder_id
+        for part in path.strip('/').split('/'):
+            cache_key = (parent_id, part)
+            cached_id = self._folder_cache.get(cache_key)
+            if cached_id:
+                parent_id = cached_id
+                continue
+
+            # Serialize lookups so parallel uploads do not create duplicate folders
+            async with self._folder_lock:
+                cached_id = self._folder_cache.get(cache_key)
+                if cached_id:
+                    parent_id = cached_id
+                    continue
+
+                query = (f"mimeType='{FOLDER_MIME_TYPE}' and trashed=false "
+                         f"and name='{part}' and '{parent_id}' in parents")
+                results = await self._call('GET', self._files_url(), 'drive.files.list', params={
+                    'q': query, 'spaces': 'drive', 'fields': 'files(id, name)', **self._drive_options(listing=True)})
+                files = results.get('files', [])
+                if files:
+                    folder_id = files[0]['id']
+                else:
+                    metadata = {'name': part, 'mimeType': FOLDER_MIME_TYPE}
+                    if parent_id:
+                        metadata['parents'] = [parent_id]
+                    folder = await self._call('POST', self._files_url(), 'drive.files.create',
+                                              params={'fields': 'id', **self._drive_options()}, json=metadata)
+                    folder_id = folder['id']
+
+                self._folder_cache[cache_key] = folder_id
+                parent_id = folder_id
+        return parent_id
+
+    async def copy_file(self, file_id, name, folder_id):
+        """Copy a file on the server side, without transferring its content."""
+        copied = await self._call('POST', self._files_url(file_id, 'copy'), 'drive.files.copy',
+                                  params={'fields': 'id', **self._drive_options()},
+                                  json={'name': name, 'parents': [folder_id]})
+        return copied['id']
+
+    async def delete_file(self, file_id):
+        """Permanently delete a file. A file that no longer exists counts as deleted."""
+        try:
+            await self._call('DELETE', self._files_url(file_id), 'drive.files.delete', params=self._drive_options())
+        except AsyncDriveError as e:
+            if e.status != 404:
+                raise
+
+    async def delete_files(self, file_ids):
+        """
+        Delete files concurrently, paced by the rate limiter.
+
+        Returns:
+            list: Ids of the files that could not be deleted.
+        """
+        file_ids = list(dict.fromkeys(file_ids))
+        results = await asyncio.gather(*(self.delete_file(file_id) for file_id in file_ids), return_exceptions=True)
+        failed = []
+        for file_id, result in zip(file_ids, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to delete Drive file {file_id}: {result}")
+                failed.append(file_id)
+        return failed
+
+    async def upload_file(self, file_path, folder_id=None, overwrite=True, drive_filename=None, before_overwrite=None):
+        """
+        Upload a file with a resumable upload, replacing the content of a file with the
+        same name in the folder if ``overwrite`` is set. ``before_overwrite(existing)``
+        (a function or coroutine function) is called before existing content is replaced.
+
+        Returns:
+            str: Drive file id.
+        """
+        filename = drive_filename if drive_filename else os.path.basename(file_path)
+        existing = await self.find_file(filename, folder_id) if overwrite and folder_id else None
+        if existing:
+            if before_overwrite:
+                result = before_overwrite(existing)
+                if inspect.isawaitable(result):
+                    await result
+            url = self.root_url + f"upload/drive/v3/files/{existing['id']}"
+            method, endpoint, metadata = 'PATCH', 'drive.files.update', {}
+        else:
+            url = self.root_url + 'upload/drive/v3/files'
+            method, endpoint, metadata = 'POST', 'drive.files.create', {'name': filename}
+            if folder_id:
+                metadata['parents'] = [folder_id]
+
+        size = os.path.getsize(file_path)
+        session = await self._call_response(
+            method, url, endpoint, params={'uploadType': 'resumable', 'fields': 'id', **self._drive_options()},
+            json=metadata, headers={'X-Upload-Content-Type': 'application/octet-stream',
+                                    'X-Upload-Content-Length': str(size)})
+        file = await self._upload_chunks(session.headers['Location'], file_path, size, f"{endpoint}.chunk")
+        logger.debug(f"File '{filename}' {'updated in' if existing else 'uploaded to'} Google Drive.")
+        return file.get('id')
+
+    async def _call_response(self, method, url, endpoint, **kwargs):
+        return await self.retry_policy.call_async(
+            self._send, args=(method, url, endpoint), kwargs=kwargs,
+            is_retryable=is_transient_async_drive_error, breaker=self.circuit_breaker,
+            description=f"Drive request '{endpoint}'")
+
+    async def _upload_chunks(self, session_url, file_path, size, endpoint):
+        """
+        Send a file to a resumable upload session chunk by chunk. After a failed chunk the
+        session is asked how many bytes it received, and the upload continues from there.
+        """
+        loop = asyncio.get_running_loop()
+        state = {'offset': 0, 'uncertain': False, 'result': None}
+
+        def read_chunk(file, offset, length):
+            file.seek(offset)
+            return file.read(length)
+
+        async def send_chunk(file):
+            if state['uncertain']:
+                status = await self._send('PUT', session_url, endpoint,
+                                          headers={'Content-Range': f"bytes */{size}"})
+                if status.status_code != 308:
+                    state['result'] = status.json()
+                    return
+                received = status.headers.get('Range')
+                state['offset'] = int(received.rsplit('-', 1)[-1]) + 1 if received else 0
+                state['uncertain'] = False
+            offset = state['offset']
+            length = min(self.chunk_size, size - offset)
+            data = await loop.run_in_executor(None, read_chunk, file, offset, length) if length else b''
+            if self.bandwidth and length:
+                await asyncio.sleep(self.bandwidth.reserve(length))
+            content_range = f"bytes {offset}-{offset + length - 1}/{size}" if length else f"bytes */{size}"
+            state['uncertain'] = True
+            response = await self._send('PUT', session_url, endpoint, data=data,
+                                        headers={'Content-Range': content_range})
+            state['uncertain'] = False
+            if response.status_code == 308:
+                received = response.headers.get('Range')
+                state['offset'] = int(received.rsplit('-', 1)[-1]) + 1 if received else 0
+            else:
+                state['result'] = response.json()
+
+        with open(file_path, 'rb') as file:
+            while state['result'] is None:
+                await self.retry_policy.call_async(
+                    send_chunk, args=(file,), is_retryable=is_transient_async_drive_error,
+                    breaker=self.circuit_breaker, description=f"Drive request '{endpoint}'")
+        return state['result']
@@ -0,0 +1,117 @@
+import asyncio
+import json
+from bimcloud_api.hooks import RequestEvent
+
+try:
+    import aiohttp
+except ImportError:  # optional, needed only by the asyncio clients
+    aiohttp = None
+
+# Connections an asyncio client keeps open per host
+DEFAULT_CONNECTION_LIMIT = 64
+
+
+def require_aiohttp():
+    if aiohttp is None:
+        raise RuntimeError("The asyncio clients need the aiohttp package (pip install aiohttp).")
+
+
+def create_session(connection_limit=DEFAULT_CONNECTION_LIMIT):
+    """
+    Create the aiohttp session of an asyncio client. Must be called with a running event loop.
+    """
+    require_aiohttp()
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit_per_host=connection_limit),
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=300)
+    )
+
+
+def encode_params(params):
+    """Drop None values and spell booleans the way requests does, as aiohttp rejects both."""
+    if not params:
+        return None
+    return {key: str(value).lower() if isinstance(value, bool) else value
+            for key, value in params.items() if value is not None}
+
+
+class AsyncResponse:
+    """
+    A fully read aiohttp response with the attributes of ``requests.Response`` used by
+    ``process_response``, ``HttpError`` and the request hooks.
+    """
+    __slots__ = ('status_code', 'reason', 'headers', 'content')
+
+    def __init__(self, status_code, reason, headers, content):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+async def request_with_hooks(session, hooks, backend, endpoint, method, url, **kwargs):
+    """
+    Perform one request, read its body and report it to every hook.
+
+    Returns:
+        AsyncResponse: Status, headers and body of the response.
+    """
+    if 'params' in kwargs:
+        kwargs['params'] = encode_params(kwargs['params'])
+    event = RequestEvent(backend, method, url, endpoint) if hooks else None
+    if event:
+        for hook in hooks:
+            hook.on_request_start(event)
+    response = None
+    error = None
+    try:
+        async with session.request(method, url, **kwargs) as raw:
+            response = AsyncResponse(raw.status, raw.reason, raw.headers, await raw.read())
+        return response
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if event:
+            event.finish(response, error)
+            body = kwargs.get('data')
+            event.request_bytes = len(body) if isinstance(body, (bytes, bytearray, memoryview)) else 0
+            for hook in hooks:
+                hook.on_request_end(event)
+
+
+def is_transient_connection_error(error, idempotent=True):
+    """
+    aiohttp counterpart of the connection checks in ``is_transient_error``: failed
+    connections are always safe to retry, broken ones and timeouts only for
+    idempotent requests.
+    """
+    if aiohttp is None:
+        return False
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return True
+    if not idempotent:
+        return False
+    return isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+
+async def acquire_tokens(bucket, tokens=1):
+    """Wait for ``tokens`` of a TokenBucket without blocking the event loop."""
+    waited = 0.0
+    while True:
+        delay = bucket.try_acquire(tokens, waited)
+        if not delay:
+            return waited
+        await asyncio.sleep(delay)
+        waited += delay
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+# Drive accepts about 750 GB of uploads per user and day
+DRIVE_DAILY_UPLOAD_LIMIT = 750 * 1000 ** 3
+SAVE_INTERVAL = 10  # Seconds between writes of the byte counter while uploading
+
+logger = logging.getLogger("backup_manager")
+
+
+def parse_rate_profile(text):
+    """
+    Parse a time-of-day profile such as ``"22-6:100,6-22:20"``: full speed from 22:00
+    to 06:00 and 20% of the maximum rate from 06:00 to 22:00. Ranges may wrap around
+    midnight; hours not covered run at full speed.
+
+    Returns:
+        list: (start hour, end hour, fraction) tuples.
+    """
+    profile = []
+    for part in filter(None, (item.strip() for item in text.split(','))):
+        try:
+            hours, percent = part.split(':')
+            start, end = (int(hour) for hour in hours.split('-'))
+            fraction = float(percent) / 100
+        except ValueError:
+            raise ValueError(f"Invalid rate profile entry '{part}', expected e.g. '6-22:20'") from None
+        if not (0 <= start <= 24 and 0 <= end <= 24) or not 0 < fraction <= 1:
+            raise ValueError(f"Invalid rate profile entry '{part}'")
+        profile.append((start, end, fraction))
+    return profile
+
+
+class BandwidthGovernor:
+    """
+    Paces uploads to a global byte rate and tracks a daily upload budget.
+
+    The rate follows an optional time-of-day profile. Bytes are counted per local
+    calendar day in a small JSON state file, so separate runs on the same day share
+    the budget. ``plan`` picks the archives that fit the remaining budget up front,
+    so a run does not stop halfway through a large first-time sync.
+
+    Args:
+        max_rate (float): Upload rate in bytes per second at 100% (default: unlimited).
+        profile (list): (start hour, end hour, fraction) tuples from ``parse_rate_profile``.
+        daily_cap (int): Bytes allowed per day (default: unlimited).
+        state_path (str): JSON file persisting the bytes uploaded today.
+    """
+
+    def __init__(self, max_rate=None, profile=None, daily_cap=None, state_path=None):
+        self.max_rate = max_rate
+        self.profile = profile or []
+        self.daily_cap = daily_cap
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._next_free = time.monotonic()
+        self._day = self._today()
+        self._used = 0
+        self._reserved = 0
+        self._saved = time.monotonic()
+        self._stats = {"chunks": 0, "delayed": 0, "wait_seconds": 0.0}
+        self._load()
+
+    @staticmethod
+    def _today():
+        return datetime.now().strftime("%Y-%m-%d")
+
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                state = json.load(state_file)
+            if state.get("day") == self._day:
+                self._used = state.get("bytes", 0)
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            data = json.dumps({"day": self._day, "bytes": self._used})
+            self._saved = time.monotonic()
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as state_file:
+                state_file.write(data)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Failed to save the upload byte counter: {e}")
+
+    def _roll_day(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used = 0
+            self._reserved = 0
+
+    def current_rate(self):
+        """Return the allowed rate in bytes per second right now, or None if unlimited."""
+        if not self.max_rate:
+            return None
+        hour = datetime.now().hour
+        for start, end, fraction in self.profile:
+            in_range = start <= hour < end if start <= end else (hour >= start or hour < end)
+            if in_range:
+                return self.max_rate * fraction
+        return self.max_rate
+
+    def remaining_today(self):
+        """Return the bytes left in today's budget not yet reserved, or None if unlimited."""
+        if not self.daily_cap:
+            return None
+        with self._lock:
+            self._roll_day()
+            return max(0, self.daily_cap - self._used - self._reserved)
+
+    def acquire(self, nbytes):
+        """
+        Wait until ``nbytes`` may be sent at the current rate and count them against
+        today's budget. Callers share one virtual send schedule, so concurrent uploads
+        split the rate between them.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        wait = self.reserve(nbytes)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def reserve(self, nbytes):
+        """
+        Like ``acquire``, but return the seconds to wait before sending instead of
+        sleeping, for callers that wait themselves (e.g. with ``asyncio.sleep``).
+        """
+        rate = self.current_rate()
+        with self._lock:
+            self._roll_day()
+            self._used += nbytes
+            self._reserved = max(0, self._reserved - nbytes)
+            self._stats["chunks"] += 1
+            wait = 0.0
+            if rate:
+                now = time.monotonic()
+                start = max(now, self._next_free)
+                self._next_free = start + nbytes / rate
+                wait = start - now
+                if wait > 0:
+                    self._stats["delayed"] += 1
+                    self._stats["wait_seconds"] += wait
+            save_due = time.monotonic() - self._saved >= SAVE_INTERVAL
+        if save_due:
+            self.save()
+        return wait
+
+    def plan(self, projects, estimate):
+        """
+        Split ordered projects into those whose archives fit the remaining daily budget
+        and those postponed. Projects keep their order; a project that does not fit is
+        skipped in favour of later, smaller ones. The planned bytes are reserved.
+
+        Args:
+            projects (list): Projects in scheduled order.
+            estimate (callable): Returns the expected archive size of a project in bytes.
+
+        Returns:
+            tuple: (projects to run, postponed projects)
+        """
+        remaining = self.remaining_today()
+        if remaining is None:
+            return list(projects), []
+        selected, postponed = [], []
+        for project in projects:
+            size = estimate(project)
+            if size <= remaining:
+                selected.append(project)
+                remaining -= size
+            else:
+                postponed.append(project)
+        with self._lock:
+            self._reserved += sum(estimate(project) for project in selected)
+        return selected, postponed
+
+    def reset_reservations(self):
+        with self._lock:
+            self._reserved = 0
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["bytes_today"] = self._used
+        snapshot["rate"] = self.current_rate() or 0
+        remaining = self.remaining_today()
+        if remaining is not None:
+            snapshot["remaining_today"] = remaining
+        return snapshot
@@ -0,0 +1,114 @@
+import logging
+import threading
+
+logger = logging.getLogger("backup_manager")
+
+
+class AimdLimiter:
+    """
+    Adaptive concurrency limit using additive-increase / multiplicative-decrease.
+
+    Callers hold a slot for every in-flight job (``with limiter:``). Healthy job
+    completions raise the limit by ``increase / limit`` (about +1 per round of
+    jobs); errors, slow API responses or jobs taking much longer than expected
+    multiply it by ``decrease``. The limit always stays within ``[floor, ceiling]``.
+
+    Args:
+        name (str): Name used in log messages.
+        ceiling (int): Hard upper bound of concurrent jobs.
+        initial (float): Starting limit.
+        floor (int): Lower bound of concurrent jobs.
+        increase (float): Additive increase per round of healthy jobs.
+        decrease (float): Multiplicative decrease factor on congestion.
+        latency_tolerance (float): Allowed ratio of smoothed to baseline latency.
+    """
+
+    def __init__(self, name, ceiling=4, initial=1, floor=1, increase=1.0, decrease=0.5, latency_tolerance=2.0):
+        if ceiling < floor or floor < 1:
+            raise ValueError("AIMD limits must satisfy 1 <= floor <= ceiling.")
+        self.name = name
+        self.ceiling = ceiling
+        self.floor = floor
+        self.limit = float(min(max(initial, floor), ceiling))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self._latency_ewma = None
+        self._latency_baseline = None
+        self._condition = threading.Condition()
+        self._stats = {"increases": 0, "decreases": 0, "peak_in_flight": 0}
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self.in_flight)
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def observe_latency(self, seconds):
+        """Feed the latency of one API call into the smoothed and baseline estimates."""
+        with self._condition:
+            if self._latency_ewma is None:
+                self._latency_ewma = seconds
+                self._latency_baseline = seconds
+            else:
+                self._latency_ewma = 0.8 * self._latency_ewma + 0.2 * seconds
+                # The baseline follows improvements immediately and degradations slowly
+                self._latency_baseline = min(self._latency_ewma,
+                                             0.99 * self._latency_baseline + 0.01 * self._latency_ewma)
+
+    def _is_congested(self, duration, expected_duration):
+        if self._latency_ewma is not None and \
+                self._latency_ewma > self._latency_baseline * self.latency_tolerance:
+            return f"API latency {self._latency_ewma:.2f}s vs baseline {self._latency_baseline:.2f}s"
+        if expected_duration and duration > expected_duration * self.latency_tolerance:
+            return f"job took {duration:.0f}s vs expected {expected_duration:.0f}s"
+        return None
+
+    def on_success(self, duration, expected_duration=None):
+        """Adjust the limit after a job completed in ``duration`` seconds."""
+        with self._condition:
+            reason = self._is_congested(duration, expected_duration)
+            if reason:
+                self._decrease(reason)
+            else:
+                self._set_limit(self.limit + self.increase / self.limit, "increase", "healthy completion")
+            self._condition.notify_all()
+
+    def on_error(self, error):
+        with self._condition:
+            self._decrease(f"error: {error}")
+
+    def _decrease(self, reason):
+        self._set_limit(self.limit * self.decrease, "decrease", reason)
+
+    def _set_limit(self, value, direction, reason):
+        previous = int(self.limit)
+        self.limit = min(float(self.ceiling), max(float(self.floor), value))
+        if int(self.limit) != previous:
+            self._stats[f"{direction}s"] += 1
+            logger.info(f"Concurrency '{self.name}': {previous} -> {int(self.limit)} ({reason})")
+
+    def stats(self):
+        with self._condition:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency_ewma": self._latency_ewma or 0.0,
+                "latency_baseline": self._latency_baseline or 0.0,
+            })
+            return snapshot
@@ -5,7 +5,8 @@ import traceback
 from pathlib import Path, PurePath
 from utils.logger import setup_logger
 from datetime import datetime, timezone
-from .gdrive import GoogleDriveAPI
+from .gdrive import GoogleDriveAPI, UploadSessionExpiredError
+from .hashing import verify_copy
 
 logger = None  # Placeholder for the logger
 
@@ -49,12 +50,13 @@ def copy_latest_file_by_extension(source_dir, target_dir, file_extension):
         raise
 
 
-def copy_file(source_path, target_path):
+def copy_file(source_path, target_path, verify=False):
     """
     Copy a file from the source path to the target path.
 
     :param source_path: Full path to the source file.
     :param target_path: Full path to the destination file.
+    :param verify: Compare the content digests of both files after copying.
     """
     try:
         source = Path(source_path)
@@ -70,6 +72,8 @@ def copy_file(source_path, target_path):
 
         # Copy the file
         shutil.copy2(source, target)
+        if verify and not verify_copy(source, target):
+            raise IOError(f"Copied file does not match its source: {target}")
         logger.info(f"Copied file from {source} to {target}")
     except Exception as e:
         logger.error(f"Error copying file from {source_path} to {target_path}: {e}")
@@ -80,12 +84,15 @@ def upload_file_to_gdrive(
         drive_root_id,
         drive_relative_path,
         drive_api=None,
-        max_attempts=3,
-        wait_seconds=30
+        metrics=None,
+        project=None
 ):
     """
     Upload a file to Google Drive, creating the necessary folder structure.
-    Retries both folder creation and upload.
+    Transient failures are retried per request by the Drive client's retry policy;
+    an upload whose resumable session expired is restarted once in a new session.
+    When a metrics registry is given, bytes, duration and throughput of the upload
+    are recorded under the ``project`` label.
     """
     try:
         source = Path(source_path)
@@ -102,55 +109,37 @@ def upload_file_to_gdrive(
         folder_path = str(rel_path.parent)
         drive_filename = rel_path.name
 
-        for attempt in range(1, max_attempts + 1):
-            delay = wait_seconds * (2 ** (attempt - 1))
-            logger.info(
-                f"Upload attempt {attempt}/{max_attempts} "
-                f"for '{source}' → '{drive_relative_path}' (root={drive_root_id})"
-            )
-
-            # 1) Ensure folder (with retry)
-            folder_id = None
-            try:
-                logger.info(
-                    f"Preparing to create/find folder. Full target path: '{folder_path}', "
-                    f"drive_root_id: '{drive_root_id}'"
-                )
-                folder_id = drive_api.get_or_create_folder(folder_path, drive_root_id)
-                logger.info(f"Google Drive folder '{drive_relative_path}' ready (ID: {folder_id})")
-            except Exception as e:
-                logger.error(
-                    f"get_or_create_folder failed on attempt {attempt}: {e}"
-                )
-                if attempt < max_attempts:
-                    logger.info(f"Retrying in {delay} seconds...")
-                    time.sleep(delay)
-                    continue
-                else:
-                    logger.error("Max attempts reached during folder creation. Aborting upload.")
-                    raise
-
-            # 2) Upload file (with retry)
-            try:
-                file_id = drive_api.upload_file(
-                    str(source),
-                    folder_id=folder_id,
-                    overwrite=True,
-                    drive_filename=drive_filename
-                )
-                logger.info(
-                    f"Uploaded '{source}' to Google Drive folder '{drive_relative_path}' "
-                    f"as file ID {file_id}"
-                )
-                return file_id  # Success!
-            except Exception as e:
-                logger.error(f"Upload failed on attempt {attempt}: {e}")
-                if attempt < max_attempts:
-                    logger.info(f"Retrying in {delay} seconds...")
-                    time.sleep(delay)
-                else:
-                    logger.error("Max upload attempts reached. Upload failed.")
-                    raise
+        logger.info(f"Uploading '{source}' → '{drive_relative_path}' (root={drive_root_id})")
+
+        # 1) Ensure folder
+        logger.debug(
+            f"Preparing to create/find folder. Full target path: '{folder_path}', "
+            f"drive_root_id: '{drive_root_id}'"
+        )
+        folder_id = drive_api.get_or_create_folder(folder_path, drive_root_id)
+        logger.info(f"Google Drive folder '{drive_relative_path}' ready (ID: {folder_id})")
+
+        # 2) Upload file; an expired upload session cannot be resumed, so it is restarted once from byte 0
+        started = time.monotonic()
+        try:
+            file_id = drive_api.upload_file(str(source), folder_id=folder_id, overwrite=True,
+                                            drive_filename=drive_filename)
+        except UploadSessionExpiredError as e:
+            logger.warning(f"{e}; restarting the upload of '{source}' in a new session.")
+            file_id = drive_api.upload_file(str(source), folder_id=folder_id, overwrite=True,
+                                            drive_filename=drive_filename)
+        duration = time.monotonic() - started
+        if metrics:
+            size = source.stat().st_size
+            labels = {'project': project or drive_filename}
+            metrics.inc('upload_bytes', size, **labels)
+            metrics.observe('upload_duration_seconds', duration, **labels)
+            metrics.set('upload_throughput_bytes_per_second', size / duration if duration else 0, **labels)
+        logger.info(
+            f"Uploaded '{source}' to Google Drive folder '{drive_relative_path}' "
+            f"as file ID {file_id}"
+        )
+        return file_id
 
     except Exception as e:
         logger.error(f"Error uploading file to Google Drive: {e}")
@@ -187,12 +176,14 @@ def check_gdrive_file_update(
         folder_id: str,
         local_file_path: Path,
         drive_filename: str = None,
-        duration_seconds: int = 14400
+        duration_seconds: int = 14400,
+        expected_md5: str = None
 ) -> bool:
     """
     Check if the specified file exists on Google Drive in the target folder,
     and was modified (uploaded) within the last given duration.
-    Optionally, compares file size as a strong verification.
+    Optionally, compares file size as a strong verification, and the MD5
+    checksum Drive computed for the file when ``expected_md5`` is given.
     """
     if not local_file_path.exists():
         logger.error(f"Local file does not exist: {local_file_path}")
@@ -208,10 +199,8 @@ def check_gdrive_file_update(
         return False
 
     # Check Google Drive file modification time
-    gdrive_file = drive_api.service.files().get(
-        fileId=file_info['id'],
-        fields='size, modifiedTime'
-    ).execute()
+    fields = 'size, modifiedTime, md5Checksum' if expected_md5 else 'size, modifiedTime'
+    gdrive_file = drive_api.get_file(file_info['id'], fields=fields)
     gdrive_mtime = datetime.fromisoformat(gdrive_file['modifiedTime'].replace('Z', '+00:00'))
     time_since_modification = (datetime.now(timezone.utc) - gdrive_mtime).total_seconds()
 
@@ -232,8 +221,16 @@ def check_gdrive_file_update(
         )
         return False
 
+    # Check content checksum match
+    if expected_md5 and gdrive_file.get('md5Checksum') != expected_md5:
+        logger.warning(
+            f"Checksum mismatch: local '{local_file_path}' (MD5 {expected_md5}) vs "
+            f"GDrive '{drive_filename}' (MD5 {gdrive_file.get('md5Checksum')}) in folder ID {folder_id}"
+        )
+        return False
+
     logger.info(
         f"Google Drive file '{drive_filename}' in folder ID {folder_id} "
-        f"is present, recently updated, and size matches local file."
+        f"is present, recently updated, and {'checksum' if expected_md5 else 'size'} matches local file."
     )
     return True
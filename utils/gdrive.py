@@ -1,33 +1,217 @@
+import json
+import logging
 import os
 import sys
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.auth.exceptions import RefreshError
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from itertools import count
 from pathlib import Path, PurePath
+from types import SimpleNamespace
+from utils.bandwidth import DRIVE_DAILY_UPLOAD_LIMIT
+from utils.rate_limiter import TokenBucket
+from utils.retry import RetryPolicy
+from utils.metrics import MetricsHook
+from bimcloud_api.hooks import RequestEvent
 
 SCOPES = ['https://www.googleapis.com/auth/drive']
 
+# Reasons Drive uses for quota errors (returned with HTTP 403 or 429)
+RATE_LIMIT_REASONS = {'userRateLimitExceeded', 'rateLimitExceeded'}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Reasons meaning an account cannot upload any more today
+QUOTA_EXHAUSTED_REASONS = {'storageQuotaExceeded', 'dailyLimitExceeded'}
+
+# Shared by every GoogleDriveAPI instance so parallel workers respect one quota
+DRIVE_RATE_LIMITER = TokenBucket(rate=10, capacity=20)
+
+# Upload chunk size used while uploads are bandwidth-limited; smaller chunks pace more evenly
+BANDWIDTH_CHUNK_SIZE = 8 * 1024 ** 2
+# Download chunk size of content scrubs; bounds the memory used per download
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 ** 2
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# Batch endpoint of the Drive v3 API, relative to the API root
+DRIVE_ROOT_URL = 'https://www.googleapis.com/'
+DRIVE_BATCH_PATH = 'batch/drive/v3'
+
+# Deletions sent per batch request; Drive accepts up to 100, fewer keep bursts within the request rate
+DELETE_BATCH_SIZE = 50
+
+logger = logging.getLogger("backup_manager")
+
+# The Google client libraries take a noticeable share of startup time to import, so they
+# are imported where Drive is first used rather than when this module is loaded.
+
+# build_from_document fills in method parameters on the shared discovery document
+_build_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_discovery_document(root_url=None):
+    """
+    Return the Drive v3 discovery document bundled with google-api-python-client,
+    parsed once per process and shared by every service built from it. An explicit
+    root URL replaces the API endpoint. Returns None if the library has no bundled copy.
+    """
+    from googleapiclient.discovery_cache import get_static_doc
+
+    content = get_static_doc("drive", "v3")
+    if content is None:
+        return None
+    document = json.loads(content)
+    if root_url:
+        document['rootUrl'] = root_url.rstrip('/') + '/'
+    return document
+
+
+def build_drive_service(credentials, root_url=None):
+    """
+    Build a Drive v3 service from the cached discovery document, falling back to
+    discovery (network or the library's own cache) if no bundled document is available.
+    """
+    from googleapiclient.discovery import build, build_from_document
+
+    with _build_lock:
+        document = get_discovery_document(root_url)
+        if document is not None:
+            return build_from_document(document, credentials=credentials)
+    return build("drive", "v3", credentials=credentials)
+
+
+def get_error_reason(error):
+    """
+    Extract the Drive error reason (e.g. 'userRateLimitExceeded') from an HttpError.
+    """
+    try:
+        content = json.loads(error.content.decode('utf-8'))
+        errors = content.get('error', {}).get('errors', [])
+        return errors[0].get('reason') if errors else None
+    except (AttributeError, ValueError, UnicodeDecodeError):
+        return None
+
+
+def is_rate_limit_error(error):
+    from googleapiclient.errors import HttpError
+
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    return status == 429 or (status == 403 and get_error_reason(error) in RATE_LIMIT_REASONS)
+
+
+def is_quota_exhausted_error(error):
+    from googleapiclient.errors import HttpError
+
+    return (isinstance(error, HttpError) and error.resp.status == 403
+            and get_error_reason(error) in QUOTA_EXHAUSTED_REASONS)
+
+
+def load_service_account_credentials(path):
+    """Load service account credentials from a key file with the Drive scope."""
+    from google.oauth2 import service_account
+
+    return service_account.Credentials.from_service_account_file(path, scopes=SCOPES)
+
+
+class UploadSessionExpiredError(Exception):
+    """A resumable upload session was invalidated or expired; the upload must start over."""
+
+
+def is_transient_drive_error(error):
+    from googleapiclient.errors import HttpError
+
+    if isinstance(error, HttpError):
+        return is_rate_limit_error(error) or error.resp.status in RETRYABLE_STATUS_CODES
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class _HashingSink:
+    """File-like download target that hashes and discards the received bytes."""
+
+    def __init__(self):
+        import hashlib
+
+        self.md5 = hashlib.md5()
+        self.size = 0
+
+    def write(self, data):
+        self.md5.update(data)
+        self.size += len(data)
+        return len(data)
+
 
 class GoogleDriveAPI:
-    def __init__(self, cred_path=None, token_path=None):
+    def __init__(self, cred_path=None, token_path=None, rate_limiter=None, retry_policy=None, circuit_breaker=None,
+                 metrics=None, credentials=None, root_url=None, bandwidth=None, chunk_size=None,
+                 supports_all_drives=False):
         base_dir = Path(__file__).parent.parent
         self.cred_path = str(cred_path or (base_dir / 'credentials.json'))
         self.token_path = str(token_path or (base_dir / 'token.json'))
+        self.rate_limiter = rate_limiter or DRIVE_RATE_LIMITER
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=6)
+        self.circuit_breaker = circuit_breaker
+        # Optional BandwidthGovernor shared by all uploads that draw on one bandwidth budget
+        self.bandwidth = bandwidth
+        self.chunk_size = chunk_size or (BANDWIDTH_CHUNK_SIZE if bandwidth else None)
+        self.request_hooks = []
+        self.metrics = None
+        if metrics:
+            self.set_metrics(metrics)
         self.creds = None
-        self.service = self._authorize()
+        self._folder_cache = {}
+        self._folder_lock = threading.Lock()
+        self._local = threading.local()
+        # An explicit root URL points the client at another Drive endpoint, e.g. a local mock server
+        self.root_url = root_url
+        # Shared drives (e.g. written by service accounts) must be opted into on every call
+        self.supports_all_drives = supports_all_drives
+        self.creds = credentials or self._authorize()
+
+    def set_metrics(self, registry):
+        self.metrics = registry
+        self.add_request_hook(MetricsHook(registry))
+
+    def add_request_hook(self, hook):
+        self.request_hooks.append(hook)
+
+    @property
+    def service(self):
+        """
+        Drive service for the calling thread. The underlying httplib2 transport is not
+        thread-safe, so every worker thread builds its own service on shared credentials.
+        """
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build_drive_service(self.creds, self.root_url)
+            self._local.service = service
+        return service
+
+    def _drive_options(self, listing=False):
+        if not self.supports_all_drives:
+            return {}
+        if listing:
+            return {'supportsAllDrives': True, 'includeItemsFromAllDrives': True}
+        return {'supportsAllDrives': True}
 
     def _authorize(self):
         """
         Authorize Google Drive API. Raises exceptions for handling in main script.
         """
+        from google.oauth2.credentials import Credentials
+        from google.auth.transport.requests import Request
+        from google.auth.exceptions import RefreshError
+
         creds = None
+        stored_token = None
 
         # Load token if exists
         if os.path.exists(self.token_path):
-            creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+            with open(self.token_path, "r", encoding="utf-8") as token_file:
+                stored_token = token_file.read()
+            creds = Credentials.from_authorized_user_info(json.loads(stored_token), SCOPES)
 
         # Refresh if possible
         if creds and creds.expired and creds.refresh_token:
@@ -44,74 +228,489 @@ class GoogleDriveAPI:
         # First-time or after invalid token removal
         if not creds or not creds.valid:
             if sys.stdin.isatty():
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
                 flow = InstalledAppFlow.from_client_secrets_file(self.cred_path, SCOPES)
                 creds = flow.run_local_server(port=0)
             else:
                 raise RuntimeError("GOOGLE_AUTH_REQUIRED")  # No interactive mode
 
-        # Save credentials
-        with open(self.token_path, "w", encoding="utf-8") as token_file:
-            token_file.write(creds.to_json())
+        # Save credentials only if they changed (new authorization or refreshed token)
+        token = creds.to_json()
+        if token != stored_token:
+            tmp_path = f"{self.token_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as token_file:
+                token_file.write(token)
+            os.replace(tmp_path, self.token_path)
+
+        return creds
+
+    def _call(self, request, func, endpoint, upload_chunk=False):
+        """
+        Run one Drive call through the shared rate limiter and the retry policy.
+        Quota errors additionally slow down the shared token bucket. For the chunks of a
+        resumable upload, every attempt, including retries, first waits for its bytes in
+        the bandwidth governor, and the bytes the server acknowledged are reported as
+        request bytes.
+        """
+        from googleapiclient.errors import HttpError
+
+        def attempt():
+            if upload_chunk and self.bandwidth:
+                remaining = request.resumable.size() - request.resumable_progress
+                self.bandwidth.acquire(min(request.resumable.chunksize(), remaining))
+            self.rate_limiter.acquire()
+            event = RequestEvent('drive', request.method, request.uri, endpoint)
+            for hook in self.request_hooks:
+                hook.on_request_start(event)
+            progress = request.resumable_progress if upload_chunk else 0
+            result = None
+            error = None
+            try:
+                result = func()
+            except Exception as e:
+                error = e
+                if is_rate_limit_error(e):
+                    self.rate_limiter.on_throttle()
+                raise
+            finally:
+                event.finish(error=error)
+                event.status = error.resp.status if isinstance(error, HttpError) else (None if error else 200)
+                if upload_chunk:
+                    # next_chunk returns the response once the last chunk is stored, without updating the progress
+                    finished = result is not None and result[1] is not None
+                    sent_until = request.resumable.size() if finished else request.resumable_progress
+                    event.request_bytes = sent_until - progress
+                else:
+                    event.request_bytes = len(request.body or '')
+                for hook in self.request_hooks:
+                    hook.on_request_end(event)
+            self.rate_limiter.on_success()
+            return result
+
+        return self.retry_policy.call(
+            attempt,
+            is_retryable=is_transient_drive_error,
+            breaker=self.circuit_breaker,
+            description=f"Drive request '{endpoint}'"
+        )
 
-        self.creds = creds
-        return build("drive", "v3", credentials=self.creds)
+    def execute(self, request):
+        """
+        Execute a Drive API request, retrying quota and transient errors
+        with exponential backoff and jitter.
+        """
+        return self._call(request, request.execute, request.methodId)
 
-    def upload_file(self, file_path, folder_id=None, overwrite=True, drive_filename=None):
+    def execute_upload(self, request):
+        """
+        Drive a resumable upload chunk by chunk. A failed chunk is retried and the
+        upload resumes from the last acknowledged byte instead of starting over.
+        Raises UploadSessionExpiredError if Drive no longer knows the upload session.
+        """
+        from googleapiclient.errors import HttpError
+
+        response = None
+        while response is None:
+            try:
+                _, response = self._call(request, request.next_chunk, f"{request.methodId}.chunk",
+                                         upload_chunk=True)
+            except HttpError as e:
+                # Sessions expire after a week or when Drive drops them; no chunk retry can resume those
+                if request.resumable_uri and e.resp.status in (404, 410):
+                    raise UploadSessionExpiredError(
+                        f"Upload session expired after {request.resumable_progress} bytes: {e}") from e
+                raise
+        return response
+
+    def throttling_stats(self):
+        """Return the shared rate limiter counters for reporting."""
+        return self.rate_limiter.stats()
+
+    def upload_file(self, file_path, folder_id=None, overwrite=True, drive_filename=None, before_overwrite=None):
+        """
+        Upload a file, replacing the content of a file with the same name in the folder if
+        ``overwrite`` is set. ``before_overwrite(existing)`` is called with the existing
+        file's id, name and modifiedTime before its content is replaced.
+        """
         filename = drive_filename if drive_filename else os.path.basename(file_path)
         file_metadata = {'name': filename}
         if folder_id:
             file_metadata['parents'] = [folder_id]
-        media = MediaFileUpload(file_path, resumable=True)
+        from googleapiclient.http import MediaFileUpload
+
+        if self.chunk_size:
+            media = MediaFileUpload(file_path, resumable=True, chunksize=self.chunk_size)
+        else:
+            media = MediaFileUpload(file_path, resumable=True)
         # Overwrite if exists
         if overwrite and folder_id:
             existing = self.find_file(filename, folder_id)
             if existing:
                 file_id = existing['id']
-                updated = self.service.files().update(fileId=file_id, media_body=media).execute()
+                if before_overwrite:
+                    before_overwrite(existing)
+                request = self.service.files().update(fileId=file_id, media_body=media, **self._drive_options())
+                updated = self.execute_upload(request)
                 print(f"File '{filename}' updated in Google Drive.")
                 return updated.get('id')
-        file = self.service.files().create(body=file_metadata, media_body=media, fields='id').execute()
+        request = self.service.files().create(body=file_metadata, media_body=media, fields='id',
+                                              **self._drive_options())
+        file = self.execute_upload(request)
         print(f"File '{filename}' uploaded to Google Drive.")
         return file.get('id')
 
     def find_file(self, filename, folder_id):
         # Looks for an existing file by name in the specified folder
         query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
-        results = self.service.files().list(q=query, spaces='drive', fields='files(id, name)').execute()
+        results = self.execute(self.service.files().list(q=query, spaces='drive', fields='files(id, name, modifiedTime)',
+                                                         **self._drive_options(listing=True)))
         files = results.get('files', [])
         return files[0] if files else None
 
+    def copy_file(self, file_id, name, folder_id):
+        """Copy a file on the server side, without transferring its content."""
+        body = {'name': name, 'parents': [folder_id]}
+        copied = self.execute(self.service.files().copy(fileId=file_id, body=body, fields='id',
+                                                        **self._drive_options()))
+        return copied['id']
+
+    def delete_files(self, file_ids, batch_size=DELETE_BATCH_SIZE):
+        """
+        Permanently delete files with batch requests of up to ``batch_size`` deletions.
+        Deletions failing with a transient error are repeated one by one; files that no
+        longer exist count as deleted.
+
+        Returns:
+            list: Ids of the files that could not be deleted.
+        """
+        from googleapiclient.errors import HttpError
+
+        file_ids = list(dict.fromkeys(file_ids))
+        failed = []
+        for start in range(0, len(file_ids), batch_size):
+            chunk = file_ids[start:start + batch_size]
+            errors = {}
+
+            def collect(request_id, response, exception):
+                if exception is None:
+                    return
+                if isinstance(exception, HttpError) and exception.resp.status == 404:
+                    return
+                errors[request_id] = exception
+
+            batch = self.service.new_batch_http_request(callback=collect)
+            for file_id in chunk:
+                batch.add(self.service.files().delete(fileId=file_id, **self._drive_options()), request_id=file_id)
+            # Drive counts every call of a batch against the request rate; the request itself draws one
+            # token, the rest are taken in steps the bucket can hold
+            extra_tokens = len(chunk) - 1
+            step = max(1, int(self.rate_limiter.capacity))
+            while extra_tokens > 0:
+                self.rate_limiter.acquire(min(step, extra_tokens))
+                extra_tokens -= step
+            batch_uri = (self.root_url.rstrip('/') + '/' if self.root_url else DRIVE_ROOT_URL) + DRIVE_BATCH_PATH
+            self._call(SimpleNamespace(method='POST', uri=batch_uri, body=None), batch.execute,
+                       'drive.files.delete.batch')
+
+            for file_id, error in errors.items():
+                if not is_transient_drive_error(error):
+                    logger.warning(f"Failed to delete Drive file {file_id}: {error}")
+                    failed.append(file_id)
+                    continue
+                try:
+                    self.execute(self.service.files().delete(fileId=file_id, **self._drive_options()))
+                except HttpError as e:
+                    if e.resp.status != 404:
+                        logger.warning(f"Failed to delete Drive file {file_id}: {e}")
+                        failed.append(file_id)
+        return failed
+
+    def get_file(self, file_id, fields='id, name, size, modifiedTime'):
+        return self.execute(self.service.files().get(fileId=file_id, fields=fields, **self._drive_options()))
+
+    def list_folder(self, folder_id, fields='id, name, mimeType, size, md5Checksum, modifiedTime'):
+        """Yield the files and folders directly inside a folder, following result pages."""
+        page_token = None
+        while True:
+            results = self.execute(self.service.files().list(
+                q=f"'{folder_id}' in parents and trashed=false", spaces='drive',
+                fields=f'nextPageToken, files({fields})', pageSize=1000, pageToken=page_token,
+                **self._drive_options(listing=True)
+            ))
+            yield from results.get('files', [])
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    def download_md5(self, file_id, chunk_size=DOWNLOAD_CHUNK_SIZE, bandwidth=None):
+        """
+        Stream a file's content through MD5 without keeping it, one chunk in memory at a
+        time. A failed chunk is retried and the download resumes where it stopped.
+
+        Returns:
+            tuple: (size in bytes, hex MD5)
+        """
+        from googleapiclient.http import MediaIoBaseDownload
+
+        sink = _HashingSink()
+        request = self.service.files().get_media(fileId=file_id, **self._drive_options())
+        downloader = MediaIoBaseDownload(sink, request, chunksize=chunk_size)
+        done = False
+        while not done:
+            if bandwidth:
+                bandwidth.acquire(chunk_size)
+            _, done = self._call(request, downloader.next_chunk, f"{request.methodId}.chunk")
+        return sink.size, sink.md5.hexdigest()
+
     def get_or_create_folder(self, path, root_folder_id=None):
         parts = path.strip('/').split('/')
         parent_id = root_folder_id
 
         for part in parts:
-            query = (
-                f"mimeType='application/vnd.google-apps.folder' "
-                f"and trashed=false "
-                f"and name='{part}' "
-                f"and '{parent_id}' in parents"
-            )
-            try:
-                results = self.service.files().list(
-                    q=query, spaces='drive', fields='files(id, name)'
-                ).execute()
+            cache_key = (parent_id, part)
+            cached_id = self._folder_cache.get(cache_key)
+            if cached_id:
+                parent_id = cached_id
+                continue
+
+            # Serialize lookups so parallel uploads do not create duplicate folders
+            with self._folder_lock:
+                cached_id = self._folder_cache.get(cache_key)
+                if cached_id:
+                    parent_id = cached_id
+                    continue
+
+                query = (
+                    f"mimeType='application/vnd.google-apps.folder' "
+                    f"and trashed=false "
+                    f"and name='{part}' "
+                    f"and '{parent_id}' in parents"
+                )
+                results = self.execute(self.service.files().list(
+                    q=query, spaces='drive', fields='files(id, name)', **self._drive_options(listing=True)
+                ))
                 files = results.get('files', [])
-            except Exception as e:
-                raise  # re-raise to propagate
 
-            if files:
-                parent_id = files[0]['id']
-            else:
-                metadata = {'name': part, 'mimeType': 'application/vnd.google-apps.folder'}
-                if parent_id:
-                    metadata['parents'] = [parent_id]
+                if files:
+                    folder_id = files[0]['id']
+                else:
+                    metadata = {'name': part, 'mimeType': FOLDER_MIME_TYPE}
+                    if parent_id:
+                        metadata['parents'] = [parent_id]
+                    folder = self.execute(self.service.files().create(
+                        body=metadata, fields='id', **self._drive_options()
+                    ))
+                    folder_id = folder['id']
+
+                self._folder_cache[cache_key] = folder_id
+                parent_id = folder_id
+
+        return parent_id
+
+
+class GoogleDrivePool:
+    """
+    Spreads Drive calls over several credentials, e.g. service accounts that are
+    members of the same shared drive, so request rate limits and the daily upload
+    quota of each account add up.
+
+    Every credential gets its own Drive client and request rate limiter. Uploads go
+    to the credential with the fewest uploads in flight that still has enough of its
+    daily quota left; metadata calls rotate over all credentials. The folder cache is
+    shared, as every credential sees the same folders. The pool offers the methods of
+    GoogleDriveAPI used by the backup pipeline and can be passed in its place.
+
+    An upload that Drive rejects because the credential's quota is exhausted is
+    repeated once on another credential. The bytes uploaded today and the exhausted
+    flag of each credential are kept in ``state_path``, so a second run on the same day
+    or a restarted daemon does not count on quota that was already used.
+
+    Args:
+        clients (dict): Credential name -> GoogleDriveAPI.
+        daily_quota (int): Upload bytes per credential and day.
+        state_path (str): JSON file persisting today's usage of every credential.
+    """
+
+    def __init__(self, clients, daily_quota=DRIVE_DAILY_UPLOAD_LIMIT, state_path=None):
+        if not clients:
+            raise ValueError("A Drive pool needs at least one credential.")
+        self.clients = dict(clients)
+        self.daily_quota = daily_quota
+        self.state_path = state_path
+        self.metrics = None
+        self._lock = threading.Lock()
+        self._next = count()
+        self._day = datetime.now().strftime("%Y-%m-%d")
+        self._usage = {name: {"uploads": 0, "in_flight": 0, "bytes_today": 0, "exhausted": False}
+                       for name in self.clients}
+        self._load()
+        folder_cache = {}
+        folder_lock = threading.Lock()
+        for client in self.clients.values():
+            client._folder_cache = folder_cache
+            client._folder_lock = folder_lock
+
+    @classmethod
+    def from_service_accounts(cls, key_files, daily_quota=DRIVE_DAILY_UPLOAD_LIMIT, state_path=None,
+                              **client_options):
+        """
+        Create a pool with one client per service account key file. Options such as
+        ``retry_policy``, ``circuit_breaker`` or ``bandwidth`` are passed to every client.
+        """
+        clients = {}
+        for key_file in key_files:
+            name = Path(key_file).stem
+            if name in clients:
+                raise ValueError(f"Duplicate service account key file name: {name}")
+            clients[name] = GoogleDriveAPI(
+                credentials=load_service_account_credentials(key_file),
+                rate_limiter=TokenBucket(rate=10, capacity=20),
+                supports_all_drives=True,
+                **client_options
+            )
+        return cls(clients, daily_quota, state_path)
+
+    @property
+    def request_hooks(self):
+        return next(iter(self.clients.values())).request_hooks
+
+    def set_metrics(self, registry):
+        self.metrics = registry
+        for client in self.clients.values():
+            client.set_metrics(registry)
+
+    def add_request_hook(self, hook):
+        for client in self.clients.values():
+            client.add_request_hook(hook)
+
+    def throttling_stats(self):
+        """Return the rate limiter counters summed over all credentials."""
+        totals = {}
+        for client in self.clients.values():
+            for key, value in client.throttling_stats().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def usage(self):
+        """Return a snapshot of the upload counters of every credential."""
+        with self._lock:
+            self._roll_day()
+            return {name: dict(usage) for name, usage in self._usage.items()}
+
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return
+        if state.get("day") != self._day:
+            return
+        for name, saved in state.get("credentials", {}).items():
+            if name in self._usage:
+                self._usage[name]["bytes_today"] = saved.get("bytes_today", 0)
+                self._usage[name]["exhausted"] = saved.get("exhausted", False)
+
+    def save(self):
+        """Write today's usage of every credential to ``state_path``."""
+        if not self.state_path:
+            return
+        with self._lock:
+            data = json.dumps({"day": self._day, "credentials": {
+                name: {"bytes_today": usage["bytes_today"], "exhausted": usage["exhausted"]}
+                for name, usage in self._usage.items()}})
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as state_file:
+                state_file.write(data)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Failed to save the Drive credential usage: {e}")
+
+    def _roll_day(self):
+        today = datetime.now().strftime("%Y-%m-%d")
+        if today != self._day:
+            self._day = today
+            for usage in self._usage.values():
+                usage["bytes_today"] = 0
+                usage["exhausted"] = False
+
+    def _any_client(self):
+        names = list(self.clients)
+        return self.clients[names[next(self._next) % len(names)]]
+
+    @contextmanager
+    def _upload_client(self, size):
+        with self._lock:
+            self._roll_day()
+            candidates = [name for name, usage in self._usage.items()
+                          if not usage["exhausted"] and usage["bytes_today"] + size <= self.daily_quota]
+            if not candidates:
+                raise RuntimeError("Every Drive credential has reached its daily upload quota.")
+            name = min(candidates, key=lambda n: (self._usage[n]["in_flight"], self._usage[n]["bytes_today"]))
+            self._usage[name]["in_flight"] += 1
+        try:
+            yield name, self.clients[name]
+        finally:
+            with self._lock:
+                self._usage[name]["in_flight"] -= 1
+
+    def upload_file(self, file_path, folder_id=None, overwrite=True, drive_filename=None, before_overwrite=None):
+        size = os.path.getsize(file_path)
+        overwritten = set()
+
+        def before_overwrite_once(existing):
+            # A retry on another credential finds the same file; it was already kept
+            if existing['id'] not in overwritten:
+                overwritten.add(existing['id'])
+                before_overwrite(existing)
+
+        for attempt in range(2):
+            with self._upload_client(size) as (name, client):
                 try:
-                    folder = self.service.files().create(
-                        body=metadata, fields='id'
-                    ).execute()
-                    parent_id = folder['id']
+                    file_id = client.upload_file(file_path, folder_id, overwrite, drive_filename,
+                                                 before_overwrite_once if before_overwrite else None)
                 except Exception as e:
-                    raise
+                    if not is_quota_exhausted_error(e):
+                        raise
+                    logger.warning(f"Drive credential '{name}' reached its upload quota for today.")
+                    with self._lock:
+                        self._usage[name]["exhausted"] = True
+                    self.save()
+                    if attempt:
+                        raise
+                    continue
+                with self._lock:
+                    usage = self._usage[name]
+                    usage["uploads"] += 1
+                    usage["bytes_today"] += size
+                    bytes_today = usage["bytes_today"]
+            break
+        self.save()
+        if self.metrics:
+            self.metrics.inc("drive_credential_upload_bytes", size, credential=name)
+            self.metrics.set("drive_credential_bytes_today", bytes_today, credential=name)
+        return file_id
 
-        return parent_id
+    def find_file(self, filename, folder_id):
+        return self._any_client().find_file(filename, folder_id)
+
+    def get_file(self, file_id, fields='id, name, size, modifiedTime'):
+        return self._any_client().get_file(file_id, fields)
+
+    def copy_file(self, file_id, name, folder_id):
+        return self._any_client().copy_file(file_id, name, folder_id)
+
+    def delete_files(self, file_ids, batch_size=DELETE_BATCH_SIZE):
+        return self._any_client().delete_files(file_ids, batch_size)
+
+    def get_or_create_folder(self, path, root_folder_id=None):
+        return self._any_client().get_or_create_folder(path, root_folder_id)
+
+    def list_folder(self, folder_id, fields='id, name, mimeType, size, md5Checksum, modifiedTime'):
+        return self._any_client().list_folder(folder_id, fields)
+
+    def download_md5(self, file_id, chunk_size=DOWNLOAD_CHUNK_SIZE, bandwidth=None):
+        return self._any_client().download_md5(file_id, chunk_size, bandwidth)
@@ -0,0 +1,307 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+DEFAULT_LEASE_TTL = 600
+STALE_LOCK_SECONDS = 30  # A file store lock older than this was left by a crashed worker
+
+logger = logging.getLogger("backup_manager")
+
+
+class LeaseLostError(Exception):
+    def __init__(self, key):
+        super().__init__(f"Lease on '{key}' was lost")
+        self.key = key
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class SqliteLeaseStore:
+    """
+    Lease store in an SQLite database on a path every worker can reach.
+
+    Each lease is a row keyed by run id and key (a project id). A lease is held
+    until it expires, is released, or is completed; completed leases stay in the
+    table so no other worker of the same run takes the key again. Expiry times use
+    the wall clock, so worker clocks must be roughly in sync.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "run_id TEXT NOT NULL, key TEXT NOT NULL, worker_id TEXT NOT NULL, "
+                "expires REAL NOT NULL, state TEXT NOT NULL, result TEXT, updated REAL NOT NULL, "
+                "PRIMARY KEY (run_id, key))"
+            )
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self, statements):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements(connection)
+            connection.execute("COMMIT")
+            return result
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def claim(self, run_id, key, worker_id, ttl):
+        """
+        Claim ``key`` for ``worker_id`` unless another worker holds an unexpired lease
+        or the key was completed in this run.
+
+        Returns:
+            bool: True if the caller now holds the lease.
+        """
+        now = time.time()
+
+        def statements(connection):
+            row = connection.execute("SELECT worker_id, expires, state FROM leases WHERE run_id = ? AND key = ?",
+                                     (run_id, key)).fetchone()
+            if row is not None:
+                holder, expires, state = row
+                if state == "done" or (holder != worker_id and expires > now):
+                    return False
+            connection.execute(
+                "INSERT OR REPLACE INTO leases (run_id, key, worker_id, expires, state, result, updated) "
+                "VALUES (?, ?, ?, ?, 'held', NULL, ?)", (run_id, key, worker_id, now + ttl, now))
+            return True
+
+        return self._transaction(statements)
+
+    def renew(self, run_id, key, worker_id, ttl):
+        """Extend a held lease. Returns False if the lease expired and was taken over."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE leases SET expires = ?, updated = ? "
+            "WHERE run_id = ? AND key = ? AND worker_id = ? AND state = 'held'",
+            (now + ttl, now, run_id, key, worker_id))
+        return cursor.rowcount == 1
+
+    def holds(self, run_id, key, worker_id):
+        row = self._connection().execute(
+            "SELECT worker_id, expires, state FROM leases WHERE run_id = ? AND key = ?", (run_id, key)).fetchone()
+        return row is not None and row[0] == worker_id and row[2] == "held" and row[1] > time.time()
+
+    def complete(self, run_id, key, worker_id, result):
+        """Mark a held key as done for this run."""
+        self._connection().execute(
+            "UPDATE leases SET state = 'done', result = ?, updated = ? WHERE run_id = ? AND key = ? AND worker_id = ?",
+            (result, time.time(), run_id, key, worker_id))
+
+    def release(self, run_id, key, worker_id):
+        """Give a key back so another worker can take it in this run."""
+        self._connection().execute(
+            "DELETE FROM leases WHERE run_id = ? AND key = ? AND worker_id = ? AND state = 'held'",
+            (run_id, key, worker_id))
+
+
+class FileLeaseStore:
+    """
+    Lease store in a directory, usable where SQLite locking is unreliable (e.g. some
+    network shares). Each lease is a JSON file replaced atomically; every change is
+    made under a short-lived lock file created with O_EXCL.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, run_id, key, suffix=".lease"):
+        run_directory = os.path.join(self.directory, run_id)
+        os.makedirs(run_directory, exist_ok=True)
+        safe_key = "".join(char if char.isalnum() or char in "-_." else "_" for char in str(key))
+        return os.path.join(run_directory, safe_key + suffix)
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8") as lease_file:
+                return json.load(lease_file)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path, lease):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as lease_file:
+            json.dump(lease, lease_file)
+        os.replace(tmp_path, path)
+
+    def _lock(self, run_id, key):
+        lock_path = self._path(run_id, key, ".lock")
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return lock_path
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                time.sleep(0.05)
+
+    def _update(self, run_id, key, change):
+        """Apply ``change(lease) -> new lease or None`` under the key's lock."""
+        path = self._path(run_id, key)
+        lock_path = self._lock(run_id, key)
+        try:
+            lease = change(self._read(path))
+            if lease is not None:
+                self._write(path, lease)
+                return True
+            return False
+        finally:
+            os.remove(lock_path)
+
+    def claim(self, run_id, key, worker_id, ttl):
+        now = time.time()
+
+        def take_over(lease):
+            if lease is not None and (lease["state"] == "done" or
+                                      (lease["worker_id"] != worker_id and lease["expires"] > now)):
+                return None
+            return {"worker_id": worker_id, "expires": now + ttl, "state": "held", "result": None}
+
+        return self._update(run_id, key, take_over)
+
+    def renew(self, run_id, key, worker_id, ttl):
+        def extend(lease):
+            if lease is None or lease["worker_id"] != worker_id or lease["state"] != "held":
+                return None
+            return {**lease, "expires": time.time() + ttl}
+
+        return self._update(run_id, key, extend)
+
+    def holds(self, run_id, key, worker_id):
+        lease = self._read(self._path(run_id, key))
+        return (lease is not None and lease["worker_id"] == worker_id and lease["state"] == "held"
+                and lease["expires"] > time.time())
+
+    def complete(self, run_id, key, worker_id, result):
+        def finish(lease):
+            if lease is None or lease["worker_id"] != worker_id:
+                return None
+            return {**lease, "state": "done", "result": result}
+
+        self._update(run_id, key, finish)
+
+    def release(self, run_id, key, worker_id):
+        path = self._path(run_id, key)
+        lock_path = self._lock(run_id, key)
+        try:
+            lease = self._read(path)
+            if lease is not None and lease["worker_id"] == worker_id and lease["state"] == "held":
+                os.remove(path)
+        finally:
+            os.remove(lock_path)
+
+
+def open_lease_store(location):
+    """
+    Open the lease store at ``location``: an SQLite database for paths ending in
+    .db, .sqlite or .sqlite3, otherwise a lease directory.
+    """
+    if location.lower().endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteLeaseStore(location)
+    return FileLeaseStore(location)
+
+
+class ShardCoordinator:
+    """
+    Splits the projects of a run between workers through a shared lease store.
+
+    A worker claims a project before processing it; a heartbeat thread renews every
+    held lease a few times per TTL, so the leases of a crashed worker expire and its
+    projects are taken over by the others.
+
+    Args:
+        store (SqliteLeaseStore | FileLeaseStore): Shared lease store.
+        worker_id (str): Unique id of this worker (default: host name and process id).
+        run_id (str): Id shared by all workers of one run, e.g. supplied by the scheduler
+            that starts them. Each run needs a new id: keys completed under an id are not
+            processed again.
+        ttl (float): Seconds a lease stays valid without renewal.
+    """
+
+    def __init__(self, store, worker_id=None, run_id=None, ttl=DEFAULT_LEASE_TTL):
+        if not run_id:
+            raise ValueError("A split run needs a run id shared by its workers.")
+        self.store = store
+        self.worker_id = worker_id or default_worker_id()
+        self.run_id = run_id
+        self.ttl = ttl
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def start(self):
+        if self._heartbeat is None:
+            self._stop.clear()
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="lease-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            with self._lock:
+                held = list(self._held)
+            for key in held:
+                try:
+                    renewed = self.store.renew(self.run_id, key, self.worker_id, self.ttl)
+                except Exception as e:
+                    logger.warning(f"Failed to renew lease on '{key}': {e}")
+                    continue
+                if not renewed:
+                    logger.warning(f"Lease on '{key}' expired and was taken over by another worker.")
+                    with self._lock:
+                        self._held.discard(key)
+
+    def claim(self, key):
+        claimed = self.store.claim(self.run_id, str(key), self.worker_id, self.ttl)
+        if claimed:
+            with self._lock:
+                self._held.add(str(key))
+        return claimed
+
+    def ensure_held(self, key):
+        """Raise LeaseLostError unless this worker still holds the lease on ``key``."""
+        with self._lock:
+            held = str(key) in self._held
+        if not held or not self.store.holds(self.run_id, str(key), self.worker_id):
+            raise LeaseLostError(key)
+
+    def complete(self, key, result):
+        with self._lock:
+            self._held.discard(str(key))
+        self.store.complete(self.run_id, str(key), self.worker_id, result)
+
+    def release(self, key):
+        with self._lock:
+            self._held.discard(str(key))
+        self.store.release(self.run_id, str(key), self.worker_id)
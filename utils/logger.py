@@ -1,13 +1,107 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+from datetime import datetime, timezone
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DEFAULT_MAX_BYTES = 10 * 1024 ** 2
+DEFAULT_BACKUP_COUNT = 5
 
-def setup_logger(logger_name="backup_manager", log_filename="backup_manager.log"):
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listeners = {}  # logger name -> (QueueListener, queue)
+_listeners_lock = threading.Lock()
+
+
+def get_log_directory():
+    """
+    Return the project's logs directory, creating it if needed.
+    """
+    log_directory = os.path.join(os.path.dirname(__file__), '..', 'logs')
+    if not os.path.exists(log_directory):
+        os.makedirs(log_directory)
+    return log_directory
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line. Fields passed via ``extra``
+    (e.g. ``extra={'project': name}``) are included as top-level keys.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+            'process': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that keeps a record's traceback apart from its message. The plain
+    ``QueueHandler`` formats the traceback into the message and drops ``exc_info``;
+    here it is rendered into ``exc_text``, which survives pickling for process queues
+    and which both the text and the JSON formatter write out on their own.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class TenantLoggerAdapter(logging.LoggerAdapter):
+    """
+    Prefix messages with a tenant name and add it as the ``tenant`` field of JSON lines,
+    so tenants sharing one process and log file can be told apart.
+    """
+
+    def __init__(self, logger, tenant):
+        super().__init__(logger, {'tenant': tenant})
+
+    def process(self, msg, kwargs):
+        kwargs['extra'] = {**self.extra, **kwargs.get('extra', {})}
+        return f"[{self.extra['tenant']}] {msg}", kwargs
+
+
+def setup_logger(logger_name="backup_manager", log_filename="backup_manager.log", json_format=False,
+                 max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT, multiprocess=False):
     """
     Set up a centralized logger for the project.
 
+    Records are put on a queue by the calling thread and written to the console and a
+    size-rotated log file by a background listener, so slow disks or consoles never
+    block worker threads. Only the first call for a logger configures it.
+
     :param logger_name: Name of the logger (default is "backup_manager")
     :param log_filename: Name of the log file (default is "backup_manager.log")
+    :param json_format: Write the log file as JSON lines instead of plain text
+    :param max_bytes: Size at which the log file is rotated (0 disables rotation)
+    :param backup_count: Number of rotated log files to keep
+    :param multiprocess: Use a queue that child processes can log into, see ``get_log_queue``
     """
     # Create a logger instance
     logger = logging.getLogger(logger_name)
@@ -19,21 +113,70 @@ def setup_logger(logger_name="backup_manager", log_filename="backup_manager.log"
         # Set up console handler with a custom format
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
-        console_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(console_format)
-        logger.addHandler(console_handler)
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
         # Set up file handler to log debug messages to a file
-        log_directory = os.path.join(os.path.dirname(__file__), '..', 'logs')
+        log_directory = get_log_directory()
 
-        # Ensure the logs directory exists
-        if not os.path.exists(log_directory):
-            os.makedirs(log_directory)
-
-        file_handler = logging.FileHandler(os.path.join(log_directory, log_filename), encoding='utf-8')
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_directory, log_filename), maxBytes=max_bytes, backupCount=backup_count,
+            encoding='utf-8'
+        )
         file_handler.setLevel(logging.DEBUG)
-        file_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(file_format)
-        logger.addHandler(file_handler)
+        file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT))
+
+        # Hand records to the listener thread; only it touches the console and the file
+        if multiprocess:
+            # Imported here so that single-process runs do not pay for loading multiprocessing
+            import multiprocessing
+            log_queue = multiprocessing.Queue()
+        else:
+            log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler,
+                                                  respect_handler_level=True)
+        listener.start()
+        with _listeners_lock:
+            _listeners[logger_name] = (listener, log_queue)
+        logger.addHandler(RecordQueueHandler(log_queue))
 
     return logger
+
+
+def get_log_queue(logger_name="backup_manager"):
+    """
+    Return the queue feeding the logger's listener, to be passed to child processes
+    (requires ``setup_logger(..., multiprocess=True)``).
+    """
+    with _listeners_lock:
+        entry = _listeners.get(logger_name)
+    return entry[1] if entry else None
+
+
+def setup_worker_logger(log_queue, logger_name="backup_manager"):
+    """
+    Configure a logger in a child process to send its records to the parent's
+    listener, which then owns all writes to the console and the rotating log file.
+    """
+    logger = logging.getLogger(logger_name)
+    if not logger.handlers:
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(RecordQueueHandler(log_queue))
+    return logger
+
+
+@atexit.register
+def shutdown_logging():
+    """
+    Stop all listeners after writing every queued record. Safe to call more than once.
+    """
+    with _listeners_lock:
+        listeners = list(_listeners.items())
+        _listeners.clear()
+    for logger_name, (listener, _) in listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        logger = logging.getLogger(logger_name)
+        for handler in list(logger.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                logger.removeHandler(handler)
@@ -0,0 +1,61 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+
+def drive_key(folder_path, filename):
+    """
+    Return the manifest key of a Drive file: its folder path below the backup root,
+    split like ``GoogleDriveAPI.get_or_create_folder`` splits it, and its name.
+    """
+    parts = [part for part in str(folder_path).strip('/').split('/') if part and part != '.']
+    return '/'.join(parts + [filename])
+
+
+class UploadManifest:
+    """
+    Record of the archives uploaded to Drive, persisted as a JSON file.
+
+    Each entry is keyed by the file's path below the Drive backup root and keeps
+    its Drive file id, size and MD5 (and the tree digest if the archive was hashed
+    locally), so a scrub can later detect files that changed on Drive.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._files = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as manifest_file:
+                self._files = json.load(manifest_file).get("files", {})
+        except (OSError, ValueError):
+            self._files = {}
+
+    def record(self, key, **values):
+        with self._lock:
+            entry = self._files.setdefault(key, {})
+            entry.update(values)
+            entry["recorded"] = datetime.now(timezone.utc).isoformat()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._files.get(key)
+            return dict(entry) if entry is not None else None
+
+    def items(self):
+        with self._lock:
+            return [(key, dict(entry)) for key, entry in self._files.items()]
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({"files": self._files}, indent=2)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+            manifest_file.write(data)
+        os.replace(tmp_path, self.path)
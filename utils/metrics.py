@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from bimcloud_api.hooks import RequestHook
+
+METRIC_PREFIX = "bimcloud_backup_"
+
+COUNTER = "counter"
+GAUGE = "gauge"
+SUMMARY = "summary"
+
+DESCRIPTIONS = {
+    "projects": (COUNTER, "Projects processed, by result."),
+    "stage_duration_seconds": (SUMMARY, "Duration of a project pipeline stage."),
+    "backup_queue_wait_seconds": (SUMMARY, "Time a backup waited for a Manager job slot."),
+    "upload_bytes": (COUNTER, "Bytes uploaded to Google Drive."),
+    "upload_duration_seconds": (SUMMARY, "Duration of archive uploads to Google Drive."),
+    "upload_throughput_bytes_per_second": (GAUGE, "Throughput of the last upload of a project."),
+    "http_requests": (COUNTER, "HTTP requests, by backend, endpoint and status."),
+    "http_request_duration_seconds": (SUMMARY, "HTTP request latency, by backend and endpoint."),
+    "http_request_bytes": (COUNTER, "HTTP request body bytes sent, by backend and endpoint."),
+    "http_response_bytes": (COUNTER, "HTTP response body bytes received, by backend and endpoint."),
+    "drive_credential_upload_bytes": (COUNTER, "Bytes uploaded to Google Drive, by pooled credential."),
+    "drive_credential_bytes_today": (GAUGE, "Bytes uploaded today, by pooled credential."),
+    "manager_cache_hits": (GAUGE, "Manager metadata lookups answered from the cache so far, by endpoint."),
+    "manager_cache_misses": (GAUGE, "Manager metadata lookups sent to the server so far, by endpoint."),
+    "manager_cache_invalidations": (GAUGE, "Cached Manager responses dropped after writes so far, by endpoint."),
+    "manager_cache_hit_rate": (GAUGE, "Share of Manager metadata lookups answered from the cache, by endpoint."),
+    "run_duration_seconds": (GAUGE, "Duration of the last backup run."),
+    "run_finished_timestamp_seconds": (GAUGE, "Unix time at which the last backup run finished."),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def status_of(error):
+    """
+    Map a request outcome to a short status label: the HTTP status code, '430'
+    for BIMcloud errors or 'error' for failures without a response.
+    """
+    if error is None:
+        return "ok"
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "resp", None), "status", None)
+    if status:
+        return str(status)
+    if hasattr(error, "code"):
+        return "430"
+    return "error"
+
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process store for counters, gauges and summaries.
+
+    Metric names are given without the ``bimcloud_backup_`` prefix; ``const_labels``
+    (e.g. the client id) are attached to every sample. The registry can be rendered
+    in the Prometheus text format for node_exporter's textfile collector.
+    """
+
+    def __init__(self, const_labels=None):
+        self.const_labels = dict(const_labels or {})
+        self._lock = threading.Lock()
+        self._types = {}
+        self._help = {}
+        self._values = {}  # (name, labels) -> value, or [count, sum, max] for summaries
+        for name, (metric_type, help_text) in DESCRIPTIONS.items():
+            self.describe(name, metric_type, help_text)
+
+    def describe(self, name, metric_type, help_text):
+        with self._lock:
+            self._types[name] = metric_type
+            self._help[name] = help_text
+
+    def _key(self, name, metric_type, labels):
+        self._types.setdefault(name, metric_type)
+        merged = dict(self.const_labels)
+        merged.update(labels)
+        return name, tuple(sorted((key, str(value)) for key, value in merged.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            key = self._key(name, COUNTER, labels)
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[self._key(name, GAUGE, labels)] = value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            key = self._key(name, SUMMARY, labels)
+            summary = self._values.setdefault(key, [0, 0.0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = max(summary[2], value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the ``with`` block in seconds."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def to_prometheus_text(self):
+        """
+        Render the samples in the Prometheus text exposition format read by
+        node_exporter's textfile collector. Counters are named ``<name>_total``
+        throughout, including their ``# HELP`` and ``# TYPE`` lines.
+        """
+        with self._lock:
+            items = sorted(self._values.items())
+            types = dict(self._types)
+            help_texts = dict(self._help)
+
+        lines = []
+        described = set()
+        for (name, labels), value in items:
+            metric_type = types[name]
+            full_name = METRIC_PREFIX + name
+            if metric_type == COUNTER:
+                full_name += "_total"
+            if name not in described:
+                described.add(name)
+                if name in help_texts:
+                    lines.append(f"# HELP {full_name} {help_texts[name]}")
+                lines.append(f"# TYPE {full_name} {metric_type}")
+            label_text = _format_labels(labels)
+            if metric_type == SUMMARY:
+                lines.append(f"{full_name}_count{label_text} {value[0]}")
+                lines.append(f"{full_name}_sum{label_text} {value[1]}")
+            else:
+                lines.append(f"{full_name}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """Return every sample as plain data for the JSON run summary."""
+        with self._lock:
+            items = sorted(self._values.items())
+            types = dict(self._types)
+
+        samples = []
+        for (name, labels), value in items:
+            sample = {"name": name, "type": types[name], "labels": dict(labels)}
+            if types[name] == SUMMARY:
+                sample.update({"count": value[0], "sum": value[1], "max": value[2]})
+            else:
+                sample["value"] = value
+            samples.append(sample)
+        return samples
+
+
+class MetricsHook(RequestHook):
+    """Request hook counting HTTP requests, latencies and bytes per backend and endpoint."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def on_request_end(self, event):
+        status = str(event.status) if event.status else status_of(event.error)
+        labels = {"backend": event.backend, "endpoint": event.endpoint}
+        self.registry.inc("http_requests", status=status, **labels)
+        self.registry.observe("http_request_duration_seconds", event.duration, **labels)
+        self.registry.inc("http_request_bytes", event.request_bytes, **labels)
+        self.registry.inc("http_response_bytes", event.response_bytes, **labels)
+
+
+def write_atomic(path, content):
+    """Write a file via a temporary file and rename, so scrapers never read partial output."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as output_file:
+        output_file.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_prometheus_textfile(registry, path):
+    write_atomic(path, registry.to_prometheus_text())
+
+
+def write_json_summary(summary, path):
+    write_atomic(path, json.dumps(summary, indent=2, default=str))
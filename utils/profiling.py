@@ -0,0 +1,158 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Before Python 3.12 every thread can run its own cProfile profiler. From 3.12 on
+# cProfile is built on sys.monitoring, which allows a single process-wide profiler.
+PER_THREAD_PROFILING = sys.version_info < (3, 12)
+
+
+class StageProfiler:
+    """
+    Profiles named pipeline stages of a backup run.
+
+    For every stage it collects wall-clock and CPU time, deterministic cProfile data
+    (per stage, or for the whole run on Python 3.12+) and wall-clock stack samples of
+    all threads currently inside a stage. Stages may nest; time is attributed to the
+    innermost one.
+
+    Args:
+        output_prefix (str): Path prefix for the written files.
+        sample_interval (float): Seconds between stack samples.
+    """
+
+    def __init__(self, output_prefix, sample_interval=0.01):
+        self.output_prefix = output_prefix
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}  # stage -> pstats.Stats
+        self._timings = {}  # stage -> [calls, wall seconds, cpu seconds]
+        self._thread_stages = {}  # thread id -> innermost stage name
+        self._samples = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._run_profile = None
+
+    def start(self):
+        if not PER_THREAD_PROFILING:
+            self._run_profile = cProfile.Profile()
+            self._run_profile.enable()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        if self._run_profile:
+            self._run_profile.disable()
+
+    @contextmanager
+    def stage(self, name):
+        stack = self._local.__dict__.setdefault("stack", [])
+        thread_id = threading.get_ident()
+        if stack and stack[-1][1]:
+            stack[-1][1].disable()
+
+        profile = cProfile.Profile() if PER_THREAD_PROFILING else None
+        stack.append((name, profile))
+        with self._lock:
+            self._thread_stages[thread_id] = name
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            wall = time.perf_counter() - wall_started
+            cpu = time.thread_time() - cpu_started
+            stack.pop()
+            with self._lock:
+                timing = self._timings.setdefault(name, [0, 0.0, 0.0])
+                timing[0] += 1
+                timing[1] += wall
+                timing[2] += cpu
+                if profile:
+                    if name in self._stats:
+                        self._stats[name].add(profile)
+                    else:
+                        self._stats[name] = pstats.Stats(profile)
+                if stack:
+                    self._thread_stages[thread_id] = stack[-1][0]
+                else:
+                    self._thread_stages.pop(thread_id, None)
+            if stack and stack[-1][1]:
+                stack[-1][1].enable()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                active = dict(self._thread_stages)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, stage in active.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(stage)
+                self._samples[";".join(reversed(stack))] += 1
+
+    def write(self):
+        """
+        Write the collected data:
+
+        - ``<prefix>.<stage>.pstats`` (or ``<prefix>.run.pstats``): cProfile data for pstats/snakeviz
+        - ``<prefix>.folded``: collapsed stack samples for flamegraph.pl, inferno or speedscope
+        - ``<prefix>.txt``: per-stage wall/CPU summary and the top functions of each profile
+
+        Returns:
+            list: Paths of the written files.
+        """
+        written = []
+        with self._lock:
+            stats = dict(self._stats)
+            timings = dict(self._timings)
+            samples = dict(self._samples)
+
+        if self._run_profile:
+            stats = {"run": pstats.Stats(self._run_profile)}
+        for name, stage_stats in stats.items():
+            path = f"{self.output_prefix}.{name}.pstats"
+            stage_stats.dump_stats(path)
+            written.append(path)
+
+        folded_path = f"{self.output_prefix}.folded"
+        with open(folded_path, "w", encoding="utf-8") as folded_file:
+            for stack, count in sorted(samples.items()):
+                folded_file.write(f"{stack} {count}\n")
+        written.append(folded_path)
+
+        summary_path = f"{self.output_prefix}.txt"
+        with open(summary_path, "w", encoding="utf-8") as summary_file:
+            summary_file.write(f"{'stage':<20} {'calls':>8} {'wall s':>12} {'cpu s':>12} {'samples':>10}\n")
+            for name, (calls, wall, cpu) in sorted(timings.items()):
+                stage_samples = sum(count for stack, count in samples.items() if stack.split(";", 1)[0] == name)
+                summary_file.write(f"{name:<20} {calls:>8} {wall:>12.3f} {cpu:>12.3f} {stage_samples:>10}\n")
+            for name, stage_stats in stats.items():
+                output = io.StringIO()
+                stage_stats.stream = output
+                stage_stats.sort_stats("cumulative").print_stats(25)
+                summary_file.write(f"\n=== {name} ===\n{output.getvalue()}")
+        written.append(summary_path)
+        return written
@@ -0,0 +1,117 @@
+from fnmatch import fnmatchcase
+
+GLOB_CHARACTERS = set('*?[')
+
+
+def load_patterns(path):
+    """
+    Read project path patterns from a file, one per line. Blank lines and lines
+    starting with '#' are ignored.
+    """
+    with open(path, "r", encoding="utf-8") as pattern_file:
+        return [line.strip() for line in pattern_file if line.strip() and not line.strip().startswith('#')]
+
+
+def is_glob(segment):
+    return any(char in GLOB_CHARACTERS for char in segment)
+
+
+class _Node:
+    __slots__ = ('children', 'projects')
+
+    def __init__(self):
+        self.children = {}
+        self.projects = []
+
+
+class ProjectPathIndex:
+    """
+    Trie of project paths, split into folder segments, for selecting projects by pattern.
+
+    Patterns are relative to the project root and use '/' as separator:
+
+    - ``Office/Tower A``: the project with exactly this path.
+    - ``Office/``: every project below the folder (a trailing slash selects a subtree).
+    - ``Office/*/Tower*``: glob patterns per segment (``*``, ``?``, ``[...]``); ``**``
+      matches any number of folders. A segment containing these characters also
+      matches a name spelled exactly like it, so ``Office/Proj [2024]`` selects that project.
+
+    Literal segments are dictionary lookups, so a pattern only visits the part of
+    the tree it can match, however many projects the Manager holds.
+
+    Args:
+        projects (list): Projects as returned by the Manager.
+        root (str): Name of the root folder in ``$path``, stripped from every path.
+    """
+
+    def __init__(self, projects, root):
+        self.root = root
+        self._tree = _Node()
+        for position, project in enumerate(projects):
+            node = self._tree
+            for segment in self.split(project['$path']):
+                node = node.children.setdefault(segment, _Node())
+            node.projects.append((position, project))
+
+    def split(self, path):
+        path = path.strip('/')
+        if path == self.root:
+            return []
+        if path.startswith(self.root + '/'):
+            path = path[len(self.root) + 1:]
+        return [segment for segment in path.split('/') if segment]
+
+    @staticmethod
+    def _subtree(node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.projects
+            stack.extend(node.children.values())
+
+    def _match(self, node, segments, subtree, found):
+        if not segments:
+            if subtree:
+                found.extend(self._subtree(node))
+            else:
+                found.extend(node.projects)
+            return
+        segment, rest = segments[0], segments[1:]
+        if segment == '**':
+            # Zero folders, or one more folder while staying on '**'
+            self._match(node, rest, subtree, found)
+            for child in node.children.values():
+                self._match(child, segments, subtree, found)
+        elif is_glob(segment):
+            # A folder or project may be named like a glob, e.g. 'Proj [2024]'; it matches literally too
+            for name, child in node.children.items():
+                if name == segment or fnmatchcase(name, segment):
+                    self._match(child, rest, subtree, found)
+        else:
+            child = node.children.get(segment)
+            if child is not None:
+                self._match(child, rest, subtree, found)
+
+    def match(self, pattern):
+        """Return the (position, project) pairs matching one pattern."""
+        found = []
+        self._match(self._tree, self.split(pattern), pattern.endswith('/'), found)
+        return found
+
+    def select(self, patterns):
+        """
+        Select the projects matching any of the patterns, in the order of the
+        project list and without duplicates.
+
+        Returns:
+            tuple: (selected projects, patterns that matched nothing)
+        """
+        selected = {}
+        unmatched = []
+        for pattern in patterns:
+            found = self.match(pattern)
+            if not found:
+                unmatched.append(pattern)
+            for position, project in found:
+                selected[position] = project
+        return [selected[position] for position in sorted(selected)], unmatched
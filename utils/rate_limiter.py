@@ -0,0 +1,108 @@
+import random
+import threading
+import time
+
+
+def exponential_backoff(attempt, base_delay=1.0, max_delay=60.0):
+    """
+    Compute a "full jitter" exponential backoff delay.
+
+    Args:
+        attempt (int): Zero-based retry attempt number.
+        base_delay (float): Delay in seconds for the first retry.
+        max_delay (float): Upper bound for the delay in seconds.
+
+    Returns:
+        float: Number of seconds to sleep before the next attempt.
+    """
+    ceiling = min(max_delay, base_delay * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every caller of a quota-limited API.
+
+    The refill rate adapts to the backend: each throttling response halves the
+    rate (down to ``min_rate``) and every successful call nudges it back up
+    towards ``rate``, so callers settle just below the quota ceiling.
+    """
+
+    def __init__(self, rate=10.0, capacity=20, min_rate=0.5, recovery=0.05):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("Token bucket rate and capacity must be positive.")
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.recovery = recovery
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {
+            "acquired": 0,
+            "delayed": 0,
+            "wait_seconds": 0.0,
+            "throttled": 0,
+        }
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self, tokens=1):
+        """
+        Block until ``tokens`` tokens are available and consume them.
+
+        Returns:
+            float: Seconds spent waiting for the tokens.
+        """
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(tokens, waited)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def try_acquire(self, tokens=1, waited=0.0):
+        """
+        Consume ``tokens`` tokens if they are available, without blocking. Callers that
+        wait themselves (e.g. with ``asyncio.sleep``) pass the time waited so far.
+
+        Returns:
+            float: 0 if the tokens were consumed, else the seconds until they may be.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self._stats["acquired"] += 1
+                if waited:
+                    self._stats["delayed"] += 1
+                    self._stats["wait_seconds"] += waited
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def on_throttle(self):
+        """Multiplicatively back off after the backend reported a quota error."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            self._stats["throttled"] += 1
+
+    def on_success(self):
+        """Additively recover the rate after a successful call."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.recovery)
+
+    def stats(self):
+        """Return a snapshot of the throttling counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["rate"] = self.rate
+            return snapshot
@@ -0,0 +1,187 @@
+import logging
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import PurePath
+from utils.manifest import drive_key
+
+# Folder below the Drive backup root holding the snapshots of overwritten archives
+VERSIONS_FOLDER = '_versions'
+
+# Retention periods and the bucket a snapshot falls into for each of them
+RETENTION_PERIODS = {
+    'last': lambda stamp: stamp,
+    'daily': lambda stamp: stamp.date(),
+    'weekly': lambda stamp: stamp.isocalendar()[:2],
+    'monthly': lambda stamp: (stamp.year, stamp.month),
+    'yearly': lambda stamp: stamp.year,
+}
+
+TIMESTAMP_FORMAT = '%Y%m%d-%H%M%S'
+_SNAPSHOT_NAME = re.compile(r'\.(\d{8}-\d{6})(\.[^.]*)?$')
+
+logger = logging.getLogger("backup_manager")
+
+
+def parse_retention(text):
+    """
+    Parse a grandfather-father-son policy such as ``"daily=7,weekly=4,monthly=12"``:
+    the newest snapshot of each of the last 7 days, 4 weeks and 12 months is kept.
+    Periods are ``last`` (newest snapshots regardless of age), ``daily``, ``weekly``,
+    ``monthly`` and ``yearly``.
+
+    Returns:
+        dict: Period -> number of buckets kept.
+    """
+    policy = {}
+    for part in filter(None, (item.strip() for item in text.split(','))):
+        try:
+            period, kept = part.split('=')
+            period, kept = period.strip(), int(kept)
+        except ValueError:
+            raise ValueError(f"Invalid retention entry '{part}', expected e.g. 'daily=7'") from None
+        if period not in RETENTION_PERIODS or kept < 0:
+            raise ValueError(f"Invalid retention entry '{part}', periods are {', '.join(RETENTION_PERIODS)}")
+        policy[period] = kept
+    if not any(policy.values()):
+        raise ValueError("A retention policy must keep at least one snapshot.")
+    return policy
+
+
+def snapshots_to_keep(timestamps, policy):
+    """
+    Apply a retention policy: for every period, the newest snapshot of each of the
+    most recent buckets that hold a snapshot is kept.
+
+    Args:
+        timestamps (iterable): Snapshot datetimes.
+        policy (dict): Period -> number of buckets, from ``parse_retention``.
+
+    Returns:
+        set: Timestamps to keep.
+    """
+    newest_first = sorted(set(timestamps), reverse=True)
+    keep = set()
+    for period, kept in policy.items():
+        bucket_of = RETENTION_PERIODS[period]
+        buckets = set()
+        for stamp in newest_first:
+            bucket = bucket_of(stamp)
+            if bucket in buckets:
+                continue
+            if len(buckets) >= kept:
+                break
+            buckets.add(bucket)
+            keep.add(stamp)
+    return keep
+
+
+def snapshot_timestamp(name):
+    """Return the UTC timestamp encoded in a snapshot name, or None for other files."""
+    match = _SNAPSHOT_NAME.search(name)
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+
+
+class VersionRetention:
+    """
+    Keeps earlier generations of the archives on Drive without uploading them again.
+
+    Before an upload replaces an archive (see ``keep``), the current file is copied on the server
+    side into ``_versions/<folder path>/<file name>/`` below the backup root, named
+    after the time it was uploaded (``Tower.20240131-220512.archive``). The snapshots
+    of that archive are then pruned according to the policy with batched deletes.
+
+    Args:
+        drive_api (GoogleDriveAPI | GoogleDrivePool): Drive client.
+        root_folder_id (str): Drive backup root folder id.
+        policy (dict): Retention policy from ``parse_retention``.
+    """
+
+    def __init__(self, drive_api, root_folder_id, policy):
+        self.drive_api = drive_api
+        self.root_folder_id = root_folder_id
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._stats = {"snapshots": 0, "snapshot_errors": 0, "pruned": 0, "prune_errors": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def keep(self, folder_path, filename):
+        """
+        Keep a snapshot of the archive an upload to ``folder_path/filename`` is about to
+        replace, if there is one. Failures are logged; the upload goes ahead either way.
+        """
+        try:
+            folder_id = self.drive_api.get_or_create_folder(folder_path, self.root_folder_id)
+            existing = self.drive_api.find_file(filename, folder_id)
+        except Exception as e:
+            self._count("snapshot_errors")
+            logger.error(f"Failed to look up '{drive_key(folder_path, filename)}' before overwriting it: {e}")
+            return
+        if existing:
+            self.snapshot(folder_path, existing)
+
+    def snapshot(self, folder_path, existing):
+        """
+        Copy the archive about to be overwritten into its versions folder and prune the
+        older snapshots. Failures are logged; the upload goes ahead either way.
+
+        Args:
+            folder_path (str): Folder of the archive below the backup root.
+            existing (dict): Drive file with id, name and modifiedTime.
+        """
+        name = existing['name']
+        modified = existing.get('modifiedTime')
+        stamp = (datetime.fromisoformat(modified.replace('Z', '+00:00')).astimezone(timezone.utc)
+                 if modified else datetime.now(timezone.utc))
+        path = PurePath(name)
+        snapshot_name = f"{path.stem}.{stamp.strftime(TIMESTAMP_FORMAT)}{path.suffix}"
+        try:
+            folder_id = self.drive_api.get_or_create_folder(
+                f"{VERSIONS_FOLDER}/{drive_key(folder_path, name)}", self.root_folder_id)
+            snapshots = list(self.drive_api.list_folder(folder_id, 'id, name'))
+            # A failed upload leaves the archive in place; the next attempt finds its snapshot already kept
+            if all(item['name'] != snapshot_name for item in snapshots):
+                snapshots.append({'id': self.drive_api.copy_file(existing['id'], snapshot_name, folder_id),
+                                  'name': snapshot_name})
+                self._count("snapshots")
+                logger.info(f"Kept snapshot '{snapshot_name}' of '{drive_key(folder_path, name)}'.")
+        except Exception as e:
+            self._count("snapshot_errors")
+            logger.error(f"Failed to keep a snapshot of '{name}' before overwriting it: {e}")
+            return
+        self.prune(folder_id, snapshots)
+
+    def prune(self, folder_id, snapshots=None):
+        """
+        Delete the snapshots in a versions folder that the policy does not keep.
+
+        Args:
+            folder_id (str): Versions folder id.
+            snapshots (list): Files of the folder with id and name, listed if omitted.
+        """
+        try:
+            if snapshots is None:
+                snapshots = list(self.drive_api.list_folder(folder_id, 'id, name'))
+            snapshots = [(snapshot_timestamp(item['name']), item['id']) for item in snapshots]
+            snapshots = [(stamp, file_id) for stamp, file_id in snapshots if stamp is not None]
+            keep = snapshots_to_keep((stamp for stamp, _ in snapshots), self.policy)
+            expired = [file_id for stamp, file_id in snapshots if stamp not in keep]
+            if not expired:
+                return
+            failed = self.drive_api.delete_files(expired)
+        except Exception as e:
+            self._count("prune_errors")
+            logger.error(f"Failed to prune snapshots in Drive folder {folder_id}: {e}")
+            return
+        self._count("pruned", len(expired) - len(failed))
+        self._count("prune_errors", len(failed))
+        logger.info(f"Pruned {len(expired) - len(failed)} expired snapshot(s) in Drive folder {folder_id}.")
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from utils.rate_limiter import exponential_backoff
+
+logger = logging.getLogger("backup_manager")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is refused because the backend's circuit breaker is open."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"Circuit breaker '{name}' is open (retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open circuit breaker for one backend.
+
+    After ``failure_threshold`` consecutive transient failures the circuit opens
+    and every call fails immediately with CircuitOpenError. Once ``reset_timeout``
+    seconds have passed a single probe call is let through; its outcome closes
+    the circuit again or re-opens it.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if self.state == self.OPEN and elapsed >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit breaker '{self.name}' closed.")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.error(f"Circuit breaker '{self.name}' opened after {self._failures} failure(s).")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    @property
+    def is_open(self):
+        return self.state == self.OPEN
+
+
+class RetryPolicy:
+    """
+    Retry configuration shared by the Manager, Blob server and Drive clients.
+
+    Args:
+        max_attempts (int): Total number of attempts, including the first call.
+        base_delay (float): Backoff delay in seconds for the first retry.
+        max_delay (float): Upper bound for a single backoff delay.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=60.0):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _retry_delay(self, attempt, error, is_retryable, breaker, description):
+        """
+        Record a failed attempt and return the backoff delay before the next one,
+        or None if the error must be raised.
+
+        Only retryable (transient) failures count against the circuit breaker;
+        any other error means the backend answered and is passed through as-is.
+        """
+        if is_retryable is None or not is_retryable(error):
+            if breaker:
+                breaker.record_success()
+            return None
+        if breaker:
+            breaker.record_failure()
+        if attempt + 1 >= self.max_attempts or (breaker and breaker.is_open):
+            return None
+        delay = exponential_backoff(attempt, self.base_delay, self.max_delay)
+        logger.warning(
+            f"{description} failed ({error}); retry {attempt + 1}/{self.max_attempts - 1} in {delay:.1f}s"
+        )
+        return delay
+
+    def call(self, func, args=(), kwargs=None, is_retryable=None, breaker=None, description=None):
+        """Call ``func`` and retry it while ``is_retryable(error)`` holds."""
+        kwargs = kwargs or {}
+        description = description or getattr(func, '__name__', 'call')
+        for attempt in range(self.max_attempts):
+            if breaker:
+                breaker.before_call()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(attempt, e, is_retryable, breaker, description)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+            else:
+                if breaker:
+                    breaker.record_success()
+                return result
+
+    async def call_async(self, func, args=(), kwargs=None, is_retryable=None, breaker=None, description=None):
+        """
+        Await ``func(*args, **kwargs)`` with the retry and circuit breaker rules of
+        ``call``, sleeping between attempts without blocking the event loop.
+        """
+        import asyncio
+
+        kwargs = kwargs or {}
+        description = description or getattr(func, '__name__', 'call')
+        for attempt in range(self.max_attempts):
+            if breaker:
+                breaker.before_call()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(attempt, e, is_retryable, breaker, description)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            else:
+                if breaker:
+                    breaker.record_success()
+                return result
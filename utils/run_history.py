@@ -0,0 +1,52 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+
+class RunHistory:
+    """
+    Per-project statistics collected by previous runs, persisted as a JSON file.
+
+    Each project keeps its latest value for every recorded key (e.g. ``archive_size``)
+    so later runs can plan ahead with realistic estimates.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._projects = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as history_file:
+                self._projects = json.load(history_file).get("projects", {})
+        except (OSError, ValueError):
+            # A damaged history only costs us estimates; start over
+            self._projects = {}
+
+    def record(self, project_id, **values):
+        with self._lock:
+            entry = self._projects.setdefault(str(project_id), {})
+            entry.update(values)
+            entry["updated"] = datetime.now(timezone.utc).isoformat()
+
+    def get(self, project_id, key, default=None):
+        with self._lock:
+            return self._projects.get(str(project_id), {}).get(key, default)
+
+    def values(self, key):
+        """Return every recorded value of ``key`` across all projects."""
+        with self._lock:
+            return [entry[key] for entry in self._projects.values() if key in entry]
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({"projects": self._projects}, indent=2)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as history_file:
+            history_file.write(data)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,96 @@
+import heapq
+import statistics
+
+# Stages whose durations add up to the time one project occupies a worker
+STAGE_DURATION_KEYS = ("backup_seconds", "hash_seconds", "retention_seconds", "upload_seconds", "verify_seconds",
+                       "delete_seconds")
+DEFAULT_PROJECT_SECONDS = 600
+
+SCHEDULING_POLICIES = {
+    "longest": "longest expected duration first (minimises total run time)",
+    "shortest": "shortest expected duration first (most projects done early)",
+    "largest": "largest archive first",
+    "api": "order returned by the BIMcloud Manager",
+}
+
+
+def project_duration(history, project_id):
+    """
+    Return the recorded duration of a project's last run in seconds, or None if unknown.
+    """
+    durations = [history.get(project_id, key) for key in STAGE_DURATION_KEYS]
+    known = [duration for duration in durations if duration is not None]
+    return sum(known) if known else None
+
+
+def estimate_durations(projects, history):
+    """
+    Estimate how long each project will take, using the median of known projects
+    for projects without history.
+
+    Returns:
+        dict: Project id mapped to its estimated duration in seconds.
+    """
+    estimates = {project["id"]: project_duration(history, project["id"]) for project in projects}
+    known = [duration for duration in estimates.values() if duration is not None]
+    fallback = statistics.median(known) if known else DEFAULT_PROJECT_SECONDS
+    return {project_id: fallback if duration is None else duration
+            for project_id, duration in estimates.items()}
+
+
+def order_projects(projects, history, policy="longest"):
+    """
+    Order projects for a pool of workers that always picks the next project in line.
+    With the "longest" policy this is longest-processing-time-first list scheduling.
+    """
+    if policy not in SCHEDULING_POLICIES:
+        raise ValueError(f"Unknown scheduling policy: {policy}")
+    if policy == "api":
+        return list(projects)
+    if policy == "largest":
+        return sorted(projects, key=lambda project: history.get(project["id"], "archive_size", 0), reverse=True)
+
+    durations = estimate_durations(projects, history)
+    return sorted(projects, key=lambda project: durations[project["id"]], reverse=(policy == "longest"))
+
+
+def estimate_makespan(durations, workers):
+    """
+    Simulate the worker pool on the given ordered durations and return the total run time in seconds.
+    """
+    finish_times = [0.0] * max(1, workers)
+    for duration in durations:
+        earliest = heapq.heappop(finish_times)
+        heapq.heappush(finish_times, earliest + duration)
+    return max(finish_times)
+
+
+def interleave_fairly(queues, durations, weights=None):
+    """
+    Merge the ordered project queues of several tenants into one order for a shared
+    worker pool. Each step takes the next project of the tenant with the least
+    estimated work handed out so far relative to its weight, so tenants get workers
+    in proportion to their weights while each keeps its own order.
+
+    Args:
+        queues (dict): Tenant name mapped to its ordered list of projects.
+        durations (dict): Tenant name mapped to {project id: estimated seconds}.
+        weights (dict): Tenant name mapped to its share (default 1).
+
+    Returns:
+        list: (tenant name, project) pairs in execution order.
+    """
+    weights = weights or {}
+    heap = [(0.0, index, name) for index, name in enumerate(queues) if queues[name]]
+    heapq.heapify(heap)
+    positions = dict.fromkeys(queues, 0)
+    order = []
+    while heap:
+        served, index, name = heapq.heappop(heap)
+        project = queues[name][positions[name]]
+        positions[name] += 1
+        order.append((name, project))
+        if positions[name] < len(queues[name]):
+            served += durations[name][project["id"]] / (weights.get(name) or 1)
+            heapq.heappush(heap, (served, index, name))
+    return order
@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+import time
+from bimcloud_api.hooks import RequestHook
+
+MAX_SPANS = 500000  # Bounds memory use on very large runs
+
+
+class SpanRecorder(RequestHook):
+    """
+    Collects request and pipeline-stage spans and writes them in the Chrome Trace
+    Event format, which opens in Perfetto (ui.perfetto.dev) or chrome://tracing.
+    Each worker thread becomes its own track.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.max_spans = max_spans
+        self.dropped = 0
+        self._spans = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def add_span(self, name, category, start_time, duration, args=None, thread_id=None, thread_name=None):
+        """
+        Record a finished span.
+
+        Args:
+            name (str): Span name shown in the viewer.
+            category (str): Span category, e.g. the backend or 'stage'.
+            start_time (float): Unix time at which the span started.
+            duration (float): Span duration in seconds.
+            args (dict): Extra details shown when the span is selected.
+        """
+        thread_id = thread_id or threading.get_ident()
+        thread_name = thread_name or threading.current_thread().name
+        span = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": int(start_time * 1e6),
+            "dur": int(duration * 1e6),
+            "pid": self._pid,
+            "tid": thread_id,
+            "args": args or {},
+        }
+        with self._lock:
+            self._threads[thread_id] = thread_name
+            if len(self._spans) >= self.max_spans:
+                self.dropped += 1
+                return
+            self._spans.append(span)
+
+    def on_request_end(self, event):
+        args = {
+            "method": event.method,
+            "status": event.status,
+            "request_bytes": event.request_bytes,
+            "response_bytes": event.response_bytes,
+        }
+        if event.error is not None:
+            args["error"] = str(event.error)
+        self.add_span(event.endpoint, event.backend, event.start_time, event.duration, args,
+                      event.thread_id, event.thread_name)
+
+    def write(self, path):
+        with self._lock:
+            events = [
+                {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": thread_id, "args": {"name": name}}
+                for thread_id, name in self._threads.items()
+            ]
+            events.extend(self._spans)
+            metadata = {"dropped_spans": self.dropped, "written": time.time()}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "metadata": metadata}, trace_file)
+        os.replace(tmp_path, path)
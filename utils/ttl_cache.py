@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a per-endpoint time to live.
+
+    Entries are keyed by endpoint and request arguments and may carry tags (e.g.
+    resource ids), so writes can invalidate exactly the entries they affect. Hits
+    and misses are counted per endpoint. With a ``path``, unexpired entries are
+    loaded at start and written back by ``save``; values must then be JSON
+    serializable, or be handled by the ``encode``/``decode`` hooks.
+
+    Args:
+        ttls (dict): Endpoint -> seconds an entry stays valid; endpoints not listed are not cached.
+        max_entries (int): Entries kept before the least recently used are evicted.
+        path (str): Optional JSON file persisting the cache between runs.
+        encode (callable): ``json.dumps`` default hook for values that are not JSON types.
+        decode (callable): ``json.loads`` object hook restoring such values.
+    """
+
+    def __init__(self, ttls, max_entries=1024, path=None, encode=None, decode=None):
+        self.ttls = dict(ttls)
+        self.max_entries = max_entries
+        self.path = path
+        self._encode = encode
+        self._decode = decode
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (endpoint, key) -> (expires, tags, value)
+        self._stats = {}  # endpoint -> {"hits": n, "misses": n, "invalidations": n}
+        self._load()
+
+    def _count(self, endpoint, name, amount=1):
+        counters = self._stats.setdefault(endpoint, {"hits": 0, "misses": 0, "invalidations": 0})
+        counters[name] += amount
+
+    def cacheable(self, endpoint):
+        return self.ttls.get(endpoint, 0) > 0
+
+    def get(self, endpoint, key):
+        """
+        Returns:
+            tuple: (True, value) on a hit, (False, None) on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get((endpoint, key))
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[(endpoint, key)]
+                self._count(endpoint, "misses")
+                return False, None
+            self._entries.move_to_end((endpoint, key))
+            self._count(endpoint, "hits")
+            return True, entry[2]
+
+    def put(self, endpoint, key, value, tags=()):
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[(endpoint, key)] = (time.time() + ttl, frozenset(tags), value)
+            self._entries.move_to_end((endpoint, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, endpoint, key, loader, tags=()):
+        """Return the cached value, or call ``loader()`` and cache its result."""
+        if not self.cacheable(endpoint):
+            return loader()
+        hit, value = self.get(endpoint, key)
+        if hit:
+            return value
+        value = loader()
+        self.put(endpoint, key, value, tags)
+        return value
+
+    def invalidate(self, endpoint, tags=None):
+        """
+        Drop the entries of an endpoint, or only those carrying any of ``tags``.
+        """
+        tags = None if tags is None else set(tags)
+        with self._lock:
+            stale = [cache_key for cache_key, (_, entry_tags, _) in self._entries.items()
+                     if cache_key[0] == endpoint and (tags is None or entry_tags & tags)]
+            for cache_key in stale:
+                del self._entries[cache_key]
+            if stale:
+                self._count(endpoint, "invalidations", len(stale))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return the counters of every endpoint, with its hit rate."""
+        with self._lock:
+            snapshot = {endpoint: dict(counters) for endpoint, counters in self._stats.items()}
+        for counters in snapshot.values():
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        return snapshot
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as cache_file:
+                entries = json.load(cache_file, object_hook=self._decode).get("entries", [])
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        now = time.time()
+        for endpoint, key, expires, tags, value in entries:
+            if expires > now and endpoint in self.ttls:
+                self._entries[(endpoint, self._to_key(key))] = (expires, frozenset(tags), value)
+
+    @classmethod
+    def _to_key(cls, value):
+        # JSON turns tuples into lists; keys must be hashable again
+        if isinstance(value, list):
+            return tuple(cls._to_key(item) for item in value)
+        return value
+
+    def save(self):
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [[endpoint, key, expires, sorted(tags), value]
+                       for (endpoint, key), (expires, tags, value) in self._entries.items() if expires > now]
+        try:
+            data = json.dumps({"entries": entries}, default=self._encode)
+        except TypeError:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as cache_file:
+            cache_file.write(data)
+        os.replace(tmp_path, self.path)